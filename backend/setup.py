@@ -153,6 +153,8 @@ setup(
             'user_update = tracim_backend.command.user:UpdateUserCommand',
             'db_init = tracim_backend.command.database:InitializeDBCommand',
             'db_delete = tracim_backend.command.database:DeleteDBCommand',
+            'db_fill-files-metadata = tracim_backend.command.database:FillFilesMetadataCommand',
+            'db_delete-unused-files = tracim_backend.command.database:DeleteUnusedFilesCommand',
             'webdav start = tracim_backend.command.webdav:WebdavRunnerCommand',
             'caldav start = tracim_backend.command.caldav:CaldavRunnerCommand',
             'caldav sync = tracim_backend.command.caldav:CaldavSyncCommand',
@@ -160,6 +162,8 @@ setup(
             'search index-populate = tracim_backend.command.search:SearchIndexIndexCommand',
             'search index-upgrade-experimental = tracim_backend.command.search:SearchIndexUpgradeCommand',
             'search index-drop = tracim_backend.command.search:SearchIndexDeleteCommand',
+            'preview cache-report = tracim_backend.command.preview:PreviewCacheReportCommand',
+            'preview cache-prune = tracim_backend.command.preview:PreviewCachePruneCommand',
             'dev parameters list = tracim_backend.command.devtools:ParametersListCommand'
         ]
     },
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 from copy import deepcopy
 
-from hapic.ext.pyramid import PyramidContext
 from pyramid.config import Configurator
 import pyramid_beaker
 from pyramid_multiauth import MultiAuthenticationPolicy
@@ -42,6 +41,7 @@ from tracim_backend.lib.utils.authorization import TRACIM_DEFAULT_PERM
 from tracim_backend.lib.utils.authorization import AcceptAllAuthorizationPolicy
 from tracim_backend.lib.utils.cors import add_cors_support
 from tracim_backend.lib.utils.request import TracimRequest
+from tracim_backend.lib.utils.response import TracimPyramidContext
 from tracim_backend.lib.utils.utils import sliced_dict
 from tracim_backend.lib.webdav import WebdavAppFactory
 from tracim_backend.models.auth import AuthType
@@ -145,8 +145,11 @@ def web(global_config, **local_settings):
     # Add SqlAlchemy DB
     init_models(configurator, app_config)
     # set Hapic
-    context = PyramidContext(
-        configurator=configurator, default_error_builder=ErrorSchema(), debug=app_config.DEBUG
+    context = TracimPyramidContext(
+        app_config=app_config,
+        configurator=configurator,
+        default_error_builder=ErrorSchema(),
+        debug=app_config.DEBUG,
     )
     hapic.set_context(context)
     # INFO - G.M - 2018-07-04 - global-context exceptions
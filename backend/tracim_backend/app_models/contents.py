@@ -159,6 +159,42 @@ comment_type = ContentType(
 )
 
 
+class ContentTypeRegistry(object):
+    """
+    Content types indexed by slug and alias, with precomputed slug tuples,
+    built from content types of active applications. It is never updated,
+    see ContentTypeList.rebuild().
+    """
+
+    def __init__(
+        self,
+        content_types: typing.List[ContentType],
+        special_content_types: typing.List[ContentType],
+        event_type: ContentType,
+        extra_slugs: typing.List[str],
+    ) -> None:
+        self.content_types = tuple(content_types)
+        self.endpoint_content_types = self.content_types + tuple(special_content_types)
+        self.restricted_slugs = tuple(content_type.slug for content_type in self.content_types)
+        self.endpoint_slugs = tuple(
+            content_type.slug for content_type in self.endpoint_content_types
+        )
+        query_slugs = []  # type: typing.List[str]
+        for content_type in self.endpoint_content_types:
+            query_slugs.append(content_type.slug)
+            if content_type.slug_alias:
+                query_slugs.extend(content_type.slug_alias)
+        query_slugs.extend(extra_slugs)
+        self.query_slugs = tuple(query_slugs)
+        # INFO - 2019-07-11 - first content type matching a slug or an alias
+        # wins, as in previous linear search.
+        self.content_types_by_slug = {}  # type: typing.Dict[str, ContentType]
+        for content_type in self.endpoint_content_types + (event_type,):
+            self.content_types_by_slug.setdefault(content_type.slug, content_type)
+            for slug_alias in content_type.slug_alias or []:
+                self.content_types_by_slug.setdefault(slug_alias, content_type)
+
+
 class ContentTypeList(object):
     """
     ContentType List
@@ -188,25 +224,36 @@ class ContentTypeList(object):
         self.app_list = app_list
         self._special_contents_types = [self.Comment]
         self._extra_slugs = [self.Any_SLUG]
+        self._registry = None  # type: typing.Optional[ContentTypeRegistry]
+
+    def rebuild(self) -> None:
+        """
+        Rebuild content types indexes from active applications of app_list.
+        Indexes are built once, this must be called each time app_list
+        is updated.
+        """
+        self._registry = ContentTypeRegistry(
+            content_types=ApplicationApi(self.app_list).get_content_types(),
+            special_content_types=self._special_contents_types,
+            event_type=self.Event,
+            extra_slugs=self._extra_slugs,
+        )
 
     @property
-    def _content_types(self):
-        app_api = ApplicationApi(self.app_list)
-        content_types = app_api.get_content_types()
-        return content_types
+    def _indexes(self) -> "ContentTypeRegistry":
+        if self._registry is None:
+            self.rebuild()
+        return self._registry
 
     def get_one_by_slug(self, slug: str) -> ContentType:
         """
         Get ContentType object according to slug
         match for both slug and slug_alias
         """
-        content_types = self._content_types.copy()
-        content_types.extend(self._special_contents_types)
-        content_types.append(self.Event)
-        for item in content_types:
-            if item.slug == slug or (item.slug_alias and slug in item.slug_alias):
-                return item
-        raise ContentTypeNotExist()
+        try:
+            return self._indexes.content_types_by_slug[slug]
+        except KeyError:
+            raise ContentTypeNotExist()
 
     def restricted_allowed_types_slug(self) -> typing.List[str]:
         """
@@ -214,8 +261,7 @@ class ContentTypeList(object):
         "any" slug, dont return content type slug alias , don't return event.
         Useful to restrict slug param in schema.
         """
-        allowed_type_slug = [contents_type.slug for contents_type in self._content_types]
-        return allowed_type_slug
+        return list(self._indexes.restricted_slugs)
 
     def endpoint_allowed_types(self) -> typing.List[ContentType]:
         """
@@ -223,18 +269,14 @@ class ContentTypeList(object):
         ContentType instead of str slug
         and add special content_type included like comments.
         """
-        content_types = self._content_types
-        content_types.extend(self._special_contents_types)
-        return content_types
+        return list(self._indexes.endpoint_content_types)
 
     def endpoint_allowed_types_slug(self) -> typing.List[str]:
         """
         same as endpoint_allowed_types but return str slug
         instead of ContentType
         """
-        content_types = self.endpoint_allowed_types()
-        allowed_type_slug = [contents_type.slug for contents_type in content_types]
-        return allowed_type_slug
+        return list(self._indexes.endpoint_slugs)
 
     def query_allowed_types_slugs(self) -> typing.List[str]:
         """
@@ -242,20 +284,12 @@ class ContentTypeList(object):
         and special content_type like comment. Do not return event.
         Usefull allowed value to perform query to database.
         """
-        allowed_types_slug = []
-        content_types = self._content_types
-        content_types.extend(self._special_contents_types)
-        for content_type in content_types:
-            allowed_types_slug.append(content_type.slug)
-            if content_type.slug_alias:
-                allowed_types_slug.extend(content_type.slug_alias)
-        allowed_types_slug.extend(self._extra_slugs)
-        return allowed_types_slug
+        return list(self._indexes.query_slugs)
 
     def default_allowed_content_properties(self, slug) -> dict:
         content_type = self.get_one_by_slug(slug)
         if content_type.allow_sub_content:
-            sub_content_allowed = self.endpoint_allowed_types_slug()
+            sub_content_allowed = self._indexes.endpoint_slugs
         else:
             sub_content_allowed = [self.Comment.slug]
 
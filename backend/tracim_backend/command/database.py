@@ -4,6 +4,7 @@ import traceback
 
 from depot.manager import DepotManager
 from pyramid.paster import get_appsettings
+from pyramid.scripting import AppEnvironment
 from sqlalchemy.exc import IntegrityError
 import transaction
 
@@ -14,6 +15,7 @@ from tracim_backend.exceptions import ForceArgumentNeeded
 from tracim_backend.fixtures import FixturesLoader
 from tracim_backend.fixtures.content import Content as ContentFixture
 from tracim_backend.fixtures.users_and_groups import Base as BaseFixture
+from tracim_backend.lib.core.content import ContentApi
 from tracim_backend.models.meta import DeclarativeBase
 from tracim_backend.models.setup_models import get_engine
 from tracim_backend.models.setup_models import get_session_factory
@@ -134,3 +136,31 @@ class DeleteDBCommand(AppContextCommand):
             raise ForceArgumentNeeded(
                 "Warning, You should use --force if you really want to" " delete database."
             )
+
+
+class FillFilesMetadataCommand(AppContextCommand):
+    def get_description(self) -> str:
+        return "store size and sha256 of files uploaded before they were computed at upload"
+
+    def take_app_action(self, parsed_args: argparse.Namespace, app_context: AppEnvironment) -> None:
+        self._session = app_context["request"].dbsession
+        self._app_config = app_context["registry"].settings["CFG"]
+        content_api = ContentApi(current_user=None, session=self._session, config=self._app_config)
+        print("Filling files metadata of revisions")
+        updated_count, failed_count = content_api.fill_revisions_file_metadata()
+        print("{} revision(s) updated".format(updated_count))
+        if failed_count:
+            print("Warning! {} revision(s) file not found in depot".format(failed_count))
+
+
+class DeleteUnusedFilesCommand(AppContextCommand):
+    def get_description(self) -> str:
+        return "delete stored files of uploads not kept in any revision"
+
+    def take_app_action(self, parsed_args: argparse.Namespace, app_context: AppEnvironment) -> None:
+        self._session = app_context["request"].dbsession
+        self._app_config = app_context["registry"].settings["CFG"]
+        content_api = ContentApi(current_user=None, session=self._session, config=self._app_config)
+        print("Deleting unused files")
+        deleted_count = content_api.delete_unused_file_blobs()
+        print("{} file(s) deleted".format(deleted_count))
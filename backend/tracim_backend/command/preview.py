@@ -0,0 +1,57 @@
+import argparse
+
+from pyramid.scripting import AppEnvironment
+
+from tracim_backend.command import AppContextCommand
+from tracim_backend.lib.preview.cache import PreviewCache
+
+
+class PreviewCacheReportCommand(AppContextCommand):
+    def get_description(self) -> str:
+        return "report size and number of entries of preview cache"
+
+    def take_app_action(self, parsed_args: argparse.Namespace, app_context: AppEnvironment) -> None:
+        self._app_config = app_context["registry"].settings["CFG"]
+        preview_cache = PreviewCache.from_config(self._app_config)
+        usage = preview_cache.get_usage()
+        print("Preview cache: {}".format(preview_cache.cache_dir))
+        print("{} entries, {} bytes".format(usage.entries_count, usage.size))
+        if preview_cache.max_size:
+            print("Max size: {} bytes".format(preview_cache.max_size))
+        if preview_cache.max_age:
+            print(
+                "{} bytes not used for more than {} seconds".format(
+                    usage.expired_size, preview_cache.max_age
+                )
+            )
+
+
+class PreviewCachePruneCommand(AppContextCommand):
+    def get_description(self) -> str:
+        return "remove least recently used previews according to preview cache max size and max age"
+
+    def get_parser(self, prog_name: str) -> argparse.ArgumentParser:
+        parser = super().get_parser(prog_name)
+        parser.add_argument(
+            "--dry-run",
+            help="only report previews which would be removed",
+            dest="dry_run",
+            required=False,
+            action="store_true",
+            default=False,
+        )
+        return parser
+
+    def take_app_action(self, parsed_args: argparse.Namespace, app_context: AppEnvironment) -> None:
+        self._app_config = app_context["registry"].settings["CFG"]
+        preview_cache = PreviewCache.from_config(self._app_config)
+        removed_entries = preview_cache.prune(dry_run=parsed_args.dry_run)
+        removed_size = sum(entry.size for entry in removed_entries)
+        if parsed_args.dry_run:
+            for entry in removed_entries:
+                print(entry.path)
+            print(
+                "{} entries, {} bytes would be removed".format(len(removed_entries), removed_size)
+            )
+        else:
+            print("{} entries, {} bytes removed".format(len(removed_entries), removed_size))
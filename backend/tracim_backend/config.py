@@ -6,9 +6,11 @@ import typing
 
 from depot.manager import DepotManager
 from paste.deploy.converters import asbool
+from sqlalchemy.engine.url import make_url
 
 from tracim_backend.app_models.applications import Application
 from tracim_backend.app_models.contents import content_status_list
+from tracim_backend.app_models.contents import content_type_list
 from tracim_backend.app_models.validator import update_validators
 from tracim_backend.exceptions import ConfigCodeError
 from tracim_backend.exceptions import ConfigurationError
@@ -25,6 +27,7 @@ from tracim_backend.lib.utils.utils import string_to_list
 from tracim_backend.models.auth import AuthType
 from tracim_backend.models.auth import Group
 from tracim_backend.models.data import ActionDescription
+from tracim_backend.models.data import ContentSearchIndex
 from tracim_backend.models.roles import WorkspaceRoles
 
 ENV_VAR_PREFIX = "TRACIM_"
@@ -180,6 +183,18 @@ class CFG(object):
         self.DEPOT_STORAGE_DIR = self.get_raw_config("depot_storage_dir")
         self.DEPOT_STORAGE_NAME = self.get_raw_config("depot_storage_name")
         self.PREVIEW_CACHE_DIR = self.get_raw_config("preview_cache_dir")
+        self.PREVIEW_CACHE__MAX_SIZE = int(self.get_raw_config("preview_cache.max_size", "0"))
+        self.PREVIEW_CACHE__MAX_AGE = int(self.get_raw_config("preview_cache.max_age", "0"))
+        self.PREVIEW_CACHE__LOCK_TIMEOUT = int(
+            self.get_raw_config("preview_cache.lock_timeout", "300")
+        )
+        self.FILE_SERVING__MODE = self.get_raw_config("file_serving.mode", "app")
+        self.FILE_SERVING__X_ACCEL_REDIRECT__DEPOT_STORAGE_URI = self.get_raw_config(
+            "file_serving.x_accel_redirect.depot_storage_uri"
+        )
+        self.FILE_SERVING__X_ACCEL_REDIRECT__PREVIEW_CACHE_URI = self.get_raw_config(
+            "file_serving.x_accel_redirect.preview_cache_uri"
+        )
 
         self.AUTH_TYPES = string_to_list(
             self.get_raw_config("auth_types", "internal"),
@@ -249,6 +264,20 @@ class CFG(object):
             cast_func=PreviewDim.from_string,
             separator=",",
         )
+        self.PREVIEW__PRE_GENERATION__ENABLED = asbool(
+            self.get_raw_config("preview.pre_generation.enabled", "false")
+        )
+        self.PREVIEW__PRE_GENERATION__PROCESSES = int(
+            self.get_raw_config("preview.pre_generation.processes", "1")
+        )
+        # INFO - 2019-07-26 - secret used to sign preview urls defaults to the
+        # one of session cookies.
+        self.PREVIEW__SIGNED_URL__SECRET = self.get_raw_config(
+            "preview.signed_url.secret", self.settings.get("session.secret"), secret=True
+        )
+        self.PREVIEW__SIGNED_URL__LIFETIME = int(
+            self.get_raw_config("preview.signed_url.lifetime", "300")
+        )
 
         self.FRONTEND__SERVE = asbool(self.get_raw_config("frontend.serve", "false"))
         # INFO - G.M - 2018-08-06 - we pretend that frontend_dist_folder
@@ -540,6 +569,8 @@ class CFG(object):
         self._check_email_config_validity()
         self._check_caldav_config_validity()
         self._check_search_config_validity()
+        self._check_file_serving_config_validity()
+        self._check_preview_config_validity()
 
     def _check_global_config_validity(self) -> None:
         """
@@ -803,12 +834,15 @@ class CFG(object):
         for app_slug in enabled_app_list:
             if app_slug in available_apps.keys():
                 app_list.append(available_apps[app_slug])
+        # INFO - 2019-07-11 - content types are indexed once, indexes must be
+        # rebuilt each time app_list is updated.
+        content_type_list.rebuild()
         # TODO - G.M - 2018-08-08 - We need to update validators each time
         # app_list is updated.
         update_validators()
 
     def _check_search_config_validity(self):
-        search_engine_valid = ["elasticsearch", "simple"]
+        search_engine_valid = ["elasticsearch", "simple", "sql"]
         if self.SEARCH__ENGINE not in search_engine_valid:
 
             search_engine_list_str = ", ".join(
@@ -826,6 +860,61 @@ class CFG(object):
                 when_str="if elasticsearch search feature is enabled",
             )
 
+        if self.SEARCH__ENGINE == "sql":
+            database_dialect = make_url(self.SQLALCHEMY__URL).get_backend_name()
+            if database_dialect not in ContentSearchIndex.SUPPORTED_DIALECTS:
+                raise ConfigurationError(
+                    'ERROR: "sql" search engine is not available with {} database, '
+                    "supported databases are {}.".format(
+                        database_dialect, ", ".join(ContentSearchIndex.SUPPORTED_DIALECTS)
+                    )
+                )
+            if database_dialect == "sqlite" and not ContentSearchIndex.is_sqlite_fts5_available():
+                raise ConfigurationError(
+                    'ERROR: "sql" search engine needs FTS5 extension of SQLite, '
+                    "which is not available in SQLite library used by python."
+                )
+
+    def _check_file_serving_config_validity(self):
+        file_serving_mode_valid = ["app", "x-sendfile", "x-accel-redirect"]
+        if self.FILE_SERVING__MODE not in file_serving_mode_valid:
+            file_serving_mode_list_str = ", ".join(
+                '"{}"'.format(mode) for mode in file_serving_mode_valid
+            )
+            raise ConfigurationError(
+                "ERROR: FILE_SERVING__MODE valid values are {}.".format(file_serving_mode_list_str)
+            )
+        if self.FILE_SERVING__MODE == "x-accel-redirect":
+            self.check_mandatory_param(
+                "FILE_SERVING__X_ACCEL_REDIRECT__DEPOT_STORAGE_URI",
+                self.FILE_SERVING__X_ACCEL_REDIRECT__DEPOT_STORAGE_URI,
+                when_str="if x-accel-redirect file serving mode is used",
+            )
+            self.check_mandatory_param(
+                "FILE_SERVING__X_ACCEL_REDIRECT__PREVIEW_CACHE_URI",
+                self.FILE_SERVING__X_ACCEL_REDIRECT__PREVIEW_CACHE_URI,
+                when_str="if x-accel-redirect file serving mode is used",
+            )
+
+    def _check_preview_config_validity(self) -> None:
+        """
+        Check if config is correctly setted for preview features
+        """
+        if self.PREVIEW__PRE_GENERATION__PROCESSES < 1:
+            raise ConfigurationError(
+                "ERROR: PREVIEW__PRE_GENERATION__PROCESSES should be greater than 0."
+            )
+        if self.PREVIEW__SIGNED_URL__LIFETIME < 1:
+            raise ConfigurationError(
+                "ERROR: PREVIEW__SIGNED_URL__LIFETIME should be greater than 0."
+            )
+        if self.PREVIEW_CACHE__MAX_SIZE < 0:
+            raise ConfigurationError("ERROR: PREVIEW_CACHE__MAX_SIZE should not be negative.")
+        if self.PREVIEW_CACHE__MAX_AGE < 0:
+            raise ConfigurationError("ERROR: PREVIEW_CACHE__MAX_AGE should not be negative.")
+        if self.PREVIEW_CACHE__LOCK_TIMEOUT < 0:
+            raise ConfigurationError("ERROR: PREVIEW_CACHE__LOCK_TIMEOUT should not be negative.")
+
     # INFO - G.M - 2019-04-05 - Others methods
     def _check_consistency(self):
         """
@@ -62,6 +62,9 @@ class ErrorCode(IntEnum):
     EXTERNAL_AUTH_USER_PASSWORD_MODIFICATION_UNALLOWED = 2049
     USER_AUTH_TYPE_DISABLED = 2050
     WORKSPACE_AGENDA_DISABLED = 2051
+    INVALID_SIGNED_PREVIEW_URL = 2052
+    EXPIRED_SIGNED_PREVIEW_URL = 2053
+    SIGNED_PREVIEW_URL_DISABLED = 2054
     # Conflict Error
     USER_ALREADY_EXIST = 3001
     CONTENT_FILENAME_ALREADY_USED_IN_FOLDER = 3002
@@ -395,6 +395,18 @@ class UnavailablePreview(TracimException):
     error_code = ErrorCode.UNAIVALABLE_PREVIEW
 
 
+class InvalidSignedPreviewUrl(TracimException):
+    error_code = ErrorCode.INVALID_SIGNED_PREVIEW_URL
+
+
+class ExpiredSignedPreviewUrl(TracimException):
+    error_code = ErrorCode.EXPIRED_SIGNED_PREVIEW_URL
+
+
+class SignedPreviewUrlDisabled(TracimException):
+    error_code = ErrorCode.SIGNED_PREVIEW_URL_DISABLED
+
+
 class EmptyNotificationError(TracimException):
     pass
 
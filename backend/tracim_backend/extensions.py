@@ -12,4 +12,5 @@ hapic = Hapic(processor_class=MarshmallowProcessor)
 # List is empty until config load apps.
 # If you need to update app_list, think about updating Content validator like
 # all_content_types_validator , see  update_validators() method.
+# Content types indexes must be rebuilt too, see content_type_list.rebuild().
 app_list = []
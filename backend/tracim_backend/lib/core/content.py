@@ -1,29 +1,37 @@
 # -*- coding: utf-8 -*-
 from contextlib import contextmanager
 import datetime
+from io import BytesIO
+import json
 import os
 import re
 import traceback
 import typing
 
+from depot.fields.upload import UploadedFile
 from depot.io.interfaces import StoredFile
 from depot.io.utils import FileIntent
 from depot.manager import DepotManager
 from preview_generator.exception import UnavailablePreviewType
 from preview_generator.exception import UnsupportedMimeType
-from preview_generator.manager import PreviewManager
 import sqlalchemy
+from sqlalchemy import case
 from sqlalchemy import desc
+from sqlalchemy import exists
 from sqlalchemy import func
 from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Query
+from sqlalchemy.orm import aliased
 from sqlalchemy.orm import joinedload
 from sqlalchemy.orm.attributes import QueryableAttribute
 from sqlalchemy.orm.attributes import get_history
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.orm.session import Session
+from sqlalchemy.sql.elements import ColumnElement
 from sqlalchemy.sql.elements import and_
-import transaction
+from sqlalchemy.sql.selectable import Exists
+from zope.sqlalchemy import mark_changed
 
 from tracim_backend.app_models.contents import FOLDER_TYPE
 from tracim_backend.app_models.contents import ContentType
@@ -48,26 +56,40 @@ from tracim_backend.exceptions import UnallowedSubContent
 from tracim_backend.exceptions import UnavailablePreview
 from tracim_backend.exceptions import WorkspacesDoNotMatch
 from tracim_backend.lib.core.notifications import NotifierFactory
+from tracim_backend.lib.core.read_status import ReadStatusApi
 from tracim_backend.lib.core.userworkspace import RoleApi
+from tracim_backend.lib.preview.cache import PreviewCache
+from tracim_backend.lib.preview.generator import enqueue_previews_generation
+from tracim_backend.lib.preview.generator import get_file_preview_metadata
+from tracim_backend.lib.preview.signed_url import JpgPreviewSigner
+from tracim_backend.lib.preview.signed_url import SignedJpgPreview
 from tracim_backend.lib.search.search_factory import SearchFactory
 from tracim_backend.lib.utils.logger import logger
 from tracim_backend.lib.utils.sanitizer import HtmlSanitizer
 from tracim_backend.lib.utils.sanitizer import HtmlSanitizerConfig
 from tracim_backend.lib.utils.translation import Translator
+from tracim_backend.lib.utils.utils import HashingFileStream
 from tracim_backend.lib.utils.utils import cmp_to_key
 from tracim_backend.lib.utils.utils import current_date_for_filename
+from tracim_backend.lib.utils.utils import get_file_size_and_sha256
 from tracim_backend.lib.utils.utils import preview_manager_page_format
 from tracim_backend.models.auth import User
 from tracim_backend.models.context_models import ContentInContext
+from tracim_backend.models.context_models import ContentsInContextBuilder
 from tracim_backend.models.context_models import PreviewAllowedDim
 from tracim_backend.models.context_models import RevisionInContext
 from tracim_backend.models.data import ActionDescription
 from tracim_backend.models.data import Content
+from tracim_backend.models.data import ContentAncestor
+from tracim_backend.models.data import ContentFilename
 from tracim_backend.models.data import ContentRevisionRO
+from tracim_backend.models.data import ContentSearchIndex
+from tracim_backend.models.data import FileBlob
+from tracim_backend.models.data import FilePreviewMetadata
 from tracim_backend.models.data import NodeTreeItem
 from tracim_backend.models.data import UserRoleInWorkspace
 from tracim_backend.models.data import Workspace
-from tracim_backend.models.revision_protection import new_revision
+from tracim_backend.models.meta import insert_ignoring_duplicates
 
 __author__ = "damien"
 
@@ -116,20 +138,10 @@ def compare_tree_items_for_sorting_by_type_and_name(
     return compare_content_for_sorting_by_type_and_name(item1.node, item2.node)
 
 
-class AddCopyRevisionsResult(object):
-    def __init__(
-        self,
-        new_content: Content,
-        new_children_dict: typing.Dict[int, Content],
-        original_children_dict: typing.Dict[int, Content],
-    ) -> None:
-        self.new_content = new_content
-        self.new_children_dict = new_children_dict  # dict key is original content id
-        self.original_children_dict = original_children_dict  # dict key is original content id
-
-
 SEARCH_SEPARATORS = ",| "
 SEARCH_DEFAULT_RESULT_NB = 10
+# INFO - 2019-07-10 - number of rows inserted at once by bulk copy and move
+BULK_CHUNK_SIZE = 500
 
 
 class ContentApi(object):
@@ -168,7 +180,7 @@ class ContentApi(object):
         self._show_all_type_of_contents_in_treeview = all_content_in_treeview
         self._force_show_all_types = force_show_all_types
         self._disable_user_workspaces_filter = disable_user_workspaces_filter
-        self.preview_manager = PreviewManager(self._config.PREVIEW_CACHE_DIR, create_folder=True)
+        self.preview_cache = PreviewCache.from_config(self._config)
         default_lang = None
         if self._user:
             default_lang = self._user.lang
@@ -202,6 +214,17 @@ class ContentApi(object):
     def get_content_in_context(self, content: Content) -> ContentInContext:
         return ContentInContext(content, self._session, self._config, self._user)
 
+    def get_contents_in_context(
+        self, contents: typing.List[Content]
+    ) -> typing.List[ContentInContext]:
+        """
+        Same as get_content_in_context() for each content, but data related to
+        contents are loaded for all contents at once, see ContentsInContextBuilder.
+        """
+        return ContentsInContextBuilder(
+            contents, self._session, self._config, self._user
+        ).get_contents_in_context()
+
     def get_revision_in_context(self, revision: ContentRevisionRO) -> RevisionInContext:
         # TODO - G.M - 2018-06-173 - create revision in context object
         return RevisionInContext(revision, self._session, self._config, self._user)
@@ -213,12 +236,7 @@ class ContentApi(object):
         """
         return and_(
             Content.id == ContentRevisionRO.content_id,
-            ContentRevisionRO.revision_id
-            == self._session.query(ContentRevisionRO.revision_id)
-            .filter(ContentRevisionRO.content_id == Content.id)
-            .order_by(ContentRevisionRO.revision_id.desc())
-            .limit(1)
-            .correlate(Content),
+            ContentRevisionRO.revision_id == Content.current_revision_id,
         )
 
     def get_canonical_query(self) -> Query:
@@ -276,21 +294,31 @@ class ContentApi(object):
 
     def _base_query(self, workspace: Workspace = None) -> Query:
         result = self.__real_base_query(workspace)
+        return result.filter(*self._get_revision_visibility_filters(ContentRevisionRO))
 
+    def _get_revision_visibility_filters(
+        self, revision: typing.Type[ContentRevisionRO]
+    ) -> typing.List[ColumnElement]:
+        """
+        :param revision: ContentRevisionRO or an alias of it
+        :return: filters on revision according to show_active, show_deleted,
+        show_archived and show_temporary settings
+        """
+        filters = []
         if not self._show_active:
-            result = result.filter(
-                or_(Content.is_deleted == True, Content.is_archived == True)
-            )  # noqa: E711
+            filters.append(
+                or_(revision.is_deleted == True, revision.is_archived == True)  # noqa: E712
+            )
         if not self._show_deleted:
-            result = result.filter(Content.is_deleted == False)  # noqa: E711
+            filters.append(revision.is_deleted == False)  # noqa: E712
 
         if not self._show_archived:
-            result = result.filter(Content.is_archived == False)  # noqa: E711
+            filters.append(revision.is_archived == False)  # noqa: E712
 
         if not self._show_temporary:
-            result = result.filter(Content.is_temporary == False)  # noqa: E711
+            filters.append(revision.is_temporary == False)  # noqa: E712
 
-        return result
+        return filters
 
     def __revisions_real_base_query(self, workspace: Workspace = None) -> Query:
         result = self._session.query(ContentRevisionRO)
@@ -401,19 +429,23 @@ class ContentApi(object):
         # with empty filename like comment.
         assert filename
         assert workspace
-        label, file_extension = os.path.splitext(filename)
-        query = self.get_base_query(workspace)
-
-        if parent:
-            query = query.filter(Content.parent_id == parent.content_id)
-        else:
-            query = query.filter(Content.parent_id == None)  # noqa: E711
-
+        # INFO - 2019-07-11 - contents with this file name are found with the
+        # ContentFilename index, the base query only filters them according to
+        # visibility settings of this api.
+        query = (
+            self.get_base_query(workspace)
+            .join(ContentFilename, ContentFilename.content_id == Content.id)
+            .filter(
+                ContentFilename.workspace_id == workspace.workspace_id,
+                ContentFilename.parent_id
+                == ContentFilename.get_parent_key(parent.content_id if parent else None),
+                ContentFilename.file_name_key == ContentFilename.get_file_name_key(filename),
+            )
+        )
         if exclude_content_id:
-            query = query.filter(Content.content_id != exclude_content_id)
-        query = query.filter(Content.workspace_id == workspace.workspace_id)
+            query = query.filter(ContentFilename.content_id != exclude_content_id)
 
-        nb_content_with_the_filename = query.filter(Content.file_name == filename).count()
+        nb_content_with_the_filename = query.count()
         if nb_content_with_the_filename == 0:
             return True
         elif nb_content_with_the_filename == 1:
@@ -600,6 +632,7 @@ class ContentApi(object):
             search_api.index_content(content_in_context)
         except Exception:
             logger.exception(self, "Something goes wrong during indexing of new content")
+        self._pre_generate_previews(content)
 
     def execute_update_content_actions(self, content: Content) -> None:
         """
@@ -620,20 +653,54 @@ class ContentApi(object):
             search_api.index_content(content_in_context)
             # FIXME - G.M - 2019-06-03 - reindex children to avoid trouble when deleting, archiving
             # see https://github.com/tracim/tracim/issues/1833
+            # INFO - 2019-07-10 - children of moved content are reindexed too: their workspace
+            # may have changed.
             if content.last_revision.revision_type in (
                 ActionDescription.DELETION,
                 ActionDescription.ARCHIVING,
                 ActionDescription.UNARCHIVING,
                 ActionDescription.UNDELETION,
+                ActionDescription.MOVE,
             ):
-                for child_content in content.get_children(recursively=True):
-                    child_in_context = ContentInContext(
-                        child_content, config=self._config, dbsession=self._session
-                    )
+                children = content.get_children(recursively=True)
+                for child_in_context in self.get_contents_in_context(children):
                     search_api.index_content(child_in_context)
 
         except Exception:
             logger.exception(self, "Something goes wrong during indexing of content")
+        self._pre_generate_previews(content)
+
+    def _pre_generate_previews(self, content: Content) -> None:
+        """
+        Ask preview generator daemon to generate previews of the file of the
+        new revision of content ahead of their first view, if enabled.
+        """
+        if not self._config.PREVIEW__PRE_GENERATION__ENABLED:
+            return
+        if content.type != content_type_list.File.slug or not content.depot_file:
+            return
+        if content.revision_type not in (ActionDescription.CREATION, ActionDescription.REVISION):
+            return
+        try:
+            enqueue_previews_generation(
+                self._config, content.depot_file.file_id, content.sha256, content.file_extension
+            )
+        except Exception:
+            logger.exception(self, "Something goes wrong during enqueuing of previews generation")
+
+    def execute_copied_content_actions(self, content: Content) -> None:
+        """
+        Post-copy actions: index copied content and all its children at once.
+        """
+        try:
+            search_api = SearchFactory.get_search_lib(
+                current_user=self._user, config=self._config, session=self._session
+            )
+            contents = [content] + content.get_children(recursively=True)
+            for content_in_context in self.get_contents_in_context(contents):
+                search_api.index_content(content_in_context)
+        except Exception:
+            logger.exception(self, "Something goes wrong during indexing of copied content")
 
     def get_one_from_revision(
         self, content_id: int, content_type: str, workspace: Workspace = None, revision_id=None
@@ -742,8 +809,11 @@ class ContentApi(object):
         :param revision_id: The revision id of the filepath we want to return
         :return: The corresponding filepath
         """
+        revision = self.get_one_revision(revision_id)
+        return self._get_revision_filepath(revision)
+
+    def _get_revision_filepath(self, revision: ContentRevisionRO) -> str:
         try:
-            revision = self.get_one_revision(revision_id)
             depot = DepotManager.get()
             depot_stored_file = depot.get(revision.depot_file)  # type: StoredFile
             depot_file_path = depot_stored_file._file_path  # type: str
@@ -811,27 +881,17 @@ class ContentApi(object):
         :return: Found Content
         """
         query = self._base_query(workspace)
-        parent_folder = None
-
-        # Grab content parent folder if parent path given
-        if content_parent_labels:
-            parent_folder = self.get_folder_with_workspace_path_labels(
-                content_parent_labels, workspace
-            )
 
         # Build query for found content by label
         content_query = self.filter_query_for_content_label_as_path(
             query=query, filename=content_label
         )
 
-        # Modify query to apply parent folder filter if any
-        if parent_folder:
-            content_query = content_query.filter(Content.parent_id == parent_folder.content_id)
-        else:
-            content_query = content_query.filter(Content.parent_id == None)  # noqa: E711
-
-        # Filter with workspace
+        # Filter with workspace and parent folders
         content_query = content_query.filter(Content.workspace_id == workspace.workspace_id)
+        content_query = self._filter_query_by_parent_labels(
+            content_query, content_parent_labels or [], workspace
+        )
 
         # Return the content
         try:
@@ -854,30 +914,46 @@ class ContentApi(object):
         :param workspace: workspace of folders
         :return: Content folder
         """
-        query = self._base_query(workspace)
-        folder = None
-
-        for label in path_labels:
-            # Filter query on label
-            folder_query = query.filter(
-                Content.type == content_type_list.Folder.slug,
-                Content.label == label,
-                Content.workspace_id == workspace.workspace_id,
-            )
-
-            # Search into parent folder (if already deep)
-            if folder:
-                folder_query = folder_query.filter(Content.parent_id == folder.content_id)
-            else:
-                folder_query = folder_query.filter(Content.parent_id == None)  # noqa: E711
-
-            # Get thirst corresponding folder
-            try:
-                folder = folder_query.order_by(Content.revision_id.desc()).one()
-            except NoResultFound:
-                raise ContentNotFound("Folder not found")
+        if not path_labels:
+            return None
+        folder_query = self._base_query(workspace).filter(
+            Content.type == content_type_list.Folder.slug,
+            Content.label == path_labels[-1],
+            Content.workspace_id == workspace.workspace_id,
+        )
+        folder_query = self._filter_query_by_parent_labels(
+            folder_query, path_labels[:-1], workspace
+        )
+        try:
+            return folder_query.order_by(Content.revision_id.desc()).one()
+        except NoResultFound:
+            raise ContentNotFound("Folder not found")
 
-        return folder
+    def _filter_query_by_parent_labels(
+        self, query: Query, parent_labels: typing.List[str], workspace: Workspace
+    ) -> Query:
+        """
+        Filter query on contents having given path of parent folders: the whole
+        path is resolved in the same query, with one join per folder.
+        :param parent_labels: Ordered list of labels of parent folders, from
+        workspace root, empty for contents at root of workspace.
+        """
+        child_parent_id = Content.parent_id
+        for label in reversed(parent_labels):
+            folder = aliased(Content)
+            folder_revision = aliased(ContentRevisionRO)
+            query = (
+                query.join(folder, folder.id == child_parent_id)
+                .join(folder_revision, folder_revision.revision_id == folder.current_revision_id)
+                .filter(
+                    folder_revision.type == content_type_list.Folder.slug,
+                    folder_revision.label == label,
+                    folder_revision.workspace_id == workspace.workspace_id,
+                    *self._get_revision_visibility_filters(folder_revision)
+                )
+            )
+            child_parent_id = folder_revision.parent_id
+        return query.filter(child_parent_id == None)  # noqa: E711
 
     # TODO - G.M - 2018-09-04 - [Cleanup] Is this method already needed ?
     def filter_query_for_content_label_as_path(
@@ -912,14 +988,15 @@ class ContentApi(object):
         """
         try:
             file_path = self.get_one_revision_filepath(revision_id)
+            preview_manager = self.preview_cache.get_preview_manager(file_path)
             page_number = preview_manager_page_format(page_number)
-            if page_number >= self.preview_manager.get_page_nb(file_path, file_ext=file_extension):
+            if page_number >= preview_manager.get_page_nb(file_path, file_ext=file_extension):
                 raise PageOfPreviewNotFound(
                     "page_number {page_number} of content {content_id} does not exist".format(
                         page_number=page_number, content_id=content_id
                     )
                 )
-            pdf_preview_path = self.preview_manager.get_pdf_preview(
+            pdf_preview_path = preview_manager.get_pdf_preview(
                 file_path, page=page_number, file_ext=file_extension
             )
         except PageOfPreviewNotFound as exc:
@@ -959,9 +1036,8 @@ class ContentApi(object):
         """
         try:
             file_path = self.get_one_revision_filepath(revision_id)
-            pdf_preview_path = self.preview_manager.get_pdf_preview(
-                file_path, file_ext=file_extension
-            )
+            preview_manager = self.preview_cache.get_preview_manager(file_path)
+            pdf_preview_path = preview_manager.get_pdf_preview(file_path, file_ext=file_extension)
         except UnavailablePreviewType as exc:
             raise TracimUnavailablePreviewType() from exc
         except UnsupportedMimeType as exc:
@@ -1016,30 +1092,16 @@ class ContentApi(object):
         """
         try:
             file_path = self.get_one_revision_filepath(revision_id)
+            preview_manager = self.preview_cache.get_preview_manager(file_path)
             page_number = preview_manager_page_format(page_number)
-            if page_number >= self.preview_manager.get_page_nb(file_path, file_ext=file_extension):
+            if page_number >= preview_manager.get_page_nb(file_path, file_ext=file_extension):
                 raise PageOfPreviewNotFound(
                     "page {page_number} of revision {revision_id} of content {content_id} does not exist".format(
                         page_number=page_number, revision_id=revision_id, content_id=content_id
                     )
                 )
-            if not width and not height:
-                width = self._config.PREVIEW__JPG__ALLOWED_DIMS[0].width
-                height = self._config.PREVIEW__JPG__ALLOWED_DIMS[0].height
-
-            allowed_dim = False
-            for preview_dim in self._config.PREVIEW__JPG__ALLOWED_DIMS:
-                if width == preview_dim.width and height == preview_dim.height:
-                    allowed_dim = True
-                    break
-
-            if not allowed_dim and self._config.PREVIEW__JPG__RESTRICTED_DIMS:
-                raise PreviewDimNotAllowed(
-                    "Size {width}x{height} is not allowed for jpeg preview".format(
-                        width=width, height=height
-                    )
-                )
-            jpg_preview_path = self.preview_manager.get_jpeg_preview(
+            width, height = self._get_allowed_jpg_preview_dim(width, height)
+            jpg_preview_path = preview_manager.get_jpeg_preview(
                 file_path, page=page_number, width=width, height=height, file_ext=file_extension
             )
         except (PreviewDimNotAllowed, PageOfPreviewNotFound) as exc:
@@ -1068,6 +1130,115 @@ class ContentApi(object):
             ) from exc
         return jpg_preview_path
 
+    def _get_allowed_jpg_preview_dim(
+        self, width: typing.Optional[int], height: typing.Optional[int]
+    ) -> typing.Tuple[int, int]:
+        """
+        Check jpg preview dimensions are allowed, default ones are used if
+        none are given.
+        :return: (width, height) of jpg preview
+        """
+        if not width and not height:
+            width = self._config.PREVIEW__JPG__ALLOWED_DIMS[0].width
+            height = self._config.PREVIEW__JPG__ALLOWED_DIMS[0].height
+
+        allowed_dim = False
+        for preview_dim in self._config.PREVIEW__JPG__ALLOWED_DIMS:
+            if width == preview_dim.width and height == preview_dim.height:
+                allowed_dim = True
+                break
+
+        if not allowed_dim and self._config.PREVIEW__JPG__RESTRICTED_DIMS:
+            raise PreviewDimNotAllowed(
+                "Size {width}x{height} is not allowed for jpeg preview".format(
+                    width=width, height=height
+                )
+            )
+        return width, height
+
+    def get_signed_jpg_previews(
+        self,
+        content_ids: typing.List[int],
+        workspace: Workspace,
+        page_number: int,
+        width: int = None,
+        height: int = None,
+    ) -> typing.List[typing.Tuple[Content, typing.Optional[str]]]:
+        """
+        Sign jpg previews of last revision of many file contents at once, see
+        JpgPreviewSigner. Contents, their revisions and preview metadata are
+        loaded for all contents at once.
+        :param content_ids: ids of file contents, other contents are ignored
+        :param workspace: workspace of contents
+        :param page_number: page number of previews, beginning at 1
+        :param width: width in pixel
+        :param height: height in pixel
+        :return: (content, preview token) of each file content found, token
+        is None if content has no preview of this page
+        """
+        signer = JpgPreviewSigner.from_config(self._config)
+        width, height = self._get_allowed_jpg_preview_dim(width, height)
+        contents = []  # type: typing.List[Content]
+        for chunk_ids in self._chunks(content_ids):
+            contents.extend(
+                self._base_query(workspace).filter(
+                    Content.type == content_type_list.File.slug, Content.id.in_(chunk_ids)
+                )
+            )
+        builder = ContentsInContextBuilder(contents, self._session, self._config, self._user)
+        signed_previews = []
+        for content in contents:
+            revision = content.revision
+            preview_metadata = builder.get_preview_metadata(revision)
+            token = None
+            if (
+                preview_metadata
+                and preview_metadata.has_jpeg_preview
+                # INFO - 2019-07-29 - first page exists even if page number
+                # is not known yet, see get_preview_metadata().
+                and page_number <= (preview_metadata.page_nb or 1)
+            ):
+                token = signer.sign(
+                    revision.depot_file.file_id,
+                    revision.file_extension,
+                    page_number,
+                    width,
+                    height,
+                    revision.get_file_etag(),
+                )
+            signed_previews.append((content, token))
+        return signed_previews
+
+    def get_signed_jpg_preview_path(self, preview: SignedJpgPreview) -> str:
+        """
+        Get jpg preview of a signed preview, without any database query.
+        :param preview: preview loaded from its token, see JpgPreviewSigner
+        :return: preview_path as string
+        """
+        try:
+            file_path = DepotManager.get().get(preview.depot_file_id)._file_path
+            preview_manager = self.preview_cache.get_preview_manager(file_path)
+            jpg_preview_path = preview_manager.get_jpeg_preview(
+                file_path,
+                page=preview_manager_page_format(preview.page),
+                width=preview.width,
+                height=preview.height,
+                file_ext=preview.file_extension,
+            )
+        except UnsupportedMimeType as exc:
+            raise UnavailablePreview(
+                "No preview available for file {}".format(preview.depot_file_id)
+            ) from exc
+        except Exception as exc:
+            logger.warning(
+                self, "Unknown Preview_Generator Exception Occured : {}".format(str(exc))
+            )
+            logger.warning(self, traceback.format_exc())
+            raise UnavailablePreview(
+                "No preview available for file {}".format(preview.depot_file_id)
+            ) from exc
+        return jpg_preview_path
+
     def _get_all_query(
         self,
         parent_ids: typing.List[int] = None,
@@ -1103,12 +1274,7 @@ class ContentApi(object):
             content = self.get_one(
                 complete_path_to_id, content_type_list.Any_SLUG, ignore_content_state_filter=True
             )
-            if content.parent_id:
-                content = content.parent
-                while content.parent_id:
-                    parent_ids.append(content.content_id)
-                    content = content.parent
-                parent_ids.append(content.content_id)
+            parent_ids.extend(ancestor.content_id for ancestor in self.get_ancestors(content))
             # TODO - G.M - 2018-11-12 - add workspace root to
             # parent_ids list when complete_path_to_id is set
             parent_ids.append(0)
@@ -1179,6 +1345,26 @@ class ContentApi(object):
             parent_ids, content_type, workspace, label, order_by_properties, complete_path_to_id
         ).all()
 
+    def get_all_with_revision(
+        self,
+        parent_ids: typing.List[int] = None,
+        content_type: str = content_type_list.Any_SLUG,
+        workspace: Workspace = None,
+    ) -> typing.List[typing.Tuple[Content, ContentRevisionRO]]:
+        """
+        Same as get_all, but each content comes with its current revision,
+        loaded by the same query.
+        :param parent_ids: filter by parent_id
+        :param content_type: filter by content_type slug
+        :param workspace: filter by workspace
+        :return: List of (content, current revision) tuples
+        """
+        return (
+            self._get_all_query(parent_ids, content_type, workspace)
+            .add_entity(ContentRevisionRO)
+            .all()
+        )
+
     # TODO - G.M - 2018-07-17 - [Cleanup] Drop this method if unneeded
     # def get_children(self, parent_id: int, content_types: list, workspace: Workspace=None) -> typing.List[Content]:
     #     """
@@ -1285,9 +1471,9 @@ class ContentApi(object):
         :return: list of content
         """
 
-        resultset = self._get_all_query(workspace=workspace)
+        items = self._get_all_query(workspace=workspace)
         if content_ids:
-            resultset = resultset.filter(
+            items = items.filter(
                 or_(
                     Content.content_id.in_(content_ids),
                     and_(
@@ -1296,47 +1482,49 @@ class ContentApi(object):
                     ),
                 )
             )
-
-        resultset = resultset.order_by(
-            desc(ContentRevisionRO.updated),
-            desc(ContentRevisionRO.revision_id),
-            desc(ContentRevisionRO.content_id),
+        # INFO - 2019-07-03 - activity of a comment is activity of its parent:
+        # compute last update of each content (itself or one of its comments)
+        # in database.
+        active_content_id = case(
+            [(Content.type == content_type_list.Comment.slug, Content.parent_id)], else_=Content.id
+        )
+        items = items.with_entities(
+            active_content_id.label("content_id"), ContentRevisionRO.updated.label("updated")
+        ).subquery()
+        last_activity = (
+            self._session.query(items.c.content_id, func.max(items.c.updated).label("updated"))
+            .group_by(items.c.content_id)
+            .subquery()
+        )
+        # INFO - 2019-07-03 - general filters are applied again to the active
+        # contents to avoid issue with comments
+        resultset = self._get_all_query(workspace=workspace).join(
+            last_activity, Content.id == last_activity.c.content_id
         )
 
-        active_contents = []
-        too_recent_content = []
-        before_content_find = False
-        for content in resultset:
-            related_active_content = None
-            if content_type_list.Comment.slug == content.type:
-                related_active_content = content.parent
-            else:
-                related_active_content = content
-
-            # INFO - G.M - 2018-08-10 - re-apply general filters here to avoid
-            # issue with comments
-            if not self._show_deleted and related_active_content.is_deleted:
-                continue
-            if not self._show_archived and related_active_content.is_archived:
-                continue
-
-            if (
-                related_active_content not in active_contents
-                and related_active_content not in too_recent_content
-            ):
-
-                if not before_content or before_content_find:
-                    active_contents.append(related_active_content)
-                else:
-                    too_recent_content.append(related_active_content)
-
-                if before_content and related_active_content == before_content:
-                    before_content_find = True
-
-            if limit and len(active_contents) >= limit:
-                break
+        # INFO - 2019-07-03 - keyset pagination on (last update, content_id)
+        if before_content:
+            before_content_updated = (
+                self._session.query(last_activity.c.updated)
+                .filter(last_activity.c.content_id == before_content.content_id)
+                .scalar()
+            )
+            if before_content_updated is None:
+                return []
+            resultset = resultset.filter(
+                or_(
+                    last_activity.c.updated < before_content_updated,
+                    and_(
+                        last_activity.c.updated == before_content_updated,
+                        Content.id < before_content.content_id,
+                    ),
+                )
+            )
 
-        return active_contents
+        resultset = resultset.order_by(desc(last_activity.c.updated), desc(Content.id))
+        if limit:
+            resultset = resultset.limit(limit)
+        return resultset.all()
 
     def _set_allowed_content(self, content: Content, allowed_content_dict: dict) -> Content:
         """
@@ -1462,28 +1650,13 @@ class ContentApi(object):
             )
         item.revision_type = ActionDescription.MOVE
 
-    def _get_allowed_content_type(
-        self, allowed_content_dict: typing.Dict[str, str]
-    ) -> typing.List[ContentType]:
-        allowed_content_type = []  # type: typing.List[ContentType]
-        for slug, value in allowed_content_dict.items():
-            if value:
-                try:
-                    content_type = content_type_list.get_one_by_slug(slug)
-                    allowed_content_type.append(content_type)
-                except ContentTypeNotExist:
-                    pass
-        return allowed_content_type
-
     def _check_valid_content_type_in_dir(
         self, content_type: ContentType, parent: Content, workspace: Workspace
     ) -> None:
         if parent:
             assert workspace == parent.workspace
-            if parent.properties and "allowed_content" in parent.properties:
-                if content_type not in self._get_allowed_content_type(
-                    parent.properties["allowed_content"]
-                ):
+            if "allowed_content" in parent.revision.get_parsed_properties():
+                if content_type not in parent.revision.get_allowed_content_types():
                     raise UnallowedSubContent(
                         " SubContent of type {subcontent_type}  not allowed in content {content_id}".format(
                             subcontent_type=content_type.slug, content_id=parent.content_id
@@ -1501,7 +1674,7 @@ class ContentApi(object):
         if new_parent:
             if content.content_id == new_parent.content_id:
                 raise ConflictingMoveInItself("You can't move a content into itself")
-            if new_parent in content.get_children(recursively=True):
+            if new_parent in content.get_subtree():
                 raise ConflictingMoveInChild("You can't move a content into one of its children")
 
     def copy(
@@ -1516,10 +1689,12 @@ class ContentApi(object):
     ) -> Content:
         """
         Copy all content, revision and children included (children are included
-        recursively).
+        recursively). Copy is done in bulk, see _copy(). Indexing of copied
+        contents is left to execute_copied_content_actions().
         :param item: Item to copy
         :param new_parent: new parent of the new copied item
         :param new_label: new label of the new copied item
+        :param do_save: mark copied contents read by current user
         :param do_notify: notify copy or not
         :return: Newly copied item
         """
@@ -1572,152 +1747,198 @@ class ContentApi(object):
                 "and a valid filename".format(item.content_id, content_type_slug)
             )
 
-        copy_result = self._copy(item, parent)
-        copy_result = self._add_copy_revisions(
-            item,
-            copy_result.new_content,
-            copy_result.original_children_dict,
-            copy_result.new_children_dict,
-            parent,
-            label,
-            workspace,
-            file_extension,
-            do_save,
-            do_notify,
-        )
-        return copy_result.new_content
+        new_content = self._copy(item, parent, label, workspace, file_extension)
+        if do_save:
+            self.mark_read(new_content, do_flush=False)
+        if do_notify:
+            self.do_notify(new_content)
+        return new_content
 
-    def _copy(self, content: Content, new_parent: Content = None) -> AddCopyRevisionsResult:
+    def _copy(
+        self,
+        content: Content,
+        new_parent: typing.Optional[Content],
+        new_label: str,
+        new_workspace: Workspace,
+        new_file_extension: str,
+    ) -> Content:
         """
         Create new content for content and his children, recreate all revision in order and
-        return all these new content
+        add a "copy" revision to each new content. New contents are created with one flush and
+        revisions are inserted in batches without the ORM: copied revisions use the same depot
+        files as original ones instead of uploading a copy of each file.
         :param content: original root content of copy
         :param new_parent: new parent of root content of copy
-        :return: new content created based on original root content,
-        dict of new children content and original children content with original content id as key.
-        """
-        new_content = Content()
-        # INFO - G.M - 2019-04-30 - we store all children content created and old content id of them
-        # to be able to retrieve them for applying new revisions on them easily. key of dict is
-        # original content_id.
-        new_content_children = {}  # type: typing.Dict[int,Content]
-        # INFO - G.M - 2019-04-30 - we store alse old content of children to allow applying new
-        # revision related to old data. key of dict is original content id.
-        original_content_children = {}  # type: typing.Dict[int,Content]
-
-        for rev in content.get_tree_revisions():
-            if rev.content_id == content.content_id:
-                related_content = new_content
-                related_parent = new_parent
+        :param new_label: new label of root content of copy
+        :param new_workspace: workspace of all new contents
+        :param new_file_extension: new file extension of root content of copy
+        :return: new content created based on original root content
+        """
+        self._session.flush()
+        subtree = content.get_subtree()
+        original_contents = [content] + subtree.get_descendants()
+        new_contents = {original.content_id: Content() for original in original_contents}
+        self._session.add_all(new_contents.values())
+        self._session.flush()
+        new_ids = {original_id: new.id for original_id, new in new_contents.items()}
+        current_parent_ids = {
+            original.content_id: original.parent_id for original in original_contents
+        }
+        new_parent_id = new_parent.content_id if new_parent else None
+
+        revision_rows = []  # type: typing.List[typing.Dict[str, typing.Any]]
+        last_revision_rows = {}  # type: typing.Dict[int, typing.Dict[str, typing.Any]]
+        for revision in subtree.get_tree_revisions():
+            row = self._get_revision_row(revision)
+            row["content_id"] = new_ids[revision.content_id]
+            if revision.content_id == content.content_id:
+                row["parent_id"] = new_parent_id
             else:
-                # INFO - G.M - 2019-04-30 - if we retrieve a revision without a new content related yet
-                # we create it.
-                if rev.content_id not in new_content_children:
-                    new_content_children[rev.content_id] = Content()
-                    original_content_children[rev.content_id] = rev.node
-                related_content = new_content_children[rev.content_id]  # type: Content
-                if rev.parent_id == content.content_id:
-                    related_parent = new_content
-                else:
-                    related_parent = new_content_children[rev.parent_id]
-            # INFO - G.M - 2019-04-30 - copy of revision itself.
-            cpy_rev = ContentRevisionRO.copy(rev, related_parent)
-            related_content.revisions.append(cpy_rev)
-            self._session.add(related_content)
-            self._session.flush()
-        return AddCopyRevisionsResult(
-            new_content=new_content,
-            new_children_dict=new_content_children,
-            original_children_dict=original_content_children,
-        )
+                # INFO - 2019-07-10 - old revisions of a content moved into the copied tree
+                # have a parent outside of it, use copy of its current parent instead.
+                row["parent_id"] = new_ids.get(
+                    revision.parent_id, new_ids[current_parent_ids[revision.content_id]]
+                )
+            revision_rows.append(row)
+            last_revision_rows[revision.content_id] = row
 
-    def _add_copy_revisions(
-        self,
-        original_content: Content,
-        new_content: Content,
-        original_content_children,
-        new_content_children,
-        new_parent: Content = None,
-        new_label: str = None,
-        new_workspace: Workspace = None,
-        new_file_extension: str = None,
-        do_save: bool = True,
-        do_notify: bool = True,
-    ) -> AddCopyRevisionsResult:
-        """
-        Add copy revision for all new content
-        :param original_content: original content of root content in copy
-        :param new_content: new content of new root content in copy
-        :param original_content_children: original contents of children of root content in copy
-        :param new_content_children: new contents of children of root content in copy
-        :param new_parent: new parent of root content
-        :param new_label: new label of root content
-        :param new_workspace: new workspace all new content
-        :param new_file_extension: new file_extension for root content
-        :return: new content created based on root content,
-        dict of new children content and original children content with original content id as key.
-        """
-        for original_content_id, new_child in new_content_children.items():
-            original_child = original_content_children[original_content_id]
-            with new_revision(
-                session=self._session,
-                tm=transaction.manager,
-                content=new_child,
-                force_create_new_revision=True,
-            ) as rev:
-                rev.workspace = new_workspace
-                rev.revision_type = ActionDescription.COPY
-                properties = rev.properties.copy()
-                properties["origin"] = {
-                    "content": original_child.id,
-                    "revision": original_child.last_revision.revision_id,
-                }
-                rev.properties = properties
-            self.save(new_child, ActionDescription.COPY, do_notify=False)
-        with new_revision(
-            session=self._session,
-            tm=transaction.manager,
-            content=new_content,
-            force_create_new_revision=True,
-        ) as rev:
-            if self._user:
-                rev.owner = self._user
-            rev.parent = new_parent
-            rev.workspace = new_workspace
-            rev.label = new_label
-            rev.file_extension = new_file_extension
-            rev.revision_type = ActionDescription.COPY
-            properties = rev.properties.copy()
+        copy_datetime = datetime.datetime.utcnow()
+        for original in original_contents:
+            row = dict(last_revision_rows[original.content_id])
+            properties = original.properties.copy()
             properties["origin"] = {
-                "content": original_content.id,
-                "revision": original_content.last_revision.revision_id,
+                "content": original.id,
+                "revision": original.last_revision.revision_id,
             }
-            rev.properties = properties
-        if do_save:
-            self.save(new_content, ActionDescription.COPY, do_notify=do_notify)
-        return AddCopyRevisionsResult(
-            new_content=new_content,
-            new_children_dict=new_content_children,
-            original_children_dict=original_content_children,
+            row["properties"] = json.dumps(properties, default=dict)
+            row["revision_type"] = ActionDescription.COPY
+            row["workspace_id"] = new_workspace.workspace_id
+            # INFO - 2019-07-10 - copies are new contents: only their history keeps
+            # dates of original revisions.
+            row["created"] = copy_datetime
+            row["updated"] = copy_datetime
+            if original is content:
+                if self._user:
+                    row["owner_id"] = self._user.user_id
+                row["parent_id"] = new_parent_id
+                row["label"] = new_label
+                row["file_extension"] = new_file_extension
+            revision_rows.append(row)
+
+        ancestor_rows = []  # type: typing.List[typing.Dict[str, int]]
+        for original in original_contents:
+            depth = 0
+            ancestor_id = original.content_id
+            while True:
+                ancestor_rows.append(
+                    {
+                        "ancestor_id": new_ids[ancestor_id],
+                        "descendant_id": new_ids[original.content_id],
+                        "depth": depth,
+                    }
+                )
+                if ancestor_id == content.content_id:
+                    break
+                ancestor_id = current_parent_ids[ancestor_id]
+                depth += 1
+
+        self._insert_revision_rows(revision_rows, list(new_ids.values()))
+        for rows in self._chunks(ancestor_rows):
+            self._session.execute(ContentAncestor.__table__.insert(), rows)
+        if new_parent_id:
+            ContentAncestor.link_subtree(
+                self._session.connection(), new_ids[content.content_id], new_parent_id
+            )
+        # INFO - 2019-07-10 - new contents were completed without the ORM
+        for new_content in new_contents.values():
+            self._session.expire(new_content)
+        return new_contents[content.content_id]
+
+    def _insert_revision_rows(
+        self,
+        revision_rows: typing.List[typing.Dict[str, typing.Any]],
+        content_ids: typing.List[int],
+    ) -> None:
+        """
+        Insert revisions in batches without the ORM, then update current revision,
+        file name index, search index and file blob references of given contents
+        accordingly.
+        """
+        revisions_table = ContentRevisionRO.__table__
+        content_table = Content.__table__
+        for rows in self._chunks(revision_rows):
+            self._session.execute(revisions_table.insert(), rows)
+            ContentFilename.update_contents(self._session.connection(), rows)
+            if ContentSearchIndex.is_enabled(self._session.connection()):
+                ContentSearchIndex.update_contents(self._session.connection(), rows)
+            FileBlob.update_ref_counts(self._session.connection(), rows)
+        last_revision_id = (
+            sqlalchemy.select([func.max(revisions_table.c.revision_id)])
+            .where(revisions_table.c.content_id == content_table.c.id)
+            .as_scalar()
         )
+        for chunk_ids in self._chunks(content_ids):
+            self._session.execute(
+                content_table.update()
+                .where(content_table.c.id.in_(chunk_ids))
+                .values(current_revision_id=last_revision_id)
+            )
 
-    def _move_children_content_to_new_workspace(self, item: Content, new_workspace: Workspace):
+    def _get_revision_row(self, revision: ContentRevisionRO) -> typing.Dict[str, typing.Any]:
+        """
+        :return: values of all columns of revision except its id, as used to insert a copy
+        of it. depot_file is kept as is: the copy shares the same stored file.
+        """
+        return {
+            column.name: getattr(revision, column.name)
+            for column in ContentRevisionRO.__table__.columns
+            if column.name != "revision_id"
+        }
+
+    def _chunks(self, values: typing.List[typing.Any]) -> typing.Iterator[typing.List[typing.Any]]:
+        for start in range(0, len(values), BULK_CHUNK_SIZE):
+            end = start + BULK_CHUNK_SIZE
+            yield values[start:end]
+
+    def _move_children_content_to_new_workspace(
+        self, item: Content, new_workspace: typing.Optional[Workspace]
+    ) -> None:
         """
         Change workspace_id of all children of content according to new_workspace
-        given. This is needed for proper move from one workspace to another
-        """
-        for child in item.children:
-            if child.workspace_id != new_workspace.workspace_id:
-                with new_revision(session=self._session, tm=transaction.manager, content=child):
-                    self.move(
-                        child,
-                        new_parent=item,
-                        new_workspace=new_workspace,
-                        must_stay_in_same_workspace=False,
-                    )
-                    self.save(child)
-                self._move_children_content_to_new_workspace(child, new_workspace)
-        return
+        given. This is needed for proper move from one workspace to another.
+        A "move" revision is added to all children at once with batched inserts,
+        then children are marked read by current user. Only content is notified,
+        its children are indexed with it, see execute_update_content_actions().
+        """
+        if not new_workspace:
+            return
+        self._session.flush()
+        children = [
+            child
+            for child in item.get_subtree().get_descendants()
+            if child.workspace_id != new_workspace.workspace_id
+        ]
+        if not children:
+            return
+        move_datetime = datetime.datetime.utcnow()
+        revision_rows = []  # type: typing.List[typing.Dict[str, typing.Any]]
+        for child in children:
+            row = self._get_revision_row(child.revision)
+            row["workspace_id"] = new_workspace.workspace_id
+            row["revision_type"] = ActionDescription.MOVE
+            row["updated"] = move_datetime
+            if self._user:
+                row["owner_id"] = self._user.user_id
+            revision_rows.append(row)
+        children_ids = [child.content_id for child in children]
+        self._insert_revision_rows(revision_rows, children_ids)
+        # INFO - 2019-07-10 - new revisions were added without the ORM
+        for child in children:
+            self._session.expire(child)
+        if self._user:
+            ReadStatusApi(
+                session=self._session, current_user=self._user, config=self._config
+            ).mark_contents_read(children_ids)
 
     def is_editable(self, item: Content) -> bool:
         return not item.is_readonly and item.is_active and item.get_status().is_editable()
@@ -1834,10 +2055,132 @@ class ContentApi(object):
             )
         item.file_name = new_filename
         item.file_mimetype = new_mimetype
-        item.depot_file = FileIntent(new_content, new_filename, new_mimetype)
+        # INFO - 2019-07-18 - size and hash are computed while the file is
+        # stored, so that reading them does not need to open the stored file.
+        item.depot_file, item.size, item.sha256 = self._store_file_blob(
+            new_content, new_filename, new_mimetype
+        )
         item.revision_type = ActionDescription.REVISION
         return item
 
+    def _store_file_blob(
+        self, file_content: typing.Union[bytes, typing.BinaryIO], filename: str, mimetype: str
+    ) -> typing.Tuple[UploadedFile, int, str]:
+        """
+        Store file content in a new blob, unless a blob with the same content
+        already exists: identical files are only kept once.
+        File content is read once, from its current position, and hashed while
+        it is written to depot, so that streams are stored with constant memory.
+        :return: depot file of a revision referring to the blob, file size,
+        file sha256
+        """
+        if isinstance(file_content, bytes):
+            file_content = BytesIO(file_content)
+        file_stream = HashingFileStream(file_content)
+        uploaded_file = UploadedFile(FileIntent(file_stream, filename, mimetype))
+        size, sha256 = file_stream.size, file_stream.sha256
+        blob = self._session.query(FileBlob).get(sha256)
+        if blob is None:
+            # INFO - 2019-07-26 - the same new file can be uploaded by
+            # concurrent requests: the first one inserts the blob, others
+            # use it. Blob must exist before revisions referring to it are
+            # inserted to count them, see FileBlob.update_ref_counts().
+            insert_ignoring_duplicates(
+                self._session.connection(),
+                FileBlob.__table__,
+                {"sha256": sha256, "size": size, "depot_file": uploaded_file},
+            )
+            mark_changed(self._session)
+            # INFO - 2019-07-26 - locking read to get the blob inserted by a
+            # concurrent transaction whatever the isolation level.
+            blob = (
+                self._session.query(FileBlob)
+                .filter(FileBlob.sha256 == sha256)
+                .with_for_update()
+                .one()
+            )
+            if blob.depot_file.file_id == uploaded_file.file_id:
+                FileBlob.add_new_file(self._session, uploaded_file)
+            else:
+                uploaded_file.depot.delete(uploaded_file.file_id)
+            return blob.get_shared_file(), size, sha256
+        if blob.depot_file.depot.exists(blob.depot_file.file_id):
+            # INFO - 2019-07-18 - same content is already stored, file just
+            # uploaded is not referred to by anything yet.
+            uploaded_file.depot.delete(uploaded_file.file_id)
+            return blob.get_shared_file(), size, sha256
+        else:
+            logger.warning(
+                self, "File of blob {} not found in depot, storing it again".format(sha256)
+            )
+        blob.depot_file = uploaded_file
+        self._session.flush([blob])
+        return blob.get_shared_file(), size, sha256
+
+    def delete_unused_file_blobs(self) -> int:
+        """
+        Delete blobs no revision refers to, like blobs of uploads not kept in
+        any revision, see tracimcli db delete-unused-files. Their files are
+        removed from depot once the transaction is committed.
+        :return: number of deleted blobs
+        """
+        unused_blobs = self._session.query(FileBlob).filter(FileBlob.ref_count <= 0).all()
+        for blob in unused_blobs:
+            self._session.delete(blob)
+        return len(unused_blobs)
+
+    def fill_revisions_file_metadata(self) -> typing.Tuple[int, int]:
+        """
+        Store size and sha256 of files of revisions uploaded before they were
+        computed at upload, reading each stored file once. Revisions are updated
+        by batches without the ORM, as they are immutable.
+        :return: number of updated revisions, number of revisions whose file
+        is not available in depot
+        """
+        revisions_table = ContentRevisionRO.__table__
+        updated_count = 0
+        failed_count = 0
+        last_revision_id = 0
+        while True:
+            revisions = (
+                self._session.query(ContentRevisionRO.revision_id, ContentRevisionRO.depot_file)
+                .filter(ContentRevisionRO.revision_id > last_revision_id)
+                .filter(ContentRevisionRO.depot_file != None)  # noqa: E711
+                .filter(
+                    or_(
+                        ContentRevisionRO.size == None,  # noqa: E711
+                        ContentRevisionRO.sha256 == None,  # noqa: E711
+                    )
+                )
+                .order_by(ContentRevisionRO.revision_id)
+                .limit(BULK_CHUNK_SIZE)
+                .all()
+            )
+            if not revisions:
+                break
+            for revision_id, depot_file in revisions:
+                last_revision_id = revision_id
+                try:
+                    with depot_file.file as file_content:
+                        size, sha256 = get_file_size_and_sha256(file_content)
+                except IOError:
+                    logger.warning(
+                        self, "File of revision {} not found in depot".format(revision_id)
+                    )
+                    failed_count += 1
+                    continue
+                self._session.execute(
+                    revisions_table.update()
+                    .where(revisions_table.c.revision_id == revision_id)
+                    .values(size=size, sha256=sha256)
+                )
+                updated_count += 1
+        # INFO - 2019-07-16 - updates done without the ORM must be notified to
+        # transaction manager to be committed.
+        if updated_count:
+            mark_changed(self._session)
+        return updated_count, failed_count
+
     def archive(self, content: Content):
         if self._user:
             content.owner = self._user
@@ -1858,6 +2201,7 @@ class ContentApi(object):
         content.revision_type = ActionDescription.ARCHIVING
 
     def unarchive(self, content: Content):
+        self._check_filename_of_restored_content(content)
         if self._user:
             content.owner = self._user
         content.is_archived = False
@@ -1883,62 +2227,51 @@ class ContentApi(object):
         content.revision_type = ActionDescription.DELETION
 
     def undelete(self, content: Content):
+        self._check_filename_of_restored_content(content)
         if self._user:
             content.owner = self._user
         content.is_deleted = False
         content.revision_type = ActionDescription.UNDELETION
 
-    def get_preview_page_nb(self, revision_id: int, file_extension: str) -> typing.Optional[int]:
-        try:
-            file_path = self.get_one_revision_filepath(revision_id)
-            nb_pages = self.preview_manager.get_page_nb(file_path, file_ext=file_extension)
-        except UnsupportedMimeType:
+    def get_preview_metadata(
+        self, revision: ContentRevisionRO, build_page_nb: bool = True
+    ) -> typing.Optional[FilePreviewMetadata]:
+        """
+        Get page number and preview availability of the file of a revision:
+        stored ones if any, else computed with preview manager without
+        storing them, see FilePreviewMetadata.
+        :param revision: revision of a file content
+        :param build_page_nb: if False, page number is only computed if
+        known without building a preview, like in listings, else None
+        :return: preview metadata, None if revision has no file or if they
+        can't be computed
+        """
+        if not revision.depot_file:
             return None
-        except RevisionFilePathSearchFailedDepotCorrupted as exc:
-            logger.warning(
-                self, "Unable to get revision filepath, depot is corrupted: {}".format(str(exc))
+        if revision.sha256:
+            stored_preview_metadata = self._session.query(FilePreviewMetadata).get(
+                (revision.sha256, revision.file_extension)
             )
-            logger.warning(self, traceback.format_exc())
-            return None
-        except Exception as e:
-            logger.warning(self, "Unknown Preview_Generator Exception Occured : {}".format(str(e)))
-            logger.warning(self, traceback.format_exc())
-            return None
-        return nb_pages
-
-    def has_pdf_preview(self, revision_id: int, file_extension: str) -> bool:
+            if stored_preview_metadata:
+                return stored_preview_metadata
         try:
-            file_path = self.get_one_revision_filepath(revision_id)
-            return self.preview_manager.has_pdf_preview(file_path, file_ext=file_extension)
-        except UnsupportedMimeType:
-            return False
-        except RevisionFilePathSearchFailedDepotCorrupted as exc:
-            logger.warning(
-                self, "Unable to get revision filepath, depot is corrupted: {}".format(str(exc))
+            file_path = self._get_revision_filepath(revision)
+            return get_file_preview_metadata(
+                self.preview_cache.get_preview_manager(file_path),
+                revision.sha256,
+                file_path,
+                revision.file_extension,
+                build_page_nb=build_page_nb,
             )
-            logger.warning(self, traceback.format_exc())
-            return False
-        except Exception as e:
-            logger.warning(self, "Unknown Preview_Generator Exception Occured : {}".format(str(e)))
-            logger.warning(self, traceback.format_exc())
-            return False
-
-    def has_jpeg_preview(self, revision_id: int, file_extension: str) -> bool:
-        try:
-            file_path = self.get_one_revision_filepath(revision_id)
-            return self.preview_manager.has_jpeg_preview(file_path, file_ext=file_extension)
-        except UnsupportedMimeType:
-            return False
         except RevisionFilePathSearchFailedDepotCorrupted as exc:
             logger.warning(
                 self, "Unable to get revision filepath, depot is corrupted: {}".format(str(exc))
             )
             logger.warning(self, traceback.format_exc())
-            return False
         except Exception as e:
             logger.warning(self, "Unknown Preview_Generator Exception Occured : {}".format(str(e)))
             logger.warning(self, traceback.format_exc())
-            return False
+        return None
 
     def mark_read__all(
         self, read_datetime: datetime = None, do_flush: bool = True, recursive: bool = True
@@ -1966,10 +2299,12 @@ class ContentApi(object):
         :param recursive: mark read subcontent too
         :return: nothing
         """
-        itemset = self.get_last_active(workspace)
-        for item in itemset:
-            if item.has_new_information_for(self._user):
-                self.mark_read(item, read_datetime, do_flush, recursive)
+        content_ids = self._get_all_query(workspace=workspace).with_entities(Content.id)
+        if not recursive:
+            content_ids = content_ids.filter(Content.type != content_type_list.Comment.slug)
+        ReadStatusApi(
+            session=self._session, current_user=self._user, config=self._config
+        ).mark_contents_read(content_ids, read_datetime=read_datetime)
 
     def mark_read(
         self,
@@ -1987,44 +2322,9 @@ class ContentApi(object):
         """
         assert self._user
         assert content
-
-        # The algorithm is:
-        # 1. define the read datetime
-        # 2. update all revisions related to current Content
-        # 3. do the same for all child revisions
-        #    (ie parent_id is content_id of current content)
-
-        if not read_datetime:
-            read_datetime = datetime.datetime.now()
-
-        viewed_revisions = (
-            self._session.query(ContentRevisionRO)
-            .filter(ContentRevisionRO.content_id == content.content_id)
-            .all()
-        )
-
-        for revision in viewed_revisions:
-            revision.read_by[self._user] = read_datetime
-
-        if recursive:
-            # mark read :
-            # - all children
-            # - parent stuff (if you mark a comment as read,
-            #                 then you have seen the parent)
-            # - parent comments
-            for child in content.get_valid_children():
-                self.mark_read(child, read_datetime=read_datetime, do_flush=False)
-
-            if content_type_list.Comment.slug == content.type:
-                self.mark_read(
-                    content.parent, read_datetime=read_datetime, do_flush=False, recursive=False
-                )
-                for comment in content.parent.get_comments():
-                    if comment != content:
-                        self.mark_read(
-                            comment, read_datetime=read_datetime, do_flush=False, recursive=False
-                        )
-
+        ReadStatusApi(
+            session=self._session, current_user=self._user, config=self._config
+        ).mark_read(content, read_datetime=read_datetime, recursive=recursive)
         if do_flush:
             self.flush()
 
@@ -2033,22 +2333,9 @@ class ContentApi(object):
     def mark_unread(self, content: Content, do_flush=True) -> Content:
         assert self._user
         assert content
-
-        revisions = (
-            self._session.query(ContentRevisionRO)
-            .filter(ContentRevisionRO.content_id == content.content_id)
-            .all()
-        )
-
-        for revision in revisions:
-            try:
-                del revision.read_by[self._user]
-            except KeyError:
-                pass
-
-        for child in content.get_valid_children():
-            self.mark_unread(child, do_flush=False)
-
+        ReadStatusApi(
+            session=self._session, current_user=self._user, config=self._config
+        ).mark_unread(content)
         if do_flush:
             self.flush()
 
@@ -2057,6 +2344,88 @@ class ContentApi(object):
     def flush(self):
         self._session.flush()
 
+    def _check_filename_of_new_revision(self, content: Content) -> None:
+        """
+        Check file name of a content is available before its new revision is
+        flushed, if this revision makes the content active with another file
+        name or in another folder: ContentFilename index unicity is then never
+        violated at flush except for concurrent writes.
+        """
+        revisions = content.revisions
+        if not revisions or revisions[-1].revision_id is not None:
+            return
+        revision_values = self._get_file_name_values(revisions[-1])
+        parent = revisions[-1].__dict__.get("parent")
+        if parent is not None and parent.content_id is None:
+            # INFO - 2019-07-26 - content of a new folder
+            return
+        row = ContentFilename.get_row(revision_values)
+        if not row or not row["is_active"]:
+            return
+        if len(revisions) > 1:
+            previous_row = ContentFilename.get_row(self._get_file_name_values(revisions[-2]))
+            if previous_row == row:
+                return
+        # INFO - 2019-07-26 - new revision must not be flushed by the query.
+        with self._session.no_autoflush:
+            self._is_filename_available_or_raise(
+                self._prepare_filename(
+                    revision_values["label"] or "", revision_values["file_extension"] or ""
+                ),
+                content.workspace,
+                content.parent,
+                exclude_content_id=content.content_id,
+            )
+
+    def _check_filename_of_restored_content(self, content: Content) -> None:
+        """
+        Check file name of a content restored from trash or archive is not
+        used by another active content of its folder since it was hidden.
+        Only active contents are searched, whatever the visibility settings
+        of this api, like the unique constraint of ContentFilename.
+        """
+        if content.type == content_type_list.Comment.slug or not content.file_name:
+            return
+        filename_used = (
+            self._session.query(ContentFilename.content_id)
+            .filter(
+                ContentFilename.workspace_id == content.workspace_id,
+                ContentFilename.parent_id == ContentFilename.get_parent_key(content.parent_id),
+                ContentFilename.file_name_key
+                == ContentFilename.get_file_name_key(content.file_name),
+                ContentFilename.is_active == True,  # noqa: E712
+                ContentFilename.content_id != content.content_id,
+            )
+            .first()
+        )
+        if filename_used:
+            raise self._get_filename_already_used_error(content.file_name, content.workspace_id)
+
+    def _get_filename_already_used_error(
+        self, filename: str, workspace_id: int
+    ) -> ContentFilenameAlreadyUsedInFolder:
+        return ContentFilenameAlreadyUsedInFolder(
+            "A Content already exist with the same filename {filename} "
+            "in workspace {workspace_id}".format(filename=filename, workspace_id=workspace_id)
+        )
+
+    def _get_file_name_values(self, revision: ContentRevisionRO) -> typing.Dict[str, typing.Any]:
+        # INFO - 2019-07-26 - workspace and parent can be set with
+        # relationships only before flush, they are used when loaded.
+        workspace = revision.__dict__.get("workspace")
+        parent = revision.__dict__.get("parent")
+        return {
+            "content_id": revision.content_id,
+            "workspace_id": workspace.workspace_id if workspace else revision.workspace_id,
+            "parent_id": parent.content_id if parent else revision.parent_id,
+            "type": revision.type,
+            "label": revision.label,
+            "file_extension": revision.file_extension,
+            "is_deleted": revision.is_deleted,
+            "is_archived": revision.is_archived,
+            "is_temporary": revision.is_temporary,
+        }
+
     def save(self, content: Content, action_description: str = None, do_flush=True, do_notify=True):
         """
         Save an object, flush the session and set the revision_type property
@@ -2080,6 +2449,8 @@ class ContentApi(object):
         if action_description:
             content.revision_type = action_description
 
+        self._check_filename_of_new_revision(content)
+
         if do_flush:
             # INFO - 2015-09-03 - D.A.
             # There are 2 flush because of the use
@@ -2090,7 +2461,17 @@ class ContentApi(object):
             # to get full real data from database before to be prepared.
 
             self._session.add(content)
-            self._session.flush()
+            # INFO - 2019-07-29 - content can't be read anymore once flush failed.
+            filename = content.file_name
+            workspace_id = content.workspace.workspace_id if content.workspace else None
+            try:
+                self._session.flush()
+            except IntegrityError as exc:
+                # INFO - 2019-07-29 - file name checked above but used by a
+                # concurrent write meanwhile.
+                if ContentFilename.__tablename__ not in str(exc.orig):
+                    raise
+                raise self._get_filename_already_used_error(filename, workspace_id) from exc
 
             # TODO - 2015-09-03 - D.A. - Do not use triggers
             # We should create a new ContentRevisionRO object instead of Content
@@ -2141,12 +2522,6 @@ class ContentApi(object):
         for content in query:
             if len(results) >= size:
                 break
-            if not self._show_deleted:
-                if self.get_deleted_parent_id(content):
-                    continue
-            if not self._show_archived:
-                if self.get_archived_parent_id(content):
-                    continue
             if content.type == content_type_list.Comment.slug:
                 # INFO - G.M - 2019-06-13 -  filter by content_types of parent for comment
                 # if correct content_type, content is parent.
@@ -2164,6 +2539,45 @@ class ContentApi(object):
 
         return results, current_offset
 
+    def full_text_search(
+        self,
+        search_string: str,
+        size: int = SEARCH_DEFAULT_RESULT_NB,
+        offset: int = 0,
+        content_types: typing.Optional[typing.List[str]] = None,
+    ) -> typing.Tuple[typing.List[typing.Tuple[Content, float]], int]:
+        """
+        Search contents with the full-text index of database, see
+        ContentSearchIndex: contents are ranked, filtered and paginated in
+        database, a content being found once even if many of its comments match.
+        :param search_string: words to search, each one being a prefix of a
+        word of found contents
+        :return: page of found contents with their score, most relevant first,
+        and total number of found contents
+        """
+        search_terms = ContentSearchIndex.get_search_terms(search_string)
+        if not search_terms:
+            return [], 0
+        matches = ContentSearchIndex.get_matches(
+            self._session.get_bind().dialect.name, search_terms
+        )
+        query = self.get_base_query(None).join(matches, matches.c.content_id == Content.id)
+        if content_types:
+            query = query.filter(Content.type.in_(content_types))
+        if not self._show_deleted:
+            query = query.filter(~self._get_hidden_ancestor_exists("is_deleted"))
+        if not self._show_archived:
+            query = query.filter(~self._get_hidden_ancestor_exists("is_archived"))
+        total_hits = query.count()
+        results = (
+            query.add_columns(matches.c.score)
+            .order_by(desc(matches.c.score), desc(Content.updated), desc(Content.content_id))
+            .offset(offset)
+            .limit(size)
+            .all()
+        )
+        return [(content, score) for content, score in results], total_hits
+
     def _search_query(
         self, keywords: typing.List[str], content_types: typing.Optional[typing.List[str]] = None
     ) -> Query:
@@ -2198,6 +2612,17 @@ class ContentApi(object):
                 Content.type.in_(searched_content_types)
             )
 
+        # INFO - 2019-07-09 - contents hidden through one of their ancestors are
+        # filtered out in database with the ancestors closure table.
+        if not self._show_deleted:
+            title_keyworded_items = title_keyworded_items.filter(
+                ~self._get_hidden_ancestor_exists("is_deleted")
+            )
+        if not self._show_archived:
+            title_keyworded_items = title_keyworded_items.filter(
+                ~self._get_hidden_ancestor_exists("is_archived")
+            )
+
         return title_keyworded_items
 
     def get_all_types(self) -> typing.List[ContentType]:
@@ -2208,21 +2633,60 @@ class ContentApi(object):
 
         return content_types
 
+    def get_ancestors(self, content: Content) -> typing.List[Content]:
+        """
+        Get all ancestors of content, from its parent to the root one.
+        """
+        return (
+            self._session.query(Content)
+            .join(ContentAncestor, ContentAncestor.ancestor_id == Content.id)
+            .filter(ContentAncestor.descendant_id == content.content_id, ContentAncestor.depth > 0)
+            .order_by(ContentAncestor.depth)
+            .all()
+        )
+
     def get_deleted_parent_id(self, content: Content) -> typing.Optional[int]:
-        if content.parent:
-            if content.parent.is_deleted:
-                return content.parent_id
-            if content.parent.parent:
-                return self.get_deleted_parent_id(content.parent)
-        return 0
+        return self._get_hidden_parent_id(content, "is_deleted")
 
     def get_archived_parent_id(self, content: Content) -> typing.Optional[int]:
-        if content.parent:
-            if content.parent.is_archived:
-                return content.parent_id
-            if content.parent.parent:
-                return self.get_archived_parent_id(content.parent)
-        return 0
+        return self._get_hidden_parent_id(content, "is_archived")
+
+    def _get_hidden_parent_id(self, content: Content, hidden_field: str) -> int:
+        """
+        :return: id of nearest ancestor of content having hidden_field
+        ("is_deleted" or "is_archived") set, 0 if there is none.
+        """
+        parent_id = (
+            self._session.query(ContentAncestor.ancestor_id)
+            .join(Content, Content.id == ContentAncestor.ancestor_id)
+            .join(ContentRevisionRO, ContentRevisionRO.revision_id == Content.current_revision_id)
+            .filter(
+                ContentAncestor.descendant_id == content.content_id,
+                ContentAncestor.depth > 0,
+                getattr(ContentRevisionRO, hidden_field) == True,  # noqa: E712
+            )
+            .order_by(ContentAncestor.depth)
+            .limit(1)
+            .scalar()
+        )
+        return parent_id or 0
+
+    def _get_hidden_ancestor_exists(self, hidden_field: str) -> Exists:
+        """
+        :return: EXISTS clause, true if one ancestor of content has hidden_field
+        ("is_deleted" or "is_archived") set.
+        """
+        ancestor = aliased(Content)
+        ancestor_revision = aliased(ContentRevisionRO)
+        return exists().where(
+            and_(
+                ContentAncestor.descendant_id == Content.id,
+                ContentAncestor.depth > 0,
+                ancestor.id == ContentAncestor.ancestor_id,
+                ancestor_revision.revision_id == ancestor.current_revision_id,
+                getattr(ancestor_revision, hidden_field) == True,  # noqa: E712
+            )
+        )
 
     # TODO - G.M - 2018-07-24 - [Cleanup] Is this method already needed ?
     def find_one_by_unique_property(
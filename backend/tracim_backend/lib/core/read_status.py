@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+import datetime
+import typing
+
+from sqlalchemy import DateTime
+from sqlalchemy import and_
+from sqlalchemy import exists
+from sqlalchemy import func
+from sqlalchemy import inspect
+from sqlalchemy import literal
+from sqlalchemy import select
+from sqlalchemy.orm import Query
+from sqlalchemy.orm import Session
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql.elements import ColumnElement
+
+from tracim_backend.app_models.contents import content_type_list
+from tracim_backend.config import CFG
+from tracim_backend.models.auth import User
+from tracim_backend.models.data import Content
+from tracim_backend.models.data import ContentRevisionRO
+from tracim_backend.models.data import ContentSubtree
+from tracim_backend.models.data import RevisionReadStatus
+
+
+class ReadStatusApi(object):
+    """
+    Set-based read status of contents for a user: revisions are marked
+    read/unread with INSERT ... SELECT/UPDATE/DELETE statements on
+    revision_read_status, instead of one ORM object per revision.
+    """
+
+    CONTENT_IDS_CHUNK_SIZE = 500
+
+    def __init__(self, session: Session, current_user: typing.Optional[User], config: CFG) -> None:
+        self._session = session
+        self._user = current_user
+        self._config = config
+
+    def mark_read(
+        self, content: Content, read_datetime: datetime.datetime = None, recursive: bool = True
+    ) -> None:
+        """
+        Mark all revisions of content read. If recursive, do the same for
+        all valid children of content recursively, and if content is a comment,
+        for its parent and others comments of its parent.
+        """
+        content_ids = [content.content_id]
+        if recursive:
+            content_ids.extend(self._get_valid_descendant_ids(content))
+            # INFO - 2019-07-04 - if you mark a comment as read,
+            # then you have seen the parent and its others comments
+            if content_type_list.Comment.slug == content.type and content.parent_id:
+                content_ids.append(content.parent_id)
+                content_ids.extend(comment.content_id for comment in content.parent.get_comments())
+        self.mark_contents_read(content_ids, read_datetime)
+
+    def mark_contents_read(
+        self,
+        content_ids: typing.Union[typing.List[int], Query],
+        read_datetime: datetime.datetime = None,
+    ) -> None:
+        """
+        Mark all revisions of given contents read, updating read date of
+        already read ones
+        :param content_ids: list or query of content ids
+        :param read_datetime: date of reading
+        """
+        assert self._user
+        read_datetime = read_datetime or datetime.datetime.now()
+        # INFO - 2019-07-04 - statements below are not run through the ORM,
+        # pending changes must be in database before.
+        self._session.flush()
+        read_status = RevisionReadStatus.__table__
+        for content_ids_filter in self._get_content_ids_filters(content_ids):
+            self._session.execute(
+                read_status.update()
+                .where(
+                    and_(
+                        read_status.c.user_id == self._user.user_id,
+                        read_status.c.revision_id.in_(
+                            select([ContentRevisionRO.revision_id]).where(content_ids_filter)
+                        ),
+                    )
+                )
+                .values(view_datetime=read_datetime)
+            )
+            already_read = exists().where(
+                and_(
+                    read_status.c.revision_id == ContentRevisionRO.revision_id,
+                    read_status.c.user_id == self._user.user_id,
+                )
+            )
+            self._session.execute(
+                read_status.insert().from_select(
+                    ["revision_id", "user_id", "view_datetime"],
+                    select(
+                        [
+                            ContentRevisionRO.revision_id,
+                            literal(self._user.user_id),
+                            literal(read_datetime, DateTime),
+                        ]
+                    ).where(and_(content_ids_filter, ~already_read)),
+                )
+            )
+            self._expire_read_status(content_ids_filter)
+
+    def mark_unread(self, content: Content) -> None:
+        """
+        Mark all revisions of content and of all its valid children
+        recursively unread.
+        """
+        content_ids = [content.content_id]
+        content_ids.extend(self._get_valid_descendant_ids(content))
+        self.mark_contents_unread(content_ids)
+
+    def mark_contents_unread(self, content_ids: typing.Union[typing.List[int], Query]) -> None:
+        """
+        Mark all revisions of given contents unread
+        :param content_ids: list or query of content ids
+        """
+        assert self._user
+        self._session.flush()
+        read_status = RevisionReadStatus.__table__
+        for content_ids_filter in self._get_content_ids_filters(content_ids):
+            self._session.execute(
+                read_status.delete().where(
+                    and_(
+                        read_status.c.user_id == self._user.user_id,
+                        read_status.c.revision_id.in_(
+                            select([ContentRevisionRO.revision_id]).where(content_ids_filter)
+                        ),
+                    )
+                )
+            )
+            self._expire_read_status(content_ids_filter)
+
+    def get_read_by_user(self, content_ids: typing.List[int]) -> typing.Dict[int, bool]:
+        """
+        Get read status of many contents at once, same as
+        "not content.has_new_information_for(user)" for each of them: a content
+        is read if current revisions of content and of all its valid children
+        recursively are read by user.
+        :param content_ids: list of content ids
+        :return: dict of read status with content id as key
+        """
+        assert self._user
+        self._session.flush()
+        content_ids = sorted(set(content_ids))
+        read_by_user = {}  # type: typing.Dict[int, bool]
+        for start in range(0, len(content_ids), self.CONTENT_IDS_CHUNK_SIZE):
+            end = start + self.CONTENT_IDS_CHUNK_SIZE
+            if ContentSubtree.supports_recursive_cte(self._session):
+                read_by_user.update(self._get_read_by_user(content_ids[start:end]))
+            else:
+                read_by_user.update(self._get_read_by_user_by_level(content_ids[start:end]))
+        return read_by_user
+
+    def _get_read_by_user(self, content_ids: typing.List[int]) -> typing.Dict[int, bool]:
+        # INFO - 2019-07-05 - (root_id, content_id) for given contents and all
+        # their valid children recursively.
+        tree = (
+            self._session.query(Content.id.label("root_id"), Content.id.label("content_id"))
+            .filter(Content.id.in_(content_ids))
+            .cte(name="read_tree", recursive=True)
+        )
+        child_content = aliased(Content, name="child_content")
+        child_revision = aliased(ContentRevisionRO, name="child_revision")
+        tree = tree.union(
+            self._session.query(tree.c.root_id, child_content.id)
+            .select_from(tree)
+            .join(child_revision, child_revision.parent_id == tree.c.content_id)
+            .join(child_content, child_content.current_revision_id == child_revision.revision_id)
+            .filter(
+                child_revision.is_deleted == False,  # noqa: E712
+                child_revision.is_archived == False,  # noqa: E712
+            )
+        )
+        result = (
+            self._session.query(
+                tree.c.root_id,
+                func.count(tree.c.content_id),
+                func.count(RevisionReadStatus.revision_id),
+            )
+            .select_from(tree)
+            .join(Content, Content.id == tree.c.content_id)
+            .outerjoin(
+                RevisionReadStatus,
+                and_(
+                    RevisionReadStatus.revision_id == Content.current_revision_id,
+                    RevisionReadStatus.user_id == self._user.user_id,
+                ),
+            )
+            .group_by(tree.c.root_id)
+        )
+        return {
+            root_id: contents_count == read_contents_count
+            for root_id, contents_count, read_contents_count in result
+        }
+
+    def _get_read_by_user_by_level(self, content_ids: typing.List[int]) -> typing.Dict[int, bool]:
+        # INFO - 2019-07-05 - roots of each content of the trees, loaded with
+        # one query per depth level.
+        roots_by_content_id = {content_id: {content_id} for content_id in content_ids}
+        next_level = dict(roots_by_content_id)
+        while next_level:
+            children = (
+                self._session.query(Content.id, ContentRevisionRO.parent_id)
+                .join(
+                    ContentRevisionRO, ContentRevisionRO.revision_id == Content.current_revision_id
+                )
+                .filter(
+                    ContentRevisionRO.parent_id.in_(next_level.keys()),
+                    ContentRevisionRO.is_deleted == False,  # noqa: E712
+                    ContentRevisionRO.is_archived == False,  # noqa: E712
+                )
+            )
+            level = next_level
+            next_level = {}
+            for child_id, parent_id in children:
+                new_roots = level[parent_id] - roots_by_content_id.get(child_id, set())
+                if new_roots:
+                    roots_by_content_id.setdefault(child_id, set()).update(new_roots)
+                    next_level.setdefault(child_id, set()).update(new_roots)
+
+        read_content_ids = {
+            row[0]
+            for row in self._session.query(Content.id)
+            .join(
+                RevisionReadStatus,
+                and_(
+                    RevisionReadStatus.revision_id == Content.current_revision_id,
+                    RevisionReadStatus.user_id == self._user.user_id,
+                ),
+            )
+            .filter(Content.id.in_(roots_by_content_id.keys()))
+        }
+        existing_content_ids = {
+            row[0] for row in self._session.query(Content.id).filter(Content.id.in_(content_ids))
+        }
+        read_by_user = {content_id: True for content_id in existing_content_ids}
+        for content_id, root_ids in roots_by_content_id.items():
+            if content_id not in read_content_ids:
+                for root_id in root_ids & existing_content_ids:
+                    read_by_user[root_id] = False
+        return read_by_user
+
+    def _get_valid_descendant_ids(self, content: Content) -> typing.List[int]:
+        # INFO - 2019-07-04 - descendant ids are loaded instead of being used
+        # as subquery: MySQL doesn't accept a CTE before an INSERT statement.
+        return ContentSubtree.get_descendant_ids(self._session, content.content_id, valid_only=True)
+
+    def _get_content_ids_filters(
+        self, content_ids: typing.Union[typing.List[int], Query]
+    ) -> typing.Iterator[ColumnElement]:
+        """
+        Filter on content_revisions for given content ids. Lists are
+        split into chunks to keep the number of bound parameters low.
+        """
+        if isinstance(content_ids, Query):
+            yield ContentRevisionRO.content_id.in_(content_ids.subquery())
+            return
+        content_ids = sorted(set(content_ids))
+        for start in range(0, len(content_ids), self.CONTENT_IDS_CHUNK_SIZE):
+            end = start + self.CONTENT_IDS_CHUNK_SIZE
+            yield ContentRevisionRO.content_id.in_(content_ids[start:end])
+
+    def _expire_read_status(self, content_ids_filter: ColumnElement) -> None:
+        """
+        Read status of revisions matching filter were changed without the ORM:
+        expire those already loaded in session.
+        """
+        revision_mapper = inspect(ContentRevisionRO)
+        read_status_mapper = inspect(RevisionReadStatus)
+        identity_map = self._session.identity_map
+        revision_ids = self._session.execute(
+            select([ContentRevisionRO.revision_id]).where(content_ids_filter)
+        )
+        for (revision_id,) in revision_ids:
+            revision = identity_map.get(
+                revision_mapper.identity_key_from_primary_key([revision_id])
+            )
+            if revision is not None:
+                self._session.expire(revision, ["revision_read_statuses"])
+            read_status = identity_map.get(
+                read_status_mapper.identity_key_from_primary_key([revision_id, self._user.user_id])
+            )
+            if read_status is not None:
+                self._session.expire(read_status)
+        if self._user in self._session:
+            self._session.expire(self._user, ["revision_readers"])
@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+from contextlib import contextmanager
+import hashlib
+import os
+import shutil
+import time
+import typing
+
+import filelock
+from preview_generator.manager import PreviewManager
+from preview_generator.preview.builder.document__scribus import DocumentPreviewBuilderScribus
+from preview_generator.preview.builder.office__libreoffice import OfficePreviewBuilderLibreoffice
+from preview_generator.preview.generic_preview import OnePagePreviewBuilder
+from preview_generator.preview.generic_preview import PreviewBuilder
+from preview_generator.utils import ImgDims
+
+from tracim_backend.config import CFG
+from tracim_backend.lib.utils.logger import logger
+
+# INFO - 2019-07-24 - length of shard directories names, see
+# PreviewCache.get_file_cache_dir().
+SHARD_NAME_LENGTH = 2
+PREVIEW_LOCK_FILE_NAME = "previews.lock"
+# INFO - 2019-07-25 - last use of cache directories is updated at most once
+# an hour when previews are found in cache, enough for eviction by max age.
+DEFAULT_USE_MARK_INTERVAL = 3600
+
+
+class SingleFlightPreviewManager(PreviewManager):
+    """
+    Preview manager of a single file building its previews one at a time,
+    across processes and across nodes sharing the preview cache: concurrent
+    requests wait for the one building a preview then reuse it from cache.
+
+    Lock is held for all previews of the file as previews of office
+    documents are all built from one pdf conversion of the whole document.
+    Previews already in cache are returned without taking the lock: cache
+    directory is only created and locked to build a missing preview.
+
+    Cached preview paths are computed like PreviewManager does, with its
+    _get_file_hash() naming of previews.
+    """
+
+    def __init__(self, cache_folder_path: str, lock_timeout: int, use_mark_interval: int) -> None:
+        """
+        :param cache_folder_path: directory where previews of the file are stored
+        :param lock_timeout: max time in seconds to wait for another process
+        building a preview, preview is then built without waiting more
+        :param use_mark_interval: min time in seconds between two updates of
+        last use of cache directory when previews are found in cache
+        """
+        super().__init__(cache_folder_path, create_folder=False)
+        self.use_mark_interval = use_mark_interval
+        self._lock = filelock.FileLock(
+            os.path.join(self.cache_path, PREVIEW_LOCK_FILE_NAME), timeout=lock_timeout
+        )
+
+    def get_page_nb(self, file_path: str, file_ext: str = "") -> int:
+        page_nb = self.get_cached_page_nb(file_path, file_ext=file_ext)
+        if page_nb is not None:
+            self._mark_used()
+            return page_nb
+        with self._single_flight(None):
+            return super().get_page_nb(file_path, file_ext=file_ext)
+
+    def get_cached_page_nb(self, file_path: str, file_ext: str = "") -> typing.Optional[int]:
+        """
+        Get page number of the file if it is known without building any
+        preview: for one page files, or once page number is in cache.
+        :return: page number, None if unknown
+        """
+        builder = self._get_builder(file_path, file_ext)
+        page_nb_path = "{}{}_page_nb".format(self.cache_path, self._get_file_hash(file_path))
+        if not isinstance(builder, OnePagePreviewBuilder) and not os.path.exists(page_nb_path):
+            return None
+        try:
+            return super().get_page_nb(file_path, file_ext=file_ext)
+        except (OSError, ValueError):
+            # INFO - 2019-07-29 - page number file removed by a concurrent
+            # prune or still being written.
+            return None
+
+    def get_jpeg_preview(
+        self,
+        file_path: str,
+        page: int = -1,
+        width: int = None,
+        height: int = 256,
+        force: bool = False,
+        file_ext: str = "",
+    ) -> str:
+        preview_path = None
+        if not force:
+            source_path = file_path
+            builder = self._get_builder(file_path, file_ext)
+            if type(builder) in (OfficePreviewBuilderLibreoffice, DocumentPreviewBuilderScribus):
+                source_path = self._get_pdf_preview_path(file_path, page=-1)
+            size = ImgDims(width=width or height, height=height)
+            preview_path = os.path.join(
+                self.cache_path, "{}.jpeg".format(self._get_file_hash(source_path, size, page))
+            )
+        with self._single_flight(preview_path):
+            return super().get_jpeg_preview(
+                file_path, page=page, width=width, height=height, force=force, file_ext=file_ext
+            )
+
+    def get_pdf_preview(
+        self, file_path: str, page: int = -1, force: bool = False, file_ext: str = ""
+    ) -> str:
+        preview_path = None
+        if not force:
+            preview_path = self._get_pdf_preview_path(file_path, page)
+        with self._single_flight(preview_path):
+            return super().get_pdf_preview(file_path, page=page, force=force, file_ext=file_ext)
+
+    def _get_builder(self, file_path: str, file_ext: str) -> PreviewBuilder:
+        mimetype = self._factory.get_file_mimetype(file_path, file_ext)
+        return self._factory.get_preview_builder(mimetype)
+
+    def _get_pdf_preview_path(self, file_path: str, page: int) -> str:
+        return "{}{}.pdf".format(self.cache_path, self._get_file_hash(file_path, page=page))
+
+    @contextmanager
+    def _single_flight(
+        self, preview_path: typing.Optional[str]
+    ) -> typing.Generator[None, None, None]:
+        """
+        Build a preview while holding the lock of the cache directory, unless
+        preview_path already exists.
+        """
+        if preview_path and os.path.exists(preview_path):
+            self._mark_used()
+            yield
+            return
+        # INFO - 2019-07-25 - lock is reentrant: jpeg previews of office
+        # documents get their pdf preview while holding it.
+        if not self._acquire_lock():
+            yield
+            self._mark_used(force=True)
+            return
+        try:
+            yield
+        finally:
+            self._lock.release()
+        self._mark_used(force=True)
+
+    def _acquire_lock(self) -> bool:
+        """
+        Create cache directory and lock it.
+        :return: False if lock timeout expired, True if lock is held
+        """
+        while True:
+            os.makedirs(self.cache_path, exist_ok=True)
+            try:
+                self._lock.acquire()
+            except filelock.Timeout as exc:
+                logger.warning(
+                    self, "Preview lock timeout, building preview anyway: {}".format(str(exc))
+                )
+                return False
+            except FileNotFoundError:
+                # INFO - 2019-07-25 - directory removed by a concurrent prune.
+                continue
+            if os.path.isdir(self.cache_path):
+                return True
+            # INFO - 2019-07-25 - directory removed by a prune holding the lock
+            # while we waited for it.
+            self._lock.release()
+
+    def _mark_used(self, force: bool = False) -> None:
+        """
+        Update last use of cache directory, at most once per use_mark_interval
+        unless forced.
+        """
+        try:
+            if not force and os.stat(self.cache_path).st_mtime > (
+                time.time() - self.use_mark_interval
+            ):
+                return
+            os.utime(self.cache_path)
+        except OSError:
+            # INFO - 2019-07-24 - directory may be removed by a concurrent
+            # prune, previews will be generated again.
+            pass
+
+
+class PreviewCacheEntry(object):
+    """
+    Previews of a file stored in preview cache, evicted together. Files and
+    directories at the root of preview cache (like previews stored by older
+    tracim versions) are entries too.
+    """
+
+    def __init__(self, path: str, size: int, last_used: float) -> None:
+        """
+        :param path: path of the entry directory or file
+        :param size: size in bytes of all files of the entry
+        :param last_used: timestamp of last use of the entry
+        """
+        self.path = path
+        self.size = size
+        self.last_used = last_used
+
+
+class PreviewCacheUsage(object):
+    """
+    Usage of preview cache, see PreviewCache.get_usage().
+    """
+
+    def __init__(self, entries_count: int, size: int, expired_size: int) -> None:
+        """
+        :param entries_count: number of entries in cache
+        :param size: size in bytes of all entries
+        :param expired_size: size in bytes of entries not used since max age
+        """
+        self.entries_count = entries_count
+        self.size = size
+        self.expired_size = expired_size
+
+
+class PreviewCache(object):
+    """
+    Preview cache directory with a size budget.
+
+    Previews of each file are stored in their own directory, sharded in
+    two levels of sub-directories named after a hash of the file path
+    (like "ab/cd/abcd…") to keep directories small. Use of the previews of
+    a file updates the modification time of their directory: entries are
+    evicted by prune() when not used since max age, then least recently
+    used first until the cache fits in its max size.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_size: int = 0,
+        max_age: int = 0,
+        lock_timeout: int = 300,
+        use_mark_interval: int = DEFAULT_USE_MARK_INTERVAL,
+    ) -> None:
+        """
+        :param cache_dir: preview cache directory
+        :param max_size: max size of cache in bytes, 0 for unlimited
+        :param max_age: max time in seconds an entry is kept since its last
+        use, 0 for unlimited
+        :param lock_timeout: max time in seconds to wait for a preview being
+        built by another process, see SingleFlightPreviewManager
+        :param use_mark_interval: min time in seconds between two updates of
+        last use of a file cache directory when its previews are found in cache
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_age = max_age
+        self.lock_timeout = lock_timeout
+        self.use_mark_interval = use_mark_interval
+
+    @classmethod
+    def from_config(cls, config: CFG) -> "PreviewCache":
+        return cls(
+            config.PREVIEW_CACHE_DIR,
+            max_size=config.PREVIEW_CACHE__MAX_SIZE,
+            max_age=config.PREVIEW_CACHE__MAX_AGE,
+            lock_timeout=config.PREVIEW_CACHE__LOCK_TIMEOUT,
+        )
+
+    def get_file_cache_dir(self, file_path: str) -> str:
+        """
+        Get directory where previews of given file are stored.
+        """
+        key = hashlib.sha256(file_path.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key[0:2], key[2:4], key)
+
+    def get_preview_manager(self, file_path: str) -> SingleFlightPreviewManager:
+        """
+        Get preview manager storing previews of given file in their own
+        directory, created when a preview is built.
+        """
+        return SingleFlightPreviewManager(
+            self.get_file_cache_dir(file_path),
+            lock_timeout=self.lock_timeout,
+            use_mark_interval=self.use_mark_interval,
+        )
+
+    def get_entries(self) -> typing.List[PreviewCacheEntry]:
+        """
+        Get all entries of preview cache.
+        """
+        entries = []
+        for path in self._list_dir(self.cache_dir):
+            if not self._is_shard_dir(path):
+                entries.append(self._get_entry(path))
+                continue
+            for sub_shard_path in self._list_dir(path):
+                if not self._is_shard_dir(sub_shard_path):
+                    entries.append(self._get_entry(sub_shard_path))
+                    continue
+                for entry_path in self._list_dir(sub_shard_path):
+                    entries.append(self._get_entry(entry_path))
+        return entries
+
+    def get_usage(self, now: typing.Optional[float] = None) -> PreviewCacheUsage:
+        """
+        Get number of entries and size of preview cache.
+        :param now: current timestamp, used to find entries older than max age
+        """
+        now = now or time.time()
+        entries = self.get_entries()
+        return PreviewCacheUsage(
+            entries_count=len(entries),
+            size=sum(entry.size for entry in entries),
+            expired_size=sum(entry.size for entry in entries if self._is_expired(entry, now)),
+        )
+
+    def prune(
+        self, now: typing.Optional[float] = None, dry_run: bool = False
+    ) -> typing.List[PreviewCacheEntry]:
+        """
+        Remove entries not used since max age, then least recently used
+        entries until cache size is lower than max size.
+        :param now: current timestamp, used to find entries older than max age
+        :param dry_run: only return entries which would be removed
+        :return: removed entries
+        """
+        now = now or time.time()
+        entries = sorted(self.get_entries(), key=lambda entry: entry.last_used)
+        size = sum(entry.size for entry in entries)
+        removed_entries = []
+        for entry in entries:
+            too_big = self.max_size and size > self.max_size
+            # INFO - 2019-07-24 - entries are sorted by last use: next ones
+            # are neither expired if this one is not.
+            if not too_big and not self._is_expired(entry, now):
+                break
+            if not dry_run and not self._remove_entry(entry):
+                continue
+            size -= entry.size
+            removed_entries.append(entry)
+        if not dry_run:
+            self._remove_empty_shard_dirs()
+        return removed_entries
+
+    def _is_expired(self, entry: PreviewCacheEntry, now: float) -> bool:
+        return bool(self.max_age) and entry.last_used < now - self.max_age
+
+    def _is_shard_dir(self, path: str) -> bool:
+        return len(os.path.basename(path)) == SHARD_NAME_LENGTH and os.path.isdir(path)
+
+    def _list_dir(self, dir_path: str) -> typing.List[str]:
+        try:
+            return [os.path.join(dir_path, name) for name in os.listdir(dir_path)]
+        except OSError:
+            return []
+
+    def _get_entry(self, path: str) -> PreviewCacheEntry:
+        try:
+            last_used = os.stat(path).st_mtime
+        except OSError:
+            last_used = 0
+        if not os.path.isdir(path):
+            return PreviewCacheEntry(path, self._get_file_size(path), last_used)
+        size = 0
+        for dir_path, _, file_names in os.walk(path):
+            for file_name in file_names:
+                size += self._get_file_size(os.path.join(dir_path, file_name))
+        return PreviewCacheEntry(path, size, last_used)
+
+    def _get_file_size(self, file_path: str) -> int:
+        try:
+            return os.path.getsize(file_path)
+        except OSError:
+            return 0
+
+    def _remove_entry(self, entry: PreviewCacheEntry) -> bool:
+        """
+        Remove entry, unless a preview of it is being built.
+        :return: True if entry was removed
+        """
+        if not os.path.isdir(entry.path):
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+            return True
+        lock = filelock.FileLock(os.path.join(entry.path, PREVIEW_LOCK_FILE_NAME), timeout=0)
+        try:
+            lock.acquire()
+        except (filelock.Timeout, OSError):
+            # INFO - 2019-07-25 - preview being built (or directory just removed
+            # by another prune).
+            return False
+        try:
+            shutil.rmtree(entry.path, ignore_errors=True)
+        finally:
+            lock.release()
+        return True
+
+    def _remove_empty_shard_dirs(self) -> None:
+        for shard_path in self._list_dir(self.cache_dir):
+            if not self._is_shard_dir(shard_path):
+                continue
+            for sub_shard_path in self._list_dir(shard_path):
+                if self._is_shard_dir(sub_shard_path):
+                    self._remove_dir_if_empty(sub_shard_path)
+            self._remove_dir_if_empty(shard_path)
+
+    def _remove_dir_if_empty(self, dir_path: str) -> None:
+        try:
+            os.rmdir(dir_path)
+        except OSError:
+            # INFO - 2019-07-24 - directory is not empty.
+            pass
@@ -0,0 +1,73 @@
+import multiprocessing
+import typing
+
+from rq import Connection as RQConnection
+from rq import SimpleWorker
+
+from tracim_backend.config import CFG
+from tracim_backend.lib.preview.generator import PREVIEW_GENERATOR_QUEUE_NAME
+from tracim_backend.lib.preview.generator import PreviewGenerator
+from tracim_backend.lib.utils.daemon import FakeDaemon
+from tracim_backend.lib.utils.logger import logger
+from tracim_backend.lib.utils.utils import get_redis_connection
+
+
+def run_preview_generator_worker(config: CFG, burst: bool) -> None:
+    """
+    Run a worker generating previews asked through preview generator queue.
+    """
+    # INFO - 2019-07-29 - jobs run in the worker process instead of a forked
+    # one, to reuse its preview generator and database engine.
+    preview_generator = PreviewGenerator(config)
+    PreviewGenerator.set_current(preview_generator)
+    try:
+        with RQConnection(get_redis_connection(config)):
+            worker = SimpleWorker([PREVIEW_GENERATOR_QUEUE_NAME])
+            worker.work(burst=burst)
+    finally:
+        PreviewGenerator.set_current(None)
+        preview_generator.close()
+
+
+class PreviewGeneratorDaemon(FakeDaemon):
+    """
+    Daemon generating previews of uploaded files ahead of their first view,
+    with a pool of PREVIEW__PRE_GENERATION__PROCESSES worker processes.
+    """
+
+    # NOTE: use *args and **kwargs because parent __init__ use strange
+    # * parameter
+    def __init__(self, config: "CFG", burst=True, *args, **kwargs):
+        """
+        :param config: tracim config
+        :param burst: if true, run until queue is empty, if false, run continously
+        """
+        super().__init__(*args, **kwargs)
+        self.config = config
+        self.burst = burst
+        self._processes = []  # type: typing.List[multiprocessing.Process]
+
+    def append_thread_callback(self, callback: typing.Callable) -> None:
+        logger.warning(self, "PreviewGeneratorDaemon not implement append_thread_callback")
+        pass
+
+    def stop(self) -> None:
+        # INFO - 2019-07-22 - rq worker does a warm shutdown on SIGTERM: it
+        # finishes its current job before stopping.
+        for process in self._processes:
+            process.terminate()
+
+    def run(self) -> None:
+        # INFO - 2019-07-22 - each worker runs in its own process as rq
+        # workers are designed to work in main thread, and previews
+        # generation mainly uses cpu.
+        self._processes = [
+            multiprocessing.Process(
+                target=run_preview_generator_worker, args=(self.config, self.burst)
+            )
+            for _ in range(self.config.PREVIEW__PRE_GENERATION__PROCESSES)
+        ]
+        for process in self._processes:
+            process.start()
+        for process in self._processes:
+            process.join()
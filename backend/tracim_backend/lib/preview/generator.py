@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+import typing
+
+from depot.manager import DepotManager
+from preview_generator.exception import UnavailablePreviewType
+from preview_generator.exception import UnsupportedMimeType
+
+from tracim_backend.config import CFG
+from tracim_backend.lib.preview.cache import PreviewCache
+from tracim_backend.lib.preview.cache import SingleFlightPreviewManager
+from tracim_backend.lib.utils.logger import logger
+from tracim_backend.lib.utils.utils import get_redis_connection
+from tracim_backend.lib.utils.utils import get_rq_queue
+from tracim_backend.models.data import FilePreviewMetadata
+from tracim_backend.models.meta import insert_ignoring_duplicates
+from tracim_backend.models.setup_models import get_engine
+
+PREVIEW_GENERATOR_QUEUE_NAME = "preview_generator"
+
+
+def enqueue_previews_generation(
+    config: CFG, depot_file_id: str, sha256: typing.Optional[str], file_extension: str
+) -> None:
+    """
+    Ask preview generator daemon to generate previews of a stored file,
+    see generate_previews(). Job only holds file ids: workers have their
+    own config, see PreviewGenerator.
+    :param config: tracim config
+    :param depot_file_id: id of the file in depot storage
+    :param sha256: hash of the file content if known
+    :param file_extension: extension of the file, like ".odt"
+    """
+    redis_connection = get_redis_connection(config)
+    queue = get_rq_queue(redis_connection, PREVIEW_GENERATOR_QUEUE_NAME)
+    queue.enqueue(generate_previews, depot_file_id, sha256, file_extension)
+
+
+def get_file_preview_metadata(
+    preview_manager: SingleFlightPreviewManager,
+    sha256: typing.Optional[str],
+    file_path: str,
+    file_extension: str,
+    build_page_nb: bool = True,
+) -> FilePreviewMetadata:
+    """
+    Compute page number and preview availability of a file with preview manager.
+    :param preview_manager: preview manager
+    :param sha256: hash of the file content if known
+    :param file_path: path of the file
+    :param file_extension: extension of the file, like ".odt"
+    :param build_page_nb: if False, page number is None unless it is known
+    without building a preview, see SingleFlightPreviewManager.get_cached_page_nb()
+    :return: preview metadata, not added to any session
+    """
+    try:
+        has_pdf_preview = preview_manager.has_pdf_preview(file_path, file_ext=file_extension)
+        has_jpeg_preview = preview_manager.has_jpeg_preview(file_path, file_ext=file_extension)
+    except UnsupportedMimeType:
+        has_pdf_preview = has_jpeg_preview = False
+    try:
+        if build_page_nb:
+            page_nb = preview_manager.get_page_nb(file_path, file_ext=file_extension)
+        else:
+            page_nb = preview_manager.get_cached_page_nb(file_path, file_ext=file_extension)
+    except UnsupportedMimeType:
+        page_nb = None
+    return FilePreviewMetadata(
+        sha256=sha256,
+        file_extension=file_extension,
+        page_nb=page_nb,
+        has_pdf_preview=has_pdf_preview,
+        has_jpeg_preview=has_jpeg_preview,
+    )
+
+
+def generate_previews(
+    depot_file_id: str, sha256: typing.Optional[str], file_extension: str
+) -> None:
+    """
+    Preview generator daemon job: generate previews of a stored file with the
+    preview generator of the worker process, see PreviewGenerator.
+    """
+    PreviewGenerator.get_current().generate_previews(depot_file_id, sha256, file_extension)
+
+
+class PreviewGenerator(object):
+    """
+    Generate previews of stored files ahead of their first view, in preview
+    generator daemon worker processes. Config and database engine are loaded
+    once by worker process, see set_current(): jobs only hold file ids.
+    """
+
+    _current = None  # type: typing.Optional[PreviewGenerator]
+
+    def __init__(self, config: CFG) -> None:
+        self.config = config
+        self.preview_cache = PreviewCache.from_config(config)
+        self.engine = get_engine(config)
+
+    @classmethod
+    def get_current(cls) -> "PreviewGenerator":
+        assert cls._current, "Preview generator of worker process is not set"
+        return cls._current
+
+    @classmethod
+    def set_current(cls, preview_generator: typing.Optional["PreviewGenerator"]) -> None:
+        """
+        Set preview generator running jobs of current worker process.
+        """
+        cls._current = preview_generator
+
+    def close(self) -> None:
+        self.engine.dispose()
+
+    def generate_previews(
+        self, depot_file_id: str, sha256: typing.Optional[str], file_extension: str
+    ) -> None:
+        """
+        Generate previews of a stored file usually asked at its first view: jpeg
+        previews of first page at all allowed dimensions, pdf preview of first
+        page and full pdf preview. Previews are stored in preview cache where
+        ContentApi looks for them. Preview metadata of the file are stored too if
+        its hash is known.
+        :param depot_file_id: id of the file in depot storage
+        :param sha256: hash of the file content if known
+        :param file_extension: extension of the file, like ".odt"
+        """
+        try:
+            file_path = DepotManager.get().get(depot_file_id)._file_path
+        except IOError:
+            logger.warning(
+                self, "File {} not found in depot, previews not generated".format(depot_file_id)
+            )
+            return
+        preview_manager = self.preview_cache.get_preview_manager(file_path)
+        try:
+            for preview_dim in self.config.PREVIEW__JPG__ALLOWED_DIMS:
+                preview_manager.get_jpeg_preview(
+                    file_path,
+                    page=0,
+                    width=preview_dim.width,
+                    height=preview_dim.height,
+                    file_ext=file_extension,
+                )
+            preview_manager.get_pdf_preview(file_path, page=0, file_ext=file_extension)
+            preview_manager.get_pdf_preview(file_path, file_ext=file_extension)
+        except (UnavailablePreviewType, UnsupportedMimeType):
+            # INFO - 2019-07-22 - some file types have jpeg previews but no pdf
+            # preview, others have no preview at all.
+            pass
+        except Exception:
+            logger.exception(self, "Unable to generate previews of file {}".format(depot_file_id))
+        if sha256:
+            try:
+                self.store_file_preview_metadata(
+                    get_file_preview_metadata(preview_manager, sha256, file_path, file_extension)
+                )
+            except Exception:
+                logger.exception(
+                    self, "Unable to store preview metadata of file {}".format(depot_file_id)
+                )
+
+    def store_file_preview_metadata(self, preview_metadata: FilePreviewMetadata) -> None:
+        """
+        Store preview metadata in their own transaction, unless already stored.
+        """
+        table = FilePreviewMetadata.__table__
+        with self.engine.begin() as connection:
+            insert_ignoring_duplicates(
+                connection,
+                table,
+                {
+                    column.name: getattr(preview_metadata, column.name)
+                    for column in table.columns
+                    if column.name != "created"
+                },
+            )
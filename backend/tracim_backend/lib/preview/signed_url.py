@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+import typing
+
+from tracim_backend.config import CFG
+from tracim_backend.exceptions import ExpiredSignedPreviewUrl
+from tracim_backend.exceptions import InvalidSignedPreviewUrl
+from tracim_backend.exceptions import SignedPreviewUrlDisabled
+
+
+class SignedJpgPreview(object):
+    """
+    Jpg preview of a stored file which can be got without authentication
+    until it expires, see JpgPreviewSigner.
+    """
+
+    def __init__(
+        self,
+        depot_file_id: str,
+        file_extension: str,
+        page: int,
+        width: int,
+        height: int,
+        file_tag: str,
+        expires: int,
+    ) -> None:
+        """
+        :param depot_file_id: id of the file in depot storage
+        :param file_extension: extension of the file, like ".odt"
+        :param page: page of the preview, beginning at 1
+        :param width: width of the preview in pixels
+        :param height: height of the preview in pixels
+        :param file_tag: entity tag of the file, see ContentRevisionRO.get_file_etag()
+        :param expires: timestamp after which the preview can't be got anymore
+        """
+        self.depot_file_id = depot_file_id
+        self.file_extension = file_extension
+        self.page = page
+        self.width = width
+        self.height = height
+        self.file_tag = file_tag
+        self.expires = expires
+
+    def get_etag(self) -> str:
+        variant = ("jpg", self.file_extension, self.page, self.width, self.height)
+        return "-".join([self.file_tag] + [str(part) for part in variant])
+
+
+class JpgPreviewSigner(object):
+    """
+    Sign jpg previews: the token of a preview holds what is needed to build it
+    and a HMAC of them, so that it can be checked and served without any
+    database query.
+    """
+
+    def __init__(self, secret: str, lifetime: int) -> None:
+        """
+        :param secret: secret key of signatures
+        :param lifetime: time in seconds a signed preview can be got
+        """
+        self._secret = secret.encode("utf-8")
+        self.lifetime = lifetime
+
+    @classmethod
+    def from_config(cls, config: CFG) -> "JpgPreviewSigner":
+        if not config.PREVIEW__SIGNED_URL__SECRET:
+            raise SignedPreviewUrlDisabled(
+                "Signed preview urls need preview.signed_url.secret or session.secret to be set"
+            )
+        return cls(config.PREVIEW__SIGNED_URL__SECRET, config.PREVIEW__SIGNED_URL__LIFETIME)
+
+    def sign(
+        self,
+        depot_file_id: str,
+        file_extension: str,
+        page: int,
+        width: int,
+        height: int,
+        file_tag: str,
+        now: typing.Optional[float] = None,
+    ) -> str:
+        """
+        Get token of a jpg preview of a stored file valid for at least signer
+        lifetime. Expiry is rounded to a multiple of lifetime so that the same
+        token (and url) is given during lifetime seconds and can be cached by
+        browsers.
+        :param now: current timestamp
+        :return: url-safe token
+        """
+        now = now or time.time()
+        # INFO - 2019-07-26 - token is valid until the end of next bucket,
+        # that is between lifetime and twice lifetime seconds.
+        expires = (int(now) // self.lifetime + 2) * self.lifetime
+        payload = json.dumps(
+            [depot_file_id, file_extension, page, width, height, file_tag, expires],
+            separators=(",", ":"),
+        ).encode("utf-8")
+        return "{}.{}".format(
+            base64.urlsafe_b64encode(payload).decode("ascii").rstrip("="),
+            self._get_signature(payload),
+        )
+
+    def load(self, token: str, now: typing.Optional[float] = None) -> SignedJpgPreview:
+        """
+        Check token of a jpg preview and get this preview.
+        :param now: current timestamp
+        """
+        now = now or time.time()
+        encoded_payload, _, signature = token.partition(".")
+        try:
+            payload = base64.urlsafe_b64decode(encoded_payload + "=" * (-len(encoded_payload) % 4))
+        except (binascii.Error, ValueError) as exc:
+            raise InvalidSignedPreviewUrl("Invalid preview token") from exc
+        # INFO - 2019-07-26 - compare bytes as compare_digest() only accepts
+        # ascii strings.
+        if not hmac.compare_digest(
+            signature.encode("utf-8"), self._get_signature(payload).encode("ascii")
+        ):
+            raise InvalidSignedPreviewUrl("Invalid preview token signature")
+        preview = SignedJpgPreview(*json.loads(payload.decode("utf-8")))
+        if preview.expires < now:
+            raise ExpiredSignedPreviewUrl("Preview token has expired")
+        return preview
+
+    def _get_signature(self, payload: bytes) -> str:
+        return hmac.new(self._secret, payload, hashlib.sha256).hexdigest()
@@ -7,7 +7,9 @@ from elasticsearch import Elasticsearch
 from elasticsearch.client import IngestClient
 from elasticsearch_dsl import Index
 from elasticsearch_dsl import Search
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from zope.sqlalchemy import mark_changed
 
 from tracim_backend.app_models.contents import content_type_list
 from tracim_backend.config import CFG
@@ -18,12 +20,18 @@ from tracim_backend.lib.search.models import ContentSearchResponse
 from tracim_backend.lib.search.models import EmptyContentSearchResponse
 from tracim_backend.lib.search.models import ESContentSearchResponse
 from tracim_backend.lib.search.models import SimpleContentSearchResponse
+from tracim_backend.lib.search.models import SqlContentSearchResponse
 from tracim_backend.lib.search.search_factory import ELASTICSEARCH__SEARCH_ENGINE_SLUG
 from tracim_backend.lib.utils.logger import logger
 from tracim_backend.models.auth import User
 from tracim_backend.models.context_models import ContentInContext
+from tracim_backend.models.data import Content
+from tracim_backend.models.data import ContentRevisionRO
+from tracim_backend.models.data import ContentSearchIndex
 from tracim_backend.models.data import UserRoleInWorkspace
 
+INDEX_CHUNK_SIZE = 1000
+
 
 class SearchApi(ABC):
     def __init__(self, session: Session, current_user: typing.Optional[User], config: CFG) -> None:
@@ -140,6 +148,102 @@ class SimpleSearchApi(SearchApi):
         return SimpleContentSearchResponse(content_in_context_list, total_hits)
 
 
+class SqlSearchApi(SearchApi):
+    """
+    Search using full-text index of database:
+    - index is maintained on revision insertion, see ContentSearchIndex
+    - allow pagination and filtering by content_type, deleted, archived
+    - support ranking, label being more relevant than content and comments
+    - search words by prefix only (no search in the middle of words)
+    """
+
+    def create_index(self) -> None:
+        """
+        Create FTS5 table of SQLite if it doesn't exist yet, like when the
+        database was created or migrated with another search engine
+        """
+        connection = self._session.connection()
+        if connection.dialect.name == "sqlite":
+            ContentSearchIndex.create_sqlite_fts(connection)
+            mark_changed(self._session)
+
+    def migrate_index(self, move_data=True, update_alias=True) -> None:
+        pass
+
+    def delete_index(self) -> None:
+        self._session.execute(ContentSearchIndex.__table__.delete())
+        mark_changed(self._session)
+
+    def index_content(self, content: ContentInContext) -> None:
+        pass
+
+    def index_all_content(self) -> None:
+        """
+        Rebuild index of all contents from their current revision: index is
+        only maintained with "sql" search engine, so this must be done when
+        switching to it.
+        """
+        revisions = ContentRevisionRO.__table__
+        contents = Content.__table__
+        result = self._session.execute(
+            select([revisions])
+            .select_from(
+                contents.join(revisions, revisions.c.revision_id == contents.c.current_revision_id)
+            )
+            .order_by(contents.c.id)
+        )
+        for rows in iter(lambda: result.fetchmany(INDEX_CHUNK_SIZE), []):
+            ContentSearchIndex.update_contents(
+                self._session.connection(), [dict(row) for row in rows]
+            )
+        self.create_index()
+        # INFO - 2019-07-26 - updates done without the ORM must be notified to
+        # transaction manager to be committed.
+        mark_changed(self._session)
+
+    def search_content(
+        self,
+        search_string: str,
+        size: typing.Optional[int] = SEARCH_DEFAULT_RESULT_NB,
+        page_nb: typing.Optional[int] = 1,
+        content_types: typing.Optional[typing.List[str]] = None,
+        show_deleted: bool = False,
+        show_archived: bool = False,
+        show_active: bool = True,
+    ) -> ContentSearchResponse:
+        """
+        Search content with full-text index of database
+        - do no show archived/deleted content by default
+        - filter content found according to workspace of current_user
+        """
+        if not search_string:
+            return EmptyContentSearchResponse()
+        content_api = ContentApi(
+            session=self._session,
+            current_user=self._user,
+            config=self._config,
+            show_deleted=show_deleted,
+            show_archived=show_archived,
+            show_active=show_active,
+        )
+        results, total_hits = content_api.full_text_search(
+            search_string,
+            size=size,
+            offset=self.offset_from_pagination(size, page_nb),
+            content_types=content_types,
+        )
+        contents_in_context = content_api.get_contents_in_context(
+            [content for content, _ in results]
+        )
+        return SqlContentSearchResponse(
+            [
+                (content_in_context, score)
+                for content_in_context, (_, score) in zip(contents_in_context, results)
+            ],
+            total_hits,
+        )
+
+
 class ESSearchApi(SearchApi):
     """
     Search using ElasticSearch :
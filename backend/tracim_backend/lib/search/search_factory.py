@@ -8,6 +8,7 @@ from tracim_backend.models.auth import User
 
 ELASTICSEARCH__SEARCH_ENGINE_SLUG = "elasticsearch"
 SIMPLE__SEARCH_ENGINE_SLUG = "simple"
+SQL__SEARCH_ENGINE_SLUG = "sql"
 
 
 class SearchFactory(object):
@@ -27,6 +28,11 @@ class SearchFactory(object):
             from tracim_backend.views.search_api.search_controller import SimpleSearchController
 
             return SimpleSearchController()
+        elif config.SEARCH__ENGINE == SQL__SEARCH_ENGINE_SLUG:
+            # TODO - G.M - 2019-05-22 - fix circular import
+            from tracim_backend.views.search_api.search_controller import SqlSearchController
+
+            return SqlSearchController()
         else:
             raise NoValidSearchEngine(
                 "Can't provide search controller "
@@ -46,6 +52,11 @@ class SearchFactory(object):
             from tracim_backend.lib.search.search import SimpleSearchApi
 
             return SimpleSearchApi(session=session, current_user=current_user, config=config)
+        elif config.SEARCH__ENGINE == SQL__SEARCH_ENGINE_SLUG:
+            # TODO - G.M - 2019-05-22 - fix circular import
+            from tracim_backend.lib.search.search import SqlSearchApi
+
+            return SqlSearchApi(session=session, current_user=current_user, config=config)
         else:
             raise NoValidSearchEngine(
                 "Can't provide search lib"
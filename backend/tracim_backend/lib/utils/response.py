@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+import os
+import typing
+from urllib.parse import quote
+
+from hapic.data import HapicFile
+from hapic.ext.pyramid import PyramidContext
+from pyramid.response import Response
+from pyramid.threadlocal import get_current_request
+from webob.static import BLOCK_SIZE
+from webob.static import FileIter
+
+if typing.TYPE_CHECKING:
+    from tracim_backend.config import CFG
+
+FILE_SERVING_MODE_X_SENDFILE = "x-sendfile"
+FILE_SERVING_MODE_X_ACCEL_REDIRECT = "x-accel-redirect"
+
+
+def get_file_offload_header(
+    app_config: "CFG", file_path: str
+) -> typing.Optional[typing.Tuple[str, str]]:
+    """
+    Get header asking the front web server to send file itself, according to
+    file serving mode of config.
+    :param file_path: path of a file of depot storage or of preview cache
+    :return: (header name, header value) or None if file should be sent by tracim
+    """
+    if app_config.FILE_SERVING__MODE == FILE_SERVING_MODE_X_SENDFILE:
+        return "X-Sendfile", os.path.abspath(file_path)
+    if app_config.FILE_SERVING__MODE == FILE_SERVING_MODE_X_ACCEL_REDIRECT:
+        locations = (
+            (
+                app_config.DEPOT_STORAGE_DIR,
+                app_config.FILE_SERVING__X_ACCEL_REDIRECT__DEPOT_STORAGE_URI,
+            ),
+            (
+                app_config.PREVIEW_CACHE_DIR,
+                app_config.FILE_SERVING__X_ACCEL_REDIRECT__PREVIEW_CACHE_URI,
+            ),
+        )
+        for directory_path, location_uri in locations:
+            relative_path = os.path.relpath(
+                os.path.abspath(file_path), os.path.abspath(directory_path)
+            )
+            if not relative_path.startswith(os.pardir):
+                return (
+                    "X-Accel-Redirect",
+                    "{}/{}".format(location_uri.rstrip("/"), quote(relative_path)),
+                )
+    return None
+
+
+class TracimFile(HapicFile):
+    """
+    HapicFile with an entity tag: a strong validator of the file content
+    allowing clients to revalidate or resume their download, see
+    TracimPyramidContext.
+    """
+
+    def __init__(
+        self,
+        file_path: typing.Optional[str] = None,
+        file_object: typing.Any = None,
+        mimetype: typing.Any = None,
+        filename: str = None,
+        content_length: int = None,
+        last_modified: datetime = None,
+        as_attachment: bool = False,
+        etag: typing.Optional[str] = None,
+    ):
+        super().__init__(
+            file_path=file_path,
+            file_object=file_object,
+            mimetype=mimetype,
+            filename=filename,
+            content_length=content_length,
+            last_modified=last_modified,
+            as_attachment=as_attachment,
+        )
+        self.etag = etag
+
+
+class TracimPyramidContext(PyramidContext):
+    """
+    Pyramid context of hapic serving files with conditional requests
+    (If-None-Match and If-Modified-Since, answered by 304) and byte ranges
+    requests (Range, answered by 206) support.
+
+    Files are sent without being read in python when possible: by the front
+    web server if configured, see get_file_offload_header(), or by the wsgi
+    server if it provides wsgi.file_wrapper.
+    """
+
+    def __init__(self, app_config: "CFG", *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._app_config = app_config
+
+    def get_file_response(self, file_response: HapicFile, http_code: int) -> Response:
+        response = super().get_file_response(file_response, http_code)
+        # INFO - 2019-07-18 - conditional and range requests are handled by
+        # webob when response is sent.
+        response.conditional_response = True
+        if getattr(file_response, "etag", None):
+            response.etag = file_response.etag
+        offload_header = None
+        if file_response.file_path:
+            offload_header = get_file_offload_header(self._app_config, file_response.file_path)
+        if offload_header:
+            # INFO - 2019-07-19 - front web server sends the file and handles
+            # range requests itself.
+            response.app_iter.close()
+            response.app_iter = []
+            response.content_length = None
+            response.headers[offload_header[0]] = offload_header[1]
+            return response
+
+        file = response.app_iter.file
+        # INFO - 2019-07-18 - setting app_iter resets content length.
+        content_length = response.content_length
+        request = get_current_request()
+        if request and not request.range and "wsgi.file_wrapper" in request.environ:
+            # INFO - 2019-07-19 - wsgi server may send the whole file with
+            # a system call like sendfile.
+            response.app_iter = request.environ["wsgi.file_wrapper"](file, BLOCK_SIZE)
+        elif file_response.file_path or file.seekable():
+            # INFO - 2019-07-18 - this app_iter seeks range start instead of
+            # reading and dropping file content before it.
+            response.app_iter = FileIter(file)
+        response.content_length = content_length
+        if response.content_length is not None:
+            response.accept_ranges = "bytes"
+        return response
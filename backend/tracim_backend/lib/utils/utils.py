@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import datetime
+import hashlib
 import os
 from os.path import normpath as base_normpath
 import random
@@ -319,6 +320,86 @@ def sliced_dict(data: typing.Dict[str, any], beginning_key_string: str) -> typin
     return sliced_dict
 
 
+FILE_READ_CHUNK_SIZE = 1024 * 1024
+
+
+def get_file_size_and_sha256(
+    file_content: typing.Union[bytes, typing.BinaryIO]
+) -> typing.Tuple[int, str]:
+    """
+    Get size and sha256 hex digest of file content
+    :param file_content: bytes or file-like object, read by chunks from its
+    current position, which is restored afterward if file is seekable
+    :return: (size, sha256 hex digest)
+    """
+    if isinstance(file_content, bytes):
+        return len(file_content), hashlib.sha256(file_content).hexdigest()
+    position = file_content.tell() if file_content.seekable() else None
+    size = 0
+    sha256 = hashlib.sha256()
+    for chunk in iter(lambda: file_content.read(FILE_READ_CHUNK_SIZE), b""):
+        size += len(chunk)
+        sha256.update(chunk)
+    if position is not None:
+        file_content.seek(position)
+    return size, sha256.hexdigest()
+
+
+class HashingFileStream(object):
+    """
+    Read-only file-like wrapper computing size and sha256 of the data read
+    through it, so that a file can be hashed while it is stored.
+    """
+
+    def __init__(self, file_stream: typing.BinaryIO) -> None:
+        self._file_stream = file_stream
+        self._sha256 = hashlib.sha256()
+        self.size = 0
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file_stream.read(size)
+        self.size += len(data)
+        self._sha256.update(data)
+        return data
+
+
+class ChunksFileStream(object):
+    """
+    Read-only file-like object over an iterable of bytes chunks: chunks are
+    only pulled from the iterable when read, so that data received by chunks
+    can be consumed as a file without being buffered.
+    """
+
+    def __init__(self, chunks: typing.Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._current_chunk = memoryview(b"")
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            data = bytes(self._current_chunk) + b"".join(self._chunks)
+            self._current_chunk = memoryview(b"")
+            return data
+        parts = []
+        remaining_size = size
+        while remaining_size > 0:
+            if not self._current_chunk:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._current_chunk = memoryview(chunk)
+                continue
+            part = self._current_chunk[:remaining_size]
+            part_size = len(part)
+            self._current_chunk = self._current_chunk[part_size:]
+            remaining_size -= part_size
+            parts.append(part)
+        return b"".join(parts)
+
+
 def is_dir_exist(path: str) -> bool:
     if not os.path.isdir(path):
         raise NotADirectoryError("{} is not a directory".format(path))
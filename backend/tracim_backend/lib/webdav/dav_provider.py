@@ -24,6 +24,7 @@ from tracim_backend.lib.utils.utils import normpath
 from tracim_backend.lib.utils.utils import webdav_convert_file_name_to_bdd
 from tracim_backend.lib.webdav import resources
 from tracim_backend.lib.webdav.lock_storage import LockStorage
+from tracim_backend.lib.webdav.path_cache import WebdavPathCache
 from tracim_backend.models.data import Content
 from tracim_backend.models.data import Workspace
 
@@ -126,10 +127,11 @@ class WebdavTracimContext(TracimContext):
         content_api = ContentApi(
             config=self.app_config, current_user=self.current_user, session=self.dbsession
         )
-        return content_api.get_one_by_filename_and_parent_labels(
-            content_label=webdav_convert_file_name_to_bdd(basename(path)),
-            content_parent_labels=parents,
+        return self.environ["wsgidav.provider"].path_cache.get_content(
+            content_api=content_api,
             workspace=workspace,
+            content_parent_labels=parents,
+            content_label=webdav_convert_file_name_to_bdd(basename(path)),
         )
 
     def _get_content_path(self):
@@ -200,6 +202,9 @@ class Provider(DAVProvider):
             self.lockManager = LockManager(LockStorage())
 
         self.app_config = app_config
+        # INFO - 2019-07-12 - provider is created once for the webdav app,
+        # its cache is shared by all requests of the process.
+        self.path_cache = WebdavPathCache()
         self._show_archive = show_archived
         self._show_delete = show_deleted
         self._show_history = show_history
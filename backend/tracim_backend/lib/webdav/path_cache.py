@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+import threading
+import typing
+
+from sqlalchemy import and_
+from sqlalchemy import func
+from sqlalchemy import or_
+from sqlalchemy import select
+from sqlalchemy.orm.exc import NoResultFound
+
+from tracim_backend.lib.core.content import ContentApi
+from tracim_backend.models.data import Content
+from tracim_backend.models.data import Workspace
+
+# INFO - 2019-07-12 - (content_id, current_revision_id) of a content and
+# of all its parent folders
+PathRevisions = typing.Tuple[typing.Tuple[int, int], ...]
+PathKey = typing.Tuple[int, typing.Tuple[str, ...], str]
+
+
+class WebdavPathCache(object):
+    """
+    LRU cache of webdav path resolution: (workspace_id, parent folders labels,
+    content file name) is mapped to ids and current revision ids of the content
+    and of its parent folders.
+
+    A cached path is checked on each use with one query loading the content only if
+    none of these contents got a new revision (rename, move, deletion...),
+    even if done by another process. Entries of contents changed through webdav
+    are also invalidated right away.
+    """
+
+    DEFAULT_MAX_SIZE = 10000
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE) -> None:
+        self._max_size = max_size
+        self._entries = OrderedDict()  # type: typing.Dict[PathKey, PathRevisions]
+        self._lock = threading.Lock()
+
+    def get_content(
+        self,
+        content_api: ContentApi,
+        workspace: Workspace,
+        content_parent_labels: typing.List[str],
+        content_label: str,
+    ) -> Content:
+        """
+        Same as ContentApi.get_one_by_filename_and_parent_labels, using
+        cached path if valid.
+        """
+        key = (workspace.workspace_id, tuple(content_parent_labels), content_label)
+        path_revisions = self._get(key)
+        if path_revisions:
+            content = self._get_unchanged_content(content_api, workspace, path_revisions)
+            if content:
+                return content
+            self._remove(key)
+
+        content = content_api.get_one_by_filename_and_parent_labels(
+            content_label=content_label,
+            content_parent_labels=content_parent_labels,
+            workspace=workspace,
+        )
+        path_revisions = tuple(
+            (path_content.id, path_content.current_revision_id)
+            for path_content in [content] + content_api.get_ancestors(content)
+        )
+        self._set(key, path_revisions)
+        return content
+
+    def invalidate_content(self, content_id: int) -> None:
+        """
+        Remove cached paths of content and of all its children recursively.
+        """
+        with self._lock:
+            for key, path_revisions in list(self._entries.items()):
+                if any(path_content_id == content_id for path_content_id, _ in path_revisions):
+                    del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, key: PathKey) -> typing.Optional[PathRevisions]:
+        with self._lock:
+            path_revisions = self._entries.get(key)
+            if path_revisions:
+                self._entries.move_to_end(key)
+            return path_revisions
+
+    def _set(self, key: PathKey, path_revisions: PathRevisions) -> None:
+        with self._lock:
+            self._entries[key] = path_revisions
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def _remove(self, key: PathKey) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _get_unchanged_content(
+        self, content_api: ContentApi, workspace: Workspace, path_revisions: PathRevisions
+    ) -> typing.Optional[Content]:
+        content_id, _ = path_revisions[0]
+        contents = Content.__table__.alias("path_content")
+        unchanged_contents_count = (
+            select([func.count(contents.c.id)])
+            .where(
+                or_(
+                    *[
+                        and_(
+                            contents.c.id == path_content_id,
+                            contents.c.current_revision_id == revision_id,
+                        )
+                        for path_content_id, revision_id in path_revisions
+                    ]
+                )
+            )
+            .as_scalar()
+        )
+        try:
+            return (
+                content_api.get_base_query(workspace)
+                .filter(Content.id == content_id)
+                .filter(unchanged_contents_count == len(path_revisions))
+                .one()
+            )
+        except NoResultFound:
+            return None
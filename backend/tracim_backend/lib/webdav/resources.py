@@ -31,20 +31,26 @@ from tracim_backend.lib.utils.authorization import is_contributor
 from tracim_backend.lib.utils.authorization import is_reader
 from tracim_backend.lib.utils.authorization import is_trusted_user
 from tracim_backend.lib.utils.authorization import is_user
+from tracim_backend.lib.utils.response import get_file_offload_header
 from tracim_backend.lib.utils.utils import add_trailing_slash
 from tracim_backend.lib.utils.utils import normpath
 from tracim_backend.lib.utils.utils import webdav_convert_file_name_to_bdd
 from tracim_backend.lib.utils.utils import webdav_convert_file_name_to_display
 from tracim_backend.lib.webdav.design import design_page
 from tracim_backend.lib.webdav.design import design_thread
+from tracim_backend.lib.webdav.path_cache import WebdavPathCache
 from tracim_backend.lib.webdav.utils import FakeFileStream
 from tracim_backend.models.data import ActionDescription
 from tracim_backend.models.data import Content
+from tracim_backend.models.data import ContentRevisionRO
 from tracim_backend.models.data import Workspace
 from tracim_backend.models.revision_protection import new_revision
 
 logger = logging.getLogger()
 
+# INFO - 2019-07-19 - value of lazily loaded attributes not loaded yet
+_NOT_LOADED = object()
+
 if typing.TYPE_CHECKING:
     from tracim_backend.lib.webdav.dav_provider import WebdavTracimContext
 
@@ -53,10 +59,14 @@ def webdav_check_right(authorization_checker: AuthorizationChecker):
     def decorator(func: typing.Callable) -> typing.Callable:
         @functools.wraps(func)
         def wrapper(self: "_DAVResource", *arg, **kwarg) -> typing.Callable:
-            try:
-                authorization_checker.check(tracim_context=self.tracim_context)
-            except TracimException as exc:
-                raise DAVError(HTTP_FORBIDDEN) from exc
+            # INFO - 2019-07-15 - resources only live for one request: checks
+            # already passed for this resource are not run again on each call.
+            if authorization_checker not in self.checked_rights:
+                try:
+                    authorization_checker.check(tracim_context=self.tracim_context)
+                except TracimException as exc:
+                    raise DAVError(HTTP_FORBIDDEN) from exc
+                self.checked_rights.add(authorization_checker)
             return func(self, *arg, **kwarg)
 
         return wrapper
@@ -70,10 +80,18 @@ class ManageActions(object):
     method as to not duplicate too much code
     """
 
-    def __init__(self, session: Session, action_type: str, api: ContentApi, content: Content):
+    def __init__(
+        self,
+        session: Session,
+        action_type: str,
+        api: ContentApi,
+        content: Content,
+        path_cache: WebdavPathCache,
+    ):
         self.session = session
         self.content_api = api
         self.content = content
+        self.path_cache = path_cache
 
         self._actions = {
             ActionDescription.ARCHIVING: self.content_api.archive,
@@ -93,6 +111,7 @@ class ManageActions(object):
         except TracimException as exc:
             raise DAVError(HTTP_FORBIDDEN) from exc
 
+        self.path_cache.invalidate_content(self.content.content_id)
         transaction.commit()
 
 
@@ -104,6 +123,7 @@ class RootResource(DAVCollection):
     def __init__(self, path: str, environ: dict, tracim_context: "WebdavTracimContext"):
         super(RootResource, self).__init__(path, environ)
         self.tracim_context = tracim_context
+        self.checked_rights = set()  # type: typing.Set[AuthorizationChecker]
         self.user = tracim_context.current_user
         self.session = tracim_context.dbsession
         # TODO BS 20170221: Web interface should list all workspace to. We
@@ -225,13 +245,19 @@ class WorkspaceResource(DAVCollection):
     """
 
     def __init__(
-        self, path: str, environ: dict, workspace: Workspace, tracim_context: "WebdavTracimContext"
+        self,
+        path: str,
+        environ: dict,
+        workspace: Workspace,
+        tracim_context: "WebdavTracimContext",
+        checked_rights: typing.Optional[typing.Set[AuthorizationChecker]] = None,
     ) -> None:
         super(WorkspaceResource, self).__init__(path, environ)
 
         self.workspace = workspace
         self.content = None
         self.tracim_context = tracim_context
+        self.checked_rights = checked_rights or set()
         self.user = tracim_context.current_user
         self.session = tracim_context.dbsession
         self.content_api = ContentApi(
@@ -392,44 +418,73 @@ class WorkspaceResource(DAVCollection):
             except TracimException:
                 raise DAVError(HTTP_FORBIDDEN)
 
+    @webdav_check_right(is_reader)
     def getMemberList(self) -> [_DAVResource]:
-        members = []
+        return self._get_members(
+            self.content_api.get_all_with_revision(
+                False, content_type_list.Any_SLUG, self.workspace
+            )
+        )
 
-        children = self.content_api.get_all(False, content_type_list.Any_SLUG, self.workspace)
+    def _get_members(
+        self, children: typing.List[typing.Tuple[Content, ContentRevisionRO]]
+    ) -> [_DAVResource]:
+        """
+        Build resources of children listed with their current revision: their
+        live properties are served from these revisions instead of loading
+        each content history and re-checking rights for each of them.
+        """
+        members = []
+        # INFO - 2019-07-15 - children are in the same workspace, rights
+        # checked on the collection are the ones of its children.
+        checked_rights = {is_reader}
 
-        for content in children:
+        for content, revision in children:
             content_path = "%s/%s" % (
                 self.path,
-                webdav_convert_file_name_to_display(content.file_name),
+                webdav_convert_file_name_to_display(revision.file_name),
             )
 
-            if content.type == content_type_list.Folder.slug:
-                members.append(
-                    FolderResource(
-                        path=content_path,
-                        environ=self.environ,
-                        workspace=self.workspace,
-                        content=content,
-                        tracim_context=self.tracim_context,
+            try:
+                if revision.type == content_type_list.Folder.slug:
+                    members.append(
+                        FolderResource(
+                            path=content_path,
+                            environ=self.environ,
+                            workspace=self.workspace,
+                            content=content,
+                            tracim_context=self.tracim_context,
+                            revision=revision,
+                            checked_rights=set(checked_rights),
+                        )
                     )
-                )
-            elif content.type == content_type_list.File.slug:
-                self._file_count += 1
-                members.append(
-                    FileResource(
-                        path=content_path,
-                        environ=self.environ,
-                        content=content,
-                        tracim_context=self.tracim_context,
+                elif revision.type == content_type_list.File.slug:
+                    self._file_count += 1
+                    members.append(
+                        FileResource(
+                            path=content_path,
+                            environ=self.environ,
+                            content=content,
+                            tracim_context=self.tracim_context,
+                            revision=revision,
+                            checked_rights=set(checked_rights),
+                        )
                     )
-                )
-            else:
-                self._file_count += 1
-                members.append(
-                    OtherFileResource(
-                        content_path, self.environ, content, tracim_context=self.tracim_context
+                else:
+                    self._file_count += 1
+                    members.append(
+                        OtherFileResource(
+                            path=content_path,
+                            environ=self.environ,
+                            content=content,
+                            tracim_context=self.tracim_context,
+                            revision=revision,
+                            checked_rights=set(checked_rights),
+                        )
                     )
-                )
+            except NotImplementedError:
+                pass
+
         return members
 
 
@@ -447,30 +502,47 @@ class FolderResource(WorkspaceResource):
         workspace: Workspace,
         content: Content,
         tracim_context: "WebdavTracimContext",
+        revision: typing.Optional[ContentRevisionRO] = None,
+        checked_rights: typing.Optional[typing.Set[AuthorizationChecker]] = None,
     ):
         super(FolderResource, self).__init__(
-            path=path, environ=environ, workspace=workspace, tracim_context=tracim_context
+            path=path,
+            environ=environ,
+            workspace=workspace,
+            tracim_context=tracim_context,
+            checked_rights=checked_rights,
         )
         self.content = content
+        self._revision = revision
 
     def __repr__(self) -> str:
         return "<DAVCollection: Folder (%s)>" % self.content.label
 
+    @property
+    def revision(self) -> ContentRevisionRO:
+        """
+        Current revision of content, the one loaded with the parent listing
+        while it is still current.
+        """
+        if self._revision and self._revision.revision_id == self.content.current_revision_id:
+            return self._revision
+        return self.content.revision
+
     @webdav_check_right(is_reader)
     def getCreationDate(self) -> float:
-        return mktime(self.content.created.timetuple())
+        return mktime(self.revision.created.timetuple())
 
     @webdav_check_right(is_reader)
     def getDisplayName(self) -> str:
-        return webdav_convert_file_name_to_display(self.content.file_name)
+        return webdav_convert_file_name_to_display(self.revision.file_name)
 
     @webdav_check_right(is_reader)
     def getDisplayInfo(self):
-        return {"type": self.content.type.capitalize()}
+        return {"type": self.revision.type.capitalize()}
 
     @webdav_check_right(is_reader)
     def getLastModified(self) -> float:
-        return mktime(self.content.updated.timetuple())
+        return mktime(self.revision.updated.timetuple())
 
     @webdav_check_right(is_content_manager)
     def delete(self):
@@ -479,6 +551,7 @@ class FolderResource(WorkspaceResource):
             api=self.content_api,
             content=self.content,
             session=self.session,
+            path_cache=self.provider.path_cache,
         ).action()
 
     def supportRecursiveMove(self, destpath: str):
@@ -519,6 +592,7 @@ class FolderResource(WorkspaceResource):
                     api=self.content_api,
                     content=self.content,
                     session=self.session,
+                    path_cache=self.provider.path_cache,
                 ).action()
             else:
                 invalid_path = True
@@ -536,6 +610,7 @@ class FolderResource(WorkspaceResource):
                     api=self.content_api,
                     content=self.content,
                     session=self.session,
+                    path_cache=self.provider.path_cache,
                 ).action()
             else:
                 invalid_path = True
@@ -598,59 +673,19 @@ class FolderResource(WorkspaceResource):
         except TracimException as exc:
             raise DAVError(HTTP_FORBIDDEN) from exc
 
+        self.provider.path_cache.invalidate_content(self.content.content_id)
         transaction.commit()
 
     @webdav_check_right(is_reader)
     def getMemberList(self) -> [_DAVResource]:
-        members = []
         content_api = ContentApi(
             current_user=self.user, config=self.provider.app_config, session=self.session
         )
-        visible_children = content_api.get_all(
-            [self.content.content_id], content_type_list.Any_SLUG, self.workspace
-        )
-
-        for content in visible_children:
-            content_path = "%s/%s" % (
-                self.path,
-                webdav_convert_file_name_to_display(content.file_name),
+        return self._get_members(
+            content_api.get_all_with_revision(
+                [self.content.content_id], content_type_list.Any_SLUG, self.workspace
             )
-
-            try:
-                if content.type == content_type_list.Folder.slug:
-                    members.append(
-                        FolderResource(
-                            path=content_path,
-                            environ=self.environ,
-                            workspace=self.workspace,
-                            content=content,
-                            tracim_context=self.tracim_context,
-                        )
-                    )
-                elif content.type == content_type_list.File.slug:
-                    self._file_count += 1
-                    members.append(
-                        FileResource(
-                            path=content_path,
-                            environ=self.environ,
-                            content=content,
-                            tracim_context=self.tracim_context,
-                        )
-                    )
-                else:
-                    self._file_count += 1
-                    members.append(
-                        OtherFileResource(
-                            path=content_path,
-                            environ=self.environ,
-                            content=content,
-                            tracim_context=self.tracim_context,
-                        )
-                    )
-            except NotImplementedError:
-                pass
-
-        return members
+        )
 
 
 class FileResource(DAVNonCollection):
@@ -659,11 +694,20 @@ class FileResource(DAVNonCollection):
     """
 
     def __init__(
-        self, path: str, environ: dict, content: Content, tracim_context: "WebdavTracimContext"
+        self,
+        path: str,
+        environ: dict,
+        content: Content,
+        tracim_context: "WebdavTracimContext",
+        revision: typing.Optional[ContentRevisionRO] = None,
+        checked_rights: typing.Optional[typing.Set[AuthorizationChecker]] = None,
     ) -> None:
         super(FileResource, self).__init__(path, environ)
         self.tracim_context = tracim_context
+        self.checked_rights = checked_rights or set()
         self.content = content
+        self._revision = revision
+        self._file_offload_header = _NOT_LOADED
         self.user = tracim_context.current_user
         self.session = tracim_context.dbsession
         self.content_api = ContentApi(
@@ -677,34 +721,62 @@ class FileResource(DAVNonCollection):
     def __repr__(self) -> str:
         return "<DAVNonCollection: FileResource (%d)>" % self.content.revision_id
 
+    @property
+    def revision(self) -> ContentRevisionRO:
+        """
+        Current revision of content, the one loaded with the parent listing
+        while it is still current.
+        """
+        if self._revision and self._revision.revision_id == self.content.current_revision_id:
+            return self._revision
+        return self.content.revision
+
     @webdav_check_right(is_reader)
     def getContentLength(self) -> int:
-        return self.content.depot_file.file.content_length
+        return self.revision.get_file_size()
 
     @webdav_check_right(is_reader)
     def getContentType(self) -> str:
-        return self.content.file_mimetype
+        return self.revision.file_mimetype
 
     @webdav_check_right(is_reader)
     def getCreationDate(self) -> float:
-        return mktime(self.content.created.timetuple())
+        return mktime(self.revision.created.timetuple())
 
     @webdav_check_right(is_reader)
     def getDisplayName(self) -> str:
-        return webdav_convert_file_name_to_display(self.content.file_name)
+        return webdav_convert_file_name_to_display(self.revision.file_name)
 
     @webdav_check_right(is_reader)
     def getDisplayInfo(self):
-        return {"type": self.content.type.capitalize()}
+        return {"type": self.revision.type.capitalize()}
 
     @webdav_check_right(is_reader)
     def getLastModified(self) -> float:
-        return mktime(self.content.updated.timetuple())
+        return mktime(self.revision.updated.timetuple())
 
     @webdav_check_right(is_reader)
     def getContent(self) -> typing.BinaryIO:
+        if self._get_file_offload_header():
+            # INFO - 2019-07-19 - file is sent by front web server
+            return compat.BytesIO()
         return self.content.depot_file.file
 
+    def finalizeHeaders(self, environ: dict, responseHeaders: typing.List[typing.Tuple[str, str]]):
+        offload_header = self._get_file_offload_header()
+        if offload_header:
+            responseHeaders[:] = [
+                (name, value) for name, value in responseHeaders if name != "Content-Length"
+            ]
+            responseHeaders.append(offload_header)
+
+    def _get_file_offload_header(self) -> typing.Optional[typing.Tuple[str, str]]:
+        if self._file_offload_header is _NOT_LOADED:
+            self._file_offload_header = get_file_offload_header(
+                self.tracim_context.app_config, self.content.depot_file.file._file_path
+            )
+        return self._file_offload_header
+
     def beginWrite(self, contentType: str = None) -> FakeFileStream:
         return FakeFileStream(
             content=self.content,
@@ -750,6 +822,7 @@ class FileResource(DAVNonCollection):
                     api=self.content_api,
                     content=self.content,
                     session=self.session,
+                    path_cache=self.provider.path_cache,
                 ).action()
             else:
                 invalid_path = True
@@ -767,6 +840,7 @@ class FileResource(DAVNonCollection):
                     api=self.content_api,
                     content=self.content,
                     session=self.session,
+                    path_cache=self.provider.path_cache,
                 ).action()
             else:
                 invalid_path = True
@@ -854,6 +928,7 @@ class FileResource(DAVNonCollection):
         except TracimException as exc:
             raise DAVError(HTTP_FORBIDDEN) from exc
 
+        self.provider.path_cache.invalidate_content(self.content.content_id)
         transaction.commit()
 
     def copyMoveSingle(self, destpath, isMove):
@@ -899,7 +974,7 @@ class FileResource(DAVNonCollection):
                 new_parent=destination_parent,
                 new_workspace=destination_workspace,
             )
-            self.content_api.execute_created_content_actions(new_content)
+            self.content_api.execute_copied_content_actions(new_content)
         except TracimException as exc:
             raise DAVError(HTTP_FORBIDDEN) from exc
         transaction.commit()
@@ -914,6 +989,7 @@ class FileResource(DAVNonCollection):
             api=self.content_api,
             content=self.content,
             session=self.session,
+            path_cache=self.provider.path_cache,
         ).action()
 
 
@@ -923,15 +999,28 @@ class OtherFileResource(FileResource):
     """
 
     def __init__(
-        self, path: str, environ: dict, content: Content, tracim_context: "WebdavTracimContext"
+        self,
+        path: str,
+        environ: dict,
+        content: Content,
+        tracim_context: "WebdavTracimContext",
+        revision: typing.Optional[ContentRevisionRO] = None,
+        checked_rights: typing.Optional[typing.Set[AuthorizationChecker]] = None,
     ):
         super(OtherFileResource, self).__init__(
-            path, environ, content, tracim_context=tracim_context
+            path,
+            environ,
+            content,
+            tracim_context=tracim_context,
+            revision=revision,
+            checked_rights=checked_rights,
         )
 
-        self.content_revision = self.content.revision
+        self.content_revision = self.revision
 
-        self.content_designed = self.design()
+        # INFO - 2019-07-15 - page or thread is only designed when its content
+        # or its length is requested, not when its parent is listed.
+        self._content_designed = None
 
         # workaround for consistent request as we have to return a resource with a path ending with .html
         # when entering folder for windows, but only once because when we select it again it would have .html.html
@@ -939,16 +1028,22 @@ class OtherFileResource(FileResource):
         if not self.path.endswith(".html"):
             self.path += ".html"
 
+    @property
+    def content_designed(self) -> str:
+        if self._content_designed is None:
+            self._content_designed = self.design()
+        return self._content_designed
+
     @webdav_check_right(is_reader)
     def getDisplayName(self) -> str:
-        return webdav_convert_file_name_to_display(self.content.file_name)
+        return webdav_convert_file_name_to_display(self.content_revision.file_name)
 
     @webdav_check_right(is_reader)
     def getPreferredPath(self):
         return self.path
 
     def __repr__(self) -> str:
-        return "<DAVNonCollection: OtherFileResource (%s)" % self.content.file_name
+        return "<DAVNonCollection: OtherFileResource (%s)" % self.content_revision.file_name
 
     @webdav_check_right(is_reader)
     def getContentLength(self) -> int:
@@ -970,14 +1065,17 @@ class OtherFileResource(FileResource):
 
     @webdav_check_right(is_reader)
     def getDisplayInfo(self):
-        return {"type": self.content.type.capitalize()}
+        return {"type": self.content_revision.type.capitalize()}
 
     def design(self):
         # TODO - G.M - 2019-06-13 - find solution to handle properly big file here without having
         # big file in memory. see https://github.com/tracim/tracim/issues/1913
-        if content_type_list.get_one_by_slug(self.content.type) == content_type_list.Page:
+        if content_type_list.get_one_by_slug(self.content_revision.type) == content_type_list.Page:
             return design_page(self.content, self.content_revision)
-        if content_type_list.get_one_by_slug(self.content.type) == content_type_list.Thread:
+        if (
+            content_type_list.get_one_by_slug(self.content_revision.type)
+            == content_type_list.Thread
+        ):
             return design_thread(
                 self.content,
                 self.content_revision,
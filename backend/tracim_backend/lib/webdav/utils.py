@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import tempfile
+import typing
 
 from sqlalchemy.orm import Session
 import transaction
@@ -10,11 +11,14 @@ from wsgidav.dav_error import DAVError
 from tracim_backend.app_models.contents import content_type_list
 from tracim_backend.exceptions import TracimException
 from tracim_backend.lib.core.content import ContentApi
+from tracim_backend.lib.utils.utils import ChunksFileStream
 from tracim_backend.models.data import ActionDescription
 from tracim_backend.models.data import Content
 from tracim_backend.models.data import Workspace
 from tracim_backend.models.revision_protection import new_revision
 
+WRITE_SPOOL_MAX_SIZE = 1024 * 1024
+
 
 class HistoryType(object):
     Deleted = "deleted"
@@ -40,8 +44,11 @@ class FakeFileStream(object):
     to get a filestream and write content in it
 
     In the first case scenario, the transfer takes two part : it first create the resource (createEmptyResource)
-    then add its content (beginWrite, write, close..). If we went without this class, we would create two revision
+    then add its content (beginWrite, writelines, close..). If we went without this class, we would create two revision
     of the file upon creating a new file, which is not what we want.
+
+    File content is given by wsgidav as a stream of chunks to writelines(), it is stored while it is received
+    without being staged in a temporary file.
     """
 
     def __init__(
@@ -63,12 +70,9 @@ class FakeFileStream(object):
         :param content:
         :param parent:
         """
-        # TODO - G.M - 2019-06-13 - use true streaming mecanism,
-        # instead of a true streaming mecanism we use
-        # a temporary file to avoid big file in memory without needing to refactor all
-        # upload mecanism of webdav
-        # see https://github.com/tracim/tracim/issues/1911
-        self.temp_file = tempfile.NamedTemporaryFile(suffix="tracim_webdav_upload_")
+        # INFO - 2019-07-18 - only used when data is given by write() calls,
+        # data given with writelines() is streamed to the stored file.
+        self.temp_file = None  # type: typing.Optional[typing.BinaryIO]
         self._session = session
         self._file_name = file_name if file_name != "" else self._content.file_name
         self._content = content
@@ -99,29 +103,41 @@ class FakeFileStream(object):
         """
         pass
 
-    def write(self, s: str):
+    def writelines(self, data_stream: typing.Iterable[bytes]):
+        """
+        Called by request_server with the whole stream of the file content, which is
+        stored while it is received: we either add a new content or create a new revision
+        """
+        self._write_file(ChunksFileStream(data_stream))
+
+    def write(self, s: bytes):
         """
-        Called by request_server when writing content to files, we put it inside a filestream
+        Write content to file, for callers not giving the whole stream of the file content
+        with writelines(), we put it inside a temporary filestream
         """
+        if self.temp_file is None:
+            self.temp_file = tempfile.SpooledTemporaryFile(
+                max_size=WRITE_SPOOL_MAX_SIZE, suffix="tracim_webdav_upload_"
+            )
         self.temp_file.write(s)
 
     def close(self):
         """
-        Called by request_server when the file content has been written. We either add a new content or create
-        a new revision
+        Called by request_server when the file content has been written.
         """
+        if self.temp_file is not None:
+            self.temp_file.seek(0)
+            self._write_file(self.temp_file)
+            self.temp_file.close()
+        transaction.commit()
 
-        self.temp_file.seek(0)
-
+    def _write_file(self, file_content: typing.BinaryIO):
         if self._content is None:
-            self.create_file()
+            self.create_file(file_content)
         else:
-            self.update_file()
-
-        transaction.commit()
-        self.temp_file.close()
+            self.update_file(file_content)
 
-    def create_file(self):
+    def create_file(self, file_content: typing.BinaryIO):
         """
         Called when this is a new file; will create a new Content initialized with the correct content
         """
@@ -138,14 +154,14 @@ class FakeFileStream(object):
                     do_save=False,
                 )
                 self._api.update_file_data(
-                    file, self._file_name, util.guessMimeType(self._file_name), self.temp_file
+                    file, self._file_name, util.guessMimeType(self._file_name), file_content
                 )
                 self._api.execute_created_content_actions(file)
         except TracimException as exc:
             raise DAVError(HTTP_FORBIDDEN) from exc
         self._api.save(file, ActionDescription.CREATION)
 
-    def update_file(self):
+    def update_file(self, file_content: typing.BinaryIO):
         """
         Called when we're updating an existing content; we create a new revision and update the file content
         """
@@ -155,12 +171,13 @@ class FakeFileStream(object):
                     self._content,
                     self._file_name,
                     util.guessMimeType(self._content.file_name),
-                    self.temp_file,
+                    file_content,
                 )
         except TracimException as exc:
             raise DAVError(HTTP_FORBIDDEN) from exc
 
         self._api.save(self._content, ActionDescription.REVISION)
+        self._api.execute_update_content_actions(self._content)
 
     def supportEtag(self):
         return False
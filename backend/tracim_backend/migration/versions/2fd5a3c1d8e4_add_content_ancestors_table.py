@@ -0,0 +1,85 @@
+"""add content_ancestors table
+
+Revision ID: 2fd5a3c1d8e4
+Revises: 5e2a5c846089
+Create Date: 2019-07-09 14:21:07.503318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "2fd5a3c1d8e4"
+down_revision = "5e2a5c846089"
+
+INSERT_CHUNK_SIZE = 1000
+
+contents = sa.Table(
+    "content",
+    sa.MetaData(),
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("current_revision_id", sa.Integer, nullable=True),
+)
+
+revisions = sa.Table(
+    "content_revisions",
+    sa.MetaData(),
+    sa.Column("revision_id", sa.Integer, primary_key=True),
+    sa.Column("parent_id", sa.Integer, nullable=True),
+)
+
+
+def upgrade():
+    content_ancestors = op.create_table(
+        "content_ancestors",
+        sa.Column("ancestor_id", sa.Integer(), nullable=False),
+        sa.Column("descendant_id", sa.Integer(), nullable=False),
+        sa.Column("depth", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["ancestor_id"],
+            ["content.id"],
+            name="fk_content_ancestors_ancestor_id_content",
+            ondelete="CASCADE",
+        ),
+        sa.ForeignKeyConstraint(
+            ["descendant_id"],
+            ["content.id"],
+            name="fk_content_ancestors_descendant_id_content",
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("ancestor_id", "descendant_id", name="pk_content_ancestors"),
+    )
+    op.create_index(
+        "idx__content_ancestors__descendant_id",
+        "content_ancestors",
+        ["descendant_id", "depth"],
+        unique=False,
+    )
+    # INFO - 2019-07-09 - backfill ancestors of all existing contents
+    # from parent_id of their current revision.
+    connection = op.get_bind()
+    parent_ids = dict(
+        connection.execute(
+            sa.select([contents.c.id, revisions.c.parent_id]).select_from(
+                contents.join(revisions, revisions.c.revision_id == contents.c.current_revision_id)
+            )
+        ).fetchall()
+    )
+    rows = []
+    for content_id in parent_ids:
+        depth = 0
+        ancestor_id = content_id
+        while ancestor_id is not None and depth <= len(parent_ids):
+            rows.append({"ancestor_id": ancestor_id, "descendant_id": content_id, "depth": depth})
+            ancestor_id = parent_ids.get(ancestor_id)
+            depth += 1
+        if len(rows) >= INSERT_CHUNK_SIZE:
+            op.bulk_insert(content_ancestors, rows)
+            rows = []
+    if rows:
+        op.bulk_insert(content_ancestors, rows)
+
+
+def downgrade():
+    op.drop_index("idx__content_ancestors__descendant_id", table_name="content_ancestors")
+    op.drop_table("content_ancestors")
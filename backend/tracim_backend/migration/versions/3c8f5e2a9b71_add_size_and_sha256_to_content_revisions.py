@@ -0,0 +1,27 @@
+"""add size and sha256 to content_revisions
+
+Revision ID: 3c8f5e2a9b71
+Revises: 7a9e1c2b4d6f
+Create Date: 2019-07-16 09:48:12.530261
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "3c8f5e2a9b71"
+down_revision = "7a9e1c2b4d6f"
+
+
+def upgrade():
+    # INFO - 2019-07-16 - files are stored in depot, which is not available here:
+    # existing revisions are filled with "tracimcli db fill-files-metadata".
+    with op.batch_alter_table("content_revisions") as batch_op:
+        batch_op.add_column(sa.Column("size", sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column("sha256", sa.Unicode(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("content_revisions") as batch_op:
+        batch_op.drop_column("sha256")
+        batch_op.drop_column("size")
@@ -0,0 +1,31 @@
+"""add file_preview_metadata table
+
+Revision ID: 4b8d2e6f1a37
+Revises: 9d4b7e1f3a25
+Create Date: 2019-07-23 10:12:27.631084
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "4b8d2e6f1a37"
+down_revision = "9d4b7e1f3a25"
+
+
+def upgrade():
+    # INFO - 2019-07-23 - metadata of existing files are computed on first use.
+    op.create_table(
+        "file_preview_metadata",
+        sa.Column("sha256", sa.Unicode(length=64), nullable=False),
+        sa.Column("file_extension", sa.Unicode(length=255), nullable=False),
+        sa.Column("page_nb", sa.Integer(), nullable=True),
+        sa.Column("has_pdf_preview", sa.Boolean(), nullable=False),
+        sa.Column("has_jpeg_preview", sa.Boolean(), nullable=False),
+        sa.Column("created", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("sha256", "file_extension", name="pk_file_preview_metadata"),
+    )
+
+
+def downgrade():
+    op.drop_table("file_preview_metadata")
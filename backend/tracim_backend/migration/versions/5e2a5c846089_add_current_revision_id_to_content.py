@@ -0,0 +1,49 @@
+"""add current_revision_id to content
+
+Revision ID: 5e2a5c846089
+Revises: 32e629b17e2e
+Create Date: 2019-07-01 10:12:31.418520
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "5e2a5c846089"
+down_revision = "32e629b17e2e"
+
+contents = sa.Table(
+    "content",
+    sa.MetaData(),
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("current_revision_id", sa.Integer, nullable=True),
+)
+
+revisions = sa.Table(
+    "content_revisions",
+    sa.MetaData(),
+    sa.Column("revision_id", sa.Integer, primary_key=True),
+    sa.Column("content_id", sa.Integer, nullable=False),
+)
+
+
+def upgrade():
+    with op.batch_alter_table("content") as batch_op:
+        batch_op.add_column(sa.Column("current_revision_id", sa.Integer(), nullable=True))
+    op.create_index(
+        "idx__content__current_revision_id", "content", ["current_revision_id"], unique=False
+    )
+    # INFO - 2019-07-01 - backfill current revision of all existing contents
+    connection = op.get_bind()
+    last_revision_id = (
+        sa.select([sa.func.max(revisions.c.revision_id)])
+        .where(revisions.c.content_id == contents.c.id)
+        .as_scalar()
+    )
+    connection.execute(contents.update().values(current_revision_id=last_revision_id))
+
+
+def downgrade():
+    op.drop_index("idx__content__current_revision_id", table_name="content")
+    with op.batch_alter_table("content") as batch_op:
+        batch_op.drop_column("current_revision_id")
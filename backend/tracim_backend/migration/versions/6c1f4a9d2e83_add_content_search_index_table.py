@@ -0,0 +1,53 @@
+"""add content_search_index table
+
+Revision ID: 6c1f4a9d2e83
+Revises: 4b8d2e6f1a37
+Create Date: 2019-07-26 11:04:52.318620
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "6c1f4a9d2e83"
+down_revision = "4b8d2e6f1a37"
+
+POSTGRESQL_SEARCH_VECTOR = (
+    "(setweight(to_tsvector('simple', label), 'A')"
+    " || setweight(to_tsvector('simple', body), 'B'))"
+)
+
+
+def upgrade():
+    # INFO - 2019-07-26 - index is only used and filled with "sql" search
+    # engine: switching to it requires "tracimcli search index-create" (which
+    # creates the FTS5 table on SQLite) then "tracimcli search index-populate".
+    op.create_table(
+        "content_search_index",
+        sa.Column("content_id", sa.Integer(), nullable=False),
+        sa.Column("target_id", sa.Integer(), nullable=False),
+        sa.Column("label", sa.Text(), nullable=False),
+        sa.Column("body", sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["content_id"],
+            ["content.id"],
+            name="fk_content_search_index_content_id_content",
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("content_id", name="pk_content_search_index"),
+    )
+    op.create_index(
+        "ix_content_search_index_target_id", "content_search_index", ["target_id"], unique=False
+    )
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(
+            "CREATE INDEX idx__content_search_index__search_vector ON content_search_index"
+            " USING gin ({})".format(POSTGRESQL_SEARCH_VECTOR)
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("DROP TABLE IF EXISTS content_search_fts")
+    op.drop_index("ix_content_search_index_target_id", table_name="content_search_index")
+    op.drop_table("content_search_index")
@@ -0,0 +1,128 @@
+"""add content_filenames table
+
+Revision ID: 7a9e1c2b4d6f
+Revises: 2fd5a3c1d8e4
+Create Date: 2019-07-11 10:32:45.108274
+
+"""
+import hashlib
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "7a9e1c2b4d6f"
+down_revision = "2fd5a3c1d8e4"
+
+INSERT_CHUNK_SIZE = 1000
+
+contents = sa.Table(
+    "content",
+    sa.MetaData(),
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("current_revision_id", sa.Integer, nullable=True),
+)
+
+revisions = sa.Table(
+    "content_revisions",
+    sa.MetaData(),
+    sa.Column("revision_id", sa.Integer, primary_key=True),
+    sa.Column("workspace_id", sa.Integer, nullable=True),
+    sa.Column("parent_id", sa.Integer, nullable=True),
+    sa.Column("type", sa.Unicode(32), nullable=False),
+    sa.Column("label", sa.Unicode(1024), nullable=False),
+    sa.Column("file_extension", sa.Unicode(255), nullable=False),
+    sa.Column("is_deleted", sa.Boolean, nullable=False),
+    sa.Column("is_archived", sa.Boolean, nullable=False),
+    sa.Column("is_temporary", sa.Boolean, nullable=False),
+)
+
+
+def upgrade():
+    content_filenames = op.create_table(
+        "content_filenames",
+        sa.Column("content_id", sa.Integer(), nullable=False),
+        sa.Column("workspace_id", sa.Integer(), nullable=False),
+        sa.Column("parent_id", sa.Integer(), nullable=False),
+        sa.Column("file_name_key", sa.Unicode(length=64), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["content_id"],
+            ["content.id"],
+            name="fk_content_filenames_content_id_content",
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("content_id", name="pk_content_filenames"),
+        sa.UniqueConstraint(
+            "workspace_id",
+            "parent_id",
+            "file_name_key",
+            "is_active",
+            name="uq__content_filenames__workspace_id",
+        ),
+    )
+    # INFO - 2019-07-11 - backfill file names of all existing contents from
+    # their current revision. If active contents already share a file name in
+    # a folder, only the first one gets the key of its file name: others get
+    # a key of their own until their file name or folder changes, see
+    # ContentFilename.get_legacy_file_name_key().
+    connection = op.get_bind()
+    result = connection.execute(
+        sa.select(
+            [
+                contents.c.id,
+                revisions.c.workspace_id,
+                revisions.c.parent_id,
+                revisions.c.type,
+                revisions.c.label,
+                revisions.c.file_extension,
+                revisions.c.is_deleted,
+                revisions.c.is_archived,
+                revisions.c.is_temporary,
+            ]
+        )
+        .select_from(
+            contents.join(revisions, revisions.c.revision_id == contents.c.current_revision_id)
+        )
+        .order_by(contents.c.id)
+    )
+    active_keys = set()
+    rows = []
+    for content in result.fetchall():
+        file_name = "{}{}".format(content.label or "", content.file_extension or "")
+        if not file_name or content.type == "comment" or content.workspace_id is None:
+            continue
+        normalized_file_name = unicodedata.normalize("NFC", file_name)
+        file_name_key = hashlib.sha256(normalized_file_name.encode("utf-8")).hexdigest()
+        parent_id = content.parent_id if content.parent_id is not None else 0
+        is_active = None
+        if not (content.is_deleted or content.is_archived or content.is_temporary):
+            is_active = True
+            key = (content.workspace_id, parent_id, file_name_key)
+            if key in active_keys:
+                file_name_key = hashlib.sha256(
+                    "legacy-duplicate\0{}\0{}".format(content.id, normalized_file_name).encode(
+                        "utf-8"
+                    )
+                ).hexdigest()
+            else:
+                active_keys.add(key)
+        rows.append(
+            {
+                "content_id": content.id,
+                "workspace_id": content.workspace_id,
+                "parent_id": parent_id,
+                "file_name_key": file_name_key,
+                "is_active": is_active,
+            }
+        )
+        if len(rows) >= INSERT_CHUNK_SIZE:
+            op.bulk_insert(content_filenames, rows)
+            rows = []
+    if rows:
+        op.bulk_insert(content_filenames, rows)
+
+
+def downgrade():
+    op.drop_table("content_filenames")
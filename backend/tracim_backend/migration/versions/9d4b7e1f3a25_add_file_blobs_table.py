@@ -0,0 +1,31 @@
+"""add file_blobs table
+
+Revision ID: 9d4b7e1f3a25
+Revises: 3c8f5e2a9b71
+Create Date: 2019-07-17 10:05:38.214673
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "9d4b7e1f3a25"
+down_revision = "3c8f5e2a9b71"
+
+
+def upgrade():
+    # INFO - 2019-07-17 - files of existing revisions stay owned by their
+    # revision, only files uploaded from now on are stored as blobs.
+    op.create_table(
+        "file_blobs",
+        sa.Column("sha256", sa.Unicode(length=64), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("depot_file", sa.Unicode(length=4000), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("sha256", name="pk_file_blobs"),
+    )
+
+
+def downgrade():
+    op.drop_table("file_blobs")
@@ -7,7 +7,9 @@ import traceback
 import typing
 
 from slugify import slugify
+from sqlalchemy.orm import Load
 from sqlalchemy.orm import Session
+from sqlalchemy.orm import selectinload
 
 from tracim_backend.app_models.contents import content_type_list
 from tracim_backend.app_models.workspace_menu_entries import WorkspaceMenuEntry
@@ -26,11 +28,16 @@ from tracim_backend.models.auth import Group
 from tracim_backend.models.auth import Profile
 from tracim_backend.models.auth import User
 from tracim_backend.models.data import Content
+from tracim_backend.models.data import ContentAncestor
 from tracim_backend.models.data import ContentRevisionRO
+from tracim_backend.models.data import FilePreviewMetadata
 from tracim_backend.models.data import UserRoleInWorkspace
 from tracim_backend.models.data import Workspace
 from tracim_backend.models.roles import WorkspaceRoles
 
+if typing.TYPE_CHECKING:
+    from tracim_backend.lib.core.content import ContentApi  # noqa: F401
+
 
 class AboutModel(object):
     def __init__(
@@ -253,6 +260,27 @@ class FilePreviewSizedPath(object):
         self.filename = filename
 
 
+class WorkspacePreviewSizedPath(object):
+    """
+    Paths params with workspace id, width, heigth
+    """
+
+    def __init__(self, workspace_id: int, width: int, height: int) -> None:
+        self.workspace_id = workspace_id
+        self.width = width
+        self.height = height
+
+
+class SignedPreviewPath(object):
+    """
+    Paths params with preview token and filename
+    """
+
+    def __init__(self, token: str, filename: str) -> None:
+        self.token = token
+        self.filename = filename
+
+
 class RevisionPreviewSizedPath(object):
     """
     Paths params with workspace id and content_id, revision_id width, heigth
@@ -378,6 +406,27 @@ class PageQuery(object):
         self.page = page
 
 
+class PreviewUrlsQuery(object):
+    """
+    Preview urls query model
+    """
+
+    def __init__(self, content_ids: str, page: int = 1) -> None:
+        self.content_ids = string_to_list(content_ids, ",", int)
+        self.page = page
+
+
+class JpgPreviewUrl(object):
+    """
+    Signed url of jpg preview of a file content, see ContentApi.get_signed_jpg_previews()
+    """
+
+    def __init__(self, content_id: int, revision_id: int, url: typing.Optional[str]) -> None:
+        self.content_id = content_id
+        self.revision_id = revision_id
+        self.url = url
+
+
 class ContentFilter(object):
     """
     Content filter model
@@ -768,12 +817,44 @@ class ContentInContext(object):
     """
 
     def __init__(
-        self, content: Content, dbsession: Session, config: CFG, user: User = None
+        self,
+        content: Content,
+        dbsession: Session,
+        config: CFG,
+        user: User = None,
+        builder: typing.Optional["ContentsInContextBuilder"] = None,
     ) -> None:
         self.content = content
         self.dbsession = dbsession
         self.config = config
         self._user = user
+        # INFO - 2019-07-08 - set when content is part of a list built with
+        # ContentsInContextBuilder, data related to content are then prefetched
+        # for the whole list.
+        self._builder = builder
+
+    def _get_content_api(self) -> "ContentApi":
+        if self._builder:
+            return self._builder.content_api
+        from tracim_backend.lib.core.content import ContentApi
+
+        return ContentApi(
+            current_user=self._user,
+            session=self.dbsession,
+            config=self.config,
+            show_deleted=True,
+            show_archived=True,
+            show_active=True,
+            show_temporary=True,
+        )
+
+    def _get_in_context(self, content: Content) -> "ContentInContext":
+        return ContentInContext(content, self.dbsession, self.config, self._user, self._builder)
+
+    def _get_preview_metadata(self) -> typing.Optional[FilePreviewMetadata]:
+        if self._builder:
+            return self._builder.get_preview_metadata(self.content.revision)
+        return self._get_content_api().get_preview_metadata(self.content.revision)
 
     # Default
     @property
@@ -797,50 +878,27 @@ class ContentInContext(object):
 
     @property
     def parent(self) -> typing.Optional["ContentInContext"]:
+        if self._builder:
+            self._builder.load_ancestors()
         if self.content.parent:
-            from tracim_backend.lib.core.content import ContentApi
-
-            content_api = ContentApi(
-                current_user=self._user,
-                session=self.dbsession,
-                config=self.config,
-                show_deleted=True,
-                show_archived=True,
-                show_active=True,
-                show_temporary=True,
-            )
-            return content_api.get_content_in_context(self.content.parent)
+            return self._get_in_context(self.content.parent)
         return None
 
     @property
     def parents(self) -> typing.List["ContentInContext"]:
-        parents = []
-        if self.parent:
-            parents.append(self.parent)
-            parent = self.parent
-            while parent.parent is not None:
-                parents.append(parent.parent)
-                parent = parent.parent
-        return parents
+        if self._builder:
+            ancestors = self._builder.get_ancestors(self.content)
+        else:
+            ancestors = self._get_content_api().get_ancestors(self.content)
+        return [self._get_in_context(ancestor) for ancestor in ancestors]
 
     @property
     def comments(self) -> typing.List["ContentInContext"]:
-        comments_in_context = []
-        for comment in self.content.get_comments():
-            from tracim_backend.lib.core.content import ContentApi
-
-            content_api = ContentApi(
-                current_user=self._user,
-                session=self.dbsession,
-                config=self.config,
-                show_deleted=True,
-                show_archived=True,
-                show_active=True,
-                show_temporary=True,
-            )
-            comment_in_context = content_api.get_content_in_context(comment)
-            comments_in_context.append(comment_in_context)
-        return comments_in_context
+        if self._builder:
+            comments = self._builder.get_comments(self.content)
+        else:
+            comments = self.content.get_comments()
+        return [self._get_in_context(comment) for comment in comments]
 
     @property
     def label(self) -> str:
@@ -865,17 +923,9 @@ class ContentInContext(object):
 
     @property
     def archived_through_parent_id(self) -> typing.Optional[int]:
-        from tracim_backend.lib.core.content import ContentApi
-
-        content_api = ContentApi(
-            current_user=self._user,
-            session=self.dbsession,
-            config=self.config,
-            show_deleted=True,
-            show_archived=True,
-            show_active=True,
-            show_temporary=True,
-        )
+        if self._builder:
+            return self._builder.get_archived_parent_id(self.content)
+        content_api = self._get_content_api()
         return content_api.get_archived_parent_id(self.content)
 
     @property
@@ -884,17 +934,9 @@ class ContentInContext(object):
 
     @property
     def deleted_through_parent_id(self) -> typing.Optional[int]:
-        from tracim_backend.lib.core.content import ContentApi
-
-        content_api = ContentApi(
-            current_user=self._user,
-            session=self.dbsession,
-            config=self.config,
-            show_deleted=True,
-            show_archived=True,
-            show_active=True,
-            show_temporary=True,
-        )
+        if self._builder:
+            return self._builder.get_deleted_parent_id(self.content)
+        content_api = self._get_content_api()
         return content_api.get_deleted_parent_id(self.content)
 
     @property
@@ -903,17 +945,7 @@ class ContentInContext(object):
 
     @property
     def is_editable(self) -> bool:
-        from tracim_backend.lib.core.content import ContentApi
-
-        content_api = ContentApi(
-            current_user=self._user,
-            session=self.dbsession,
-            config=self.config,
-            show_deleted=True,
-            show_archived=True,
-            show_active=True,
-            show_temporary=True,
-        )
+        content_api = self._get_content_api()
         return content_api.is_editable(self.content)
 
     @property
@@ -965,6 +997,8 @@ class ContentInContext(object):
     @property
     def read_by_user(self) -> bool:
         assert self._user
+        if self._builder:
+            return self._builder.get_read_by_user(self.content)
         return not self.content.has_new_information_for(self._user)
 
     @property
@@ -983,23 +1017,8 @@ class ContentInContext(object):
         """
         :return: page_nb of content if available, None if unavailable
         """
-        if self.content.depot_file:
-            from tracim_backend.lib.core.content import ContentApi
-
-            content_api = ContentApi(
-                current_user=self._user,
-                session=self.dbsession,
-                config=self.config,
-                show_deleted=True,
-                show_archived=True,
-                show_active=True,
-                show_temporary=True,
-            )
-            return content_api.get_preview_page_nb(
-                self.content.revision_id, file_extension=self.content.file_extension
-            )
-        else:
-            return None
+        preview_metadata = self._get_preview_metadata()
+        return preview_metadata.page_nb if preview_metadata else None
 
     @property
     def mimetype(self) -> str:
@@ -1016,7 +1035,7 @@ class ContentInContext(object):
         if not self.content.depot_file:
             return None
         try:
-            return self.content.depot_file.file.content_length
+            return self.content.revision.get_file_size()
         except IOError as e:
             logger.warning(
                 self, "IO Exception Occured when trying to get content size  : {}".format(str(e))
@@ -1035,46 +1054,16 @@ class ContentInContext(object):
         """
         :return: bool about if pdf version of content is available
         """
-        if not self.content.depot_file:
-            return False
-
-        from tracim_backend.lib.core.content import ContentApi
-
-        content_api = ContentApi(
-            current_user=self._user,
-            session=self.dbsession,
-            config=self.config,
-            show_deleted=True,
-            show_archived=True,
-            show_active=True,
-            show_temporary=True,
-        )
-        return content_api.has_pdf_preview(
-            self.content.revision_id, file_extension=self.content.file_extension
-        )
+        preview_metadata = self._get_preview_metadata()
+        return bool(preview_metadata and preview_metadata.has_pdf_preview)
 
     @property
     def has_jpeg_preview(self) -> bool:
         """
         :return: bool about if jpeg version of content is available
         """
-        if not self.content.depot_file:
-            return False
-
-        from tracim_backend.lib.core.content import ContentApi
-
-        content_api = ContentApi(
-            current_user=self._user,
-            session=self.dbsession,
-            config=self.config,
-            show_deleted=True,
-            show_archived=True,
-            show_active=True,
-            show_temporary=True,
-        )
-        return content_api.has_jpeg_preview(
-            self.content.revision_id, file_extension=self.content.file_extension
-        )
+        preview_metadata = self._get_preview_metadata()
+        return bool(preview_metadata and preview_metadata.has_jpeg_preview)
 
     @property
     def file_extension(self) -> str:
@@ -1096,6 +1085,217 @@ class ContentInContext(object):
         return None
 
 
+class ContentsInContextBuilder(object):
+    """
+    Build ContentInContext of a list of contents, for listings: revisions
+    with their owner and workspace are loaded for all contents at once, and
+    ancestors, comments and read status are loaded for all contents the first
+    time one of them needs it. The number of queries doesn't depend on the
+    number of contents. Related contents (parent, comments) share the builder:
+    data not loaded for them is got with per-content queries.
+    """
+
+    # INFO - 2019-07-08 - keep the number of bound parameters of IN clauses low
+    CONTENT_IDS_CHUNK_SIZE = 500
+
+    def __init__(
+        self, contents: typing.List[Content], dbsession: Session, config: CFG, user: User = None
+    ) -> None:
+        self.contents = contents
+        self.dbsession = dbsession
+        self.config = config
+        self._user = user
+        self._content_api = None  # type: typing.Optional["ContentApi"]
+        self._content_ids = {content.id for content in contents}
+        # INFO - 2019-07-08 - loaded contents are kept here as the session
+        # identity map only keeps weak references to them.
+        self._loaded_contents = self._load_contents([content.id for content in contents])
+        self._ancestors = None  # type: typing.Optional[typing.Dict[int, Content]]
+        self._comments = None  # type: typing.Optional[typing.Dict[int, typing.List[Content]]]
+        self._read_by_user = None  # type: typing.Optional[typing.Dict[int, bool]]
+        # INFO - 2019-07-23 - keyed by file hash and extension
+        self._preview_metadata = None  # type: typing.Optional[typing.Dict[typing.Any, typing.Any]]
+
+    @property
+    def content_api(self) -> "ContentApi":
+        if not self._content_api:
+            from tracim_backend.lib.core.content import ContentApi
+
+            self._content_api = ContentApi(
+                current_user=self._user,
+                session=self.dbsession,
+                config=self.config,
+                show_deleted=True,
+                show_archived=True,
+                show_active=True,
+                show_temporary=True,
+            )
+        return self._content_api
+
+    def get_contents_in_context(self) -> typing.List[ContentInContext]:
+        return [
+            ContentInContext(content, self.dbsession, self.config, self._user, builder=self)
+            for content in self.contents
+        ]
+
+    def load_ancestors(self) -> None:
+        """
+        Load all ancestors of all contents at once with the ancestors
+        closure table.
+        """
+        if self._ancestors is not None:
+            return
+        self._ancestors = {}
+        content_ids = [content.id for content in self.contents]
+        for chunk_ids in self._chunks(content_ids):
+            ancestor_ids = (
+                self.dbsession.query(ContentAncestor.ancestor_id)
+                .filter(ContentAncestor.descendant_id.in_(chunk_ids), ContentAncestor.depth > 0)
+                .distinct()
+            )
+            ancestors = (
+                self.dbsession.query(Content)
+                .filter(Content.id.in_(ancestor_ids.subquery()))
+                .options(*self._revisions_loaders())
+            )
+            self._ancestors.update({ancestor.id: ancestor for ancestor in ancestors})
+
+    def get_ancestors(self, content: Content) -> typing.List[Content]:
+        """
+        Same as ContentApi.get_ancestors(), ancestors of all contents are
+        loaded on first call.
+        """
+        self.load_ancestors()
+        if content.id not in self._content_ids and content.id not in self._ancestors:
+            return self.content_api.get_ancestors(content)
+        ancestors = []
+        parent_id = content.parent_id
+        while parent_id and parent_id in self._ancestors:
+            ancestors.append(self._ancestors[parent_id])
+            parent_id = self._ancestors[parent_id].parent_id
+        return ancestors
+
+    def get_deleted_parent_id(self, content: Content) -> int:
+        """
+        Same as ContentApi.get_deleted_parent_id(), computed from loaded ancestors.
+        """
+        for ancestor in self.get_ancestors(content):
+            if ancestor.is_deleted:
+                return ancestor.id
+        return 0
+
+    def get_archived_parent_id(self, content: Content) -> int:
+        """
+        Same as ContentApi.get_archived_parent_id(), computed from loaded ancestors.
+        """
+        for ancestor in self.get_ancestors(content):
+            if ancestor.is_archived:
+                return ancestor.id
+        return 0
+
+    def get_comments(self, content: Content) -> typing.List[Content]:
+        """
+        Same as content.get_comments(), comments of all contents are loaded
+        on first call.
+        """
+        if content.id not in self._content_ids:
+            return content.get_comments()
+        if self._comments is None:
+            self._comments = {}
+            content_ids = [content.id for content in self.contents]
+            for chunk_ids in self._chunks(content_ids):
+                comments = (
+                    self.dbsession.query(Content)
+                    .join(
+                        ContentRevisionRO,
+                        ContentRevisionRO.revision_id == Content.current_revision_id,
+                    )
+                    .filter(
+                        ContentRevisionRO.parent_id.in_(chunk_ids),
+                        ContentRevisionRO.type == content_type_list.Comment.slug,
+                        ContentRevisionRO.is_deleted == False,  # noqa: E712
+                        ContentRevisionRO.is_archived == False,  # noqa: E712
+                    )
+                    .options(*self._revisions_loaders())
+                    .order_by(Content.id)
+                )
+                for comment in comments:
+                    self._comments.setdefault(comment.parent_id, []).append(comment)
+        return self._comments.get(content.content_id, [])
+
+    def get_read_by_user(self, content: Content) -> bool:
+        """
+        Same as "not content.has_new_information_for(user)", read status of
+        all contents are computed on first call.
+        """
+        if content.id not in self._content_ids:
+            return not content.has_new_information_for(self._user)
+        if self._read_by_user is None:
+            from tracim_backend.lib.core.read_status import ReadStatusApi
+
+            self._read_by_user = ReadStatusApi(
+                session=self.dbsession, current_user=self._user, config=self.config
+            ).get_read_by_user([content.content_id for content in self.contents])
+        return self._read_by_user[content.content_id]
+
+    def get_preview_metadata(
+        self, revision: ContentRevisionRO
+    ) -> typing.Optional[FilePreviewMetadata]:
+        """
+        Same as ContentApi.get_preview_metadata() without building page
+        number, stored preview metadata of files of all contents are loaded on
+        first call.
+        """
+        if self._preview_metadata is None:
+            self._preview_metadata = {}
+            sha256s = list(
+                {
+                    content.revision.sha256
+                    for content in self.contents
+                    if content.revision.depot_file and content.revision.sha256
+                }
+            )
+            for chunk_sha256s in self._chunks(sha256s):
+                stored_preview_metadata = self.dbsession.query(FilePreviewMetadata).filter(
+                    FilePreviewMetadata.sha256.in_(chunk_sha256s)
+                )
+                for preview_metadata in stored_preview_metadata:
+                    key = (preview_metadata.sha256, preview_metadata.file_extension)
+                    self._preview_metadata[key] = preview_metadata
+        # INFO - 2019-07-23 - metadata not stored yet are computed for the
+        # listing only.
+        if revision.sha256:
+            key = (revision.sha256, revision.file_extension)
+        else:
+            key = revision.revision_id
+        if key not in self._preview_metadata:
+            self._preview_metadata[key] = self.content_api.get_preview_metadata(
+                revision, build_page_nb=False
+            )
+        return self._preview_metadata[key]
+
+    def _load_contents(self, content_ids: typing.List[int]) -> typing.List[Content]:
+        contents = []  # type: typing.List[Content]
+        for chunk_ids in self._chunks(content_ids):
+            contents.extend(
+                self.dbsession.query(Content)
+                .filter(Content.id.in_(chunk_ids))
+                .options(*self._revisions_loaders())
+            )
+        return contents
+
+    def _revisions_loaders(self) -> typing.List[Load]:
+        return [
+            selectinload(Content.revisions).joinedload(ContentRevisionRO.owner),
+            selectinload(Content.revisions).joinedload(ContentRevisionRO.workspace),
+        ]
+
+    def _chunks(self, values: typing.List[typing.Any]) -> typing.Iterator[typing.List[typing.Any]]:
+        for start in range(0, len(values), self.CONTENT_IDS_CHUNK_SIZE):
+            end = start + self.CONTENT_IDS_CHUNK_SIZE
+            yield values[start:end]
+
+
 class RevisionInContext(object):
     """
     Interface to get Content data and Content data related to context.
@@ -1114,6 +1314,25 @@ class RevisionInContext(object):
         self.config = config
         self._user = user
 
+    def _get_preview_metadata(self) -> typing.Optional[FilePreviewMetadata]:
+        if not self.revision.depot_file:
+            return None
+        # TODO - G.M - 2018-09-05 - Fix circular import better
+        from tracim_backend.lib.core.content import ContentApi
+
+        content_api = ContentApi(
+            current_user=self._user,
+            session=self.dbsession,
+            config=self.config,
+            show_deleted=True,
+            show_archived=True,
+            show_active=True,
+            show_temporary=True,
+        )
+        # INFO - 2019-07-29 - revisions are listed: page number of files
+        # whose previews were never built is not built for them.
+        return content_api.get_preview_metadata(self.revision, build_page_nb=False)
+
     # Default
     @property
     def content_id(self) -> int:
@@ -1277,24 +1496,8 @@ class RevisionInContext(object):
         """
         :return: page_nb of content if available, None if unavailable
         """
-        if self.revision.depot_file:
-            # TODO - G.M - 2018-09-05 - Fix circular import better
-            from tracim_backend.lib.core.content import ContentApi
-
-            content_api = ContentApi(
-                current_user=self._user,
-                session=self.dbsession,
-                config=self.config,
-                show_deleted=True,
-                show_archived=True,
-                show_active=True,
-                show_temporary=True,
-            )
-            return content_api.get_preview_page_nb(
-                self.revision.revision_id, file_extension=self.revision.file_extension
-            )
-        else:
-            return None
+        preview_metadata = self._get_preview_metadata()
+        return preview_metadata.page_nb if preview_metadata else None
 
     @property
     def mimetype(self) -> str:
@@ -1311,7 +1514,7 @@ class RevisionInContext(object):
         if not self.revision.depot_file:
             return None
         try:
-            return self.revision.depot_file.file.content_length
+            return self.revision.get_file_size()
         except IOError as e:
             logger.warning(
                 self, "IO Exception Occured when trying to get content size  : {}".format(str(e))
@@ -1330,46 +1533,16 @@ class RevisionInContext(object):
         """
         :return: bool about if pdf version of content is available
         """
-        if not self.revision.depot_file:
-            return False
-
-        from tracim_backend.lib.core.content import ContentApi
-
-        content_api = ContentApi(
-            current_user=self._user,
-            session=self.dbsession,
-            config=self.config,
-            show_deleted=True,
-            show_archived=True,
-            show_active=True,
-            show_temporary=True,
-        )
-        return content_api.has_pdf_preview(
-            self.revision.revision_id, file_extension=self.revision.file_extension
-        )
+        preview_metadata = self._get_preview_metadata()
+        return bool(preview_metadata and preview_metadata.has_pdf_preview)
 
     @property
     def has_jpeg_preview(self) -> bool:
         """
         :return: bool about if jpeg version of content is available
         """
-        if not self.revision.depot_file:
-            return False
-
-        from tracim_backend.lib.core.content import ContentApi
-
-        content_api = ContentApi(
-            current_user=self._user,
-            session=self.dbsession,
-            config=self.config,
-            show_deleted=True,
-            show_archived=True,
-            show_active=True,
-            show_temporary=True,
-        )
-        return content_api.has_jpeg_preview(
-            self.revision.revision_id, file_extension=self.revision.file_extension
-        )
+        preview_metadata = self._get_preview_metadata()
+        return bool(preview_metadata and preview_metadata.has_jpeg_preview)
 
     @property
     def file_extension(self) -> str:
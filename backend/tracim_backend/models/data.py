@@ -2,28 +2,53 @@
 import datetime as datetime_root
 from datetime import datetime
 from datetime import timedelta
+import hashlib
 import json
 import os
+import re
+import sqlite3
+from types import MappingProxyType
 import typing
+import unicodedata
 
 from babel.dates import format_timedelta
 from bs4 import BeautifulSoup
 from depot.fields.sqlalchemy import UploadedFileField
 from depot.fields.upload import UploadedFile
 from depot.io.utils import FileIntent
+from sqlalchemy import DDL
 from sqlalchemy import Column
 from sqlalchemy import ForeignKey
 from sqlalchemy import Index
 from sqlalchemy import Sequence
+from sqlalchemy import Table
+from sqlalchemy import UniqueConstraint
+from sqlalchemy import and_
+from sqlalchemy import column
 from sqlalchemy import func
 from sqlalchemy import inspect
+from sqlalchemy import literal_column
+from sqlalchemy import select
+from sqlalchemy import table
+from sqlalchemy.engine import Connection
+from sqlalchemy.event import listen
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Query
+from sqlalchemy.orm import Session
+from sqlalchemy.orm import aliased
 from sqlalchemy.orm import backref
 from sqlalchemy.orm import object_session
 from sqlalchemy.orm import relationship
+from sqlalchemy.orm import selectinload
 from sqlalchemy.orm.attributes import InstrumentedAttribute
 from sqlalchemy.orm.collections import attribute_mapped_collection
+from sqlalchemy.sql.expression import Alias
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.expression import FromClause
+from sqlalchemy.sql.expression import Select
+from sqlalchemy.sql.expression import TableClause
+from sqlalchemy.types import BigInteger
 from sqlalchemy.types import Boolean
 from sqlalchemy.types import DateTime
 from sqlalchemy.types import Integer
@@ -36,7 +61,7 @@ from tracim_backend.app_models.contents import content_status_list
 from tracim_backend.app_models.contents import content_type_list
 from tracim_backend.exceptions import ContentRevisionUpdateError
 from tracim_backend.exceptions import ContentStatusNotExist
-from tracim_backend.exceptions import CopyRevisionAbortedDepotCorrupted
+from tracim_backend.exceptions import ContentTypeNotExist
 from tracim_backend.exceptions import NewRevisionAbortedDepotCorrupted
 from tracim_backend.lib.utils.translation import get_locale
 from tracim_backend.models.auth import User
@@ -576,6 +601,58 @@ class ContentChecker(object):
             return True
 
 
+class RevisionPropertiesCache(object):
+    """
+    Decoded properties of a revision and content types allowed as its sub
+    content, for given json properties and type of revision.
+    """
+
+    def __init__(self, raw_properties: str, type_slug: str) -> None:
+        self.raw_properties = raw_properties
+        self.type_slug = type_slug
+        if raw_properties:
+            self.properties = json.loads(raw_properties)
+        else:
+            self.properties = {}
+        if content_type_list.get_one_by_slug(type_slug) != content_type_list.Event:
+            if "allowed_content" not in self.properties:
+                self.properties[
+                    "allowed_content"
+                ] = content_type_list.default_allowed_content_properties(type_slug)
+        self.properties = self._freeze(self.properties)
+        self._allowed_content_types = None  # type: typing.Optional[typing.Tuple[ContentType, ...]]
+        self.has_unknown_allowed_content = False
+
+    @classmethod
+    def _freeze(cls, value: typing.Any) -> typing.Any:
+        """
+        Make decoded json read-only: properties are shared by all their users,
+        which must assign a new structure to change them.
+        """
+        if isinstance(value, dict):
+            return MappingProxyType({key: cls._freeze(item) for key, item in value.items()})
+        if isinstance(value, list):
+            return tuple(cls._freeze(item) for item in value)
+        return value
+
+    def is_valid_for(self, revision: "ContentRevisionRO") -> bool:
+        return self.raw_properties == revision.properties and self.type_slug == revision.type
+
+    @property
+    def allowed_content_types(self) -> typing.Tuple[ContentType, ...]:
+        if self._allowed_content_types is None:
+            allowed_content_types = []
+            for slug, is_allowed in self.properties.get("allowed_content", {}).items():
+                if not is_allowed:
+                    continue
+                try:
+                    allowed_content_types.append(content_type_list.get_one_by_slug(slug))
+                except ContentTypeNotExist:
+                    self.has_unknown_allowed_content = True
+            self._allowed_content_types = tuple(allowed_content_types)
+        return self._allowed_content_types
+
+
 class ContentRevisionRO(DeclarativeBase):
     """
     Revision of Content. It's immutable, update or delete an existing ContentRevisionRO will throw
@@ -597,6 +674,10 @@ class ContentRevisionRO(DeclarativeBase):
     #  http://depot.readthedocs.io/en/latest/#attaching-files-to-models
     # http://depot.readthedocs.io/en/latest/api.html#module-depot.fields
     depot_file = Column(UploadedFileField, unique=False, nullable=True)
+    # INFO - 2019-07-16 - size and sha256 hex digest of depot_file content, computed
+    # at upload. They are None for revisions uploaded before they were stored.
+    size = Column(BigInteger, unique=False, nullable=True, default=None)
+    sha256 = Column(Unicode(64), unique=False, nullable=True, default=None)
     properties = Column("properties", Text(), unique=False, nullable=False, default="")
 
     type = Column(Unicode(32), unique=False, nullable=False)
@@ -672,6 +753,60 @@ class ContentRevisionRO(DeclarativeBase):
     def file_name(cls) -> InstrumentedAttribute:
         return ContentRevisionRO.label + ContentRevisionRO.file_extension
 
+    def get_file_size(self) -> typing.Optional[int]:
+        """
+        :return: size of attached file, read from depot only if it was not
+        stored at upload, None if there is no attached file
+        """
+        if not self.depot_file:
+            return None
+        if self.size is not None:
+            return self.size
+        return self.depot_file.file.content_length
+
+    def get_file_etag(self, *variant: typing.Any) -> str:
+        """
+        Get entity tag of attached file, unchanged by revisions not changing
+        the file content if its hash is known.
+        :param variant: parameters identifying a file derived from the
+        attached file, like page and dimensions of a preview
+        :return: entity tag value
+        """
+        file_tag = self.sha256 or "revision{}".format(self.revision_id)
+        return "-".join([file_tag] + [str(part) for part in variant])
+
+    def get_parsed_properties(self) -> typing.Mapping[str, typing.Any]:
+        """
+        Properties decoded from json, with default allowed content if not set.
+        Decoded properties are memoized until properties or type of revision
+        are assigned: returned mapping is shared and read-only.
+        """
+        return self._get_properties_cache().properties
+
+    def get_allowed_content_types(
+        self, ignore_unknown: bool = True
+    ) -> typing.Tuple[ContentType, ...]:
+        """
+        Content types allowed as sub content, computed once like
+        get_parsed_properties().
+        :param ignore_unknown: if False, raise ValueError if allowed content
+        is not set or contains unknown content types.
+        """
+        cache = self._get_properties_cache()
+        allowed_content_types = cache.allowed_content_types
+        if not ignore_unknown and (
+            "allowed_content" not in cache.properties or cache.has_unknown_allowed_content
+        ):
+            raise ValueError("Not allowed content property")
+        return allowed_content_types
+
+    def _get_properties_cache(self) -> "RevisionPropertiesCache":
+        cache = self.__dict__.get("_properties_cache")
+        if cache is None or not cache.is_valid_for(self):
+            cache = RevisionPropertiesCache(self.properties, self.type)
+            self.__dict__["_properties_cache"] = cache
+        return cache
+
     @classmethod
     def new_from(cls, revision: "ContentRevisionRO") -> "ContentRevisionRO":
         """
@@ -691,7 +826,12 @@ class ContentRevisionRO(DeclarativeBase):
             setattr(new_rev, column_name, column_value)
 
         new_rev.updated = datetime.utcnow()
-        if revision.depot_file:
+        new_rev.size = revision.size
+        new_rev.sha256 = revision.sha256
+        if FileBlob.is_shared_file(revision.depot_file):
+            # INFO - 2019-07-17 - blob file is shared, no need to copy it
+            new_rev.depot_file = revision.depot_file
+        elif revision.depot_file:
             try:
                 new_rev.depot_file = FileIntent(
                     revision.depot_file.file, revision.file_name, revision.file_mimetype
@@ -706,38 +846,6 @@ class ContentRevisionRO(DeclarativeBase):
 
         return new_rev
 
-    @classmethod
-    def copy(cls, revision: "ContentRevisionRO", parent: "Content") -> "ContentRevisionRO":
-
-        copy_rev = cls()
-        import copy
-
-        copy_columns = cls._cloned_columns
-        for column_name in copy_columns:
-            # INFO - G-M - 15-03-2018 - set correct parent
-            if column_name == "parent_id" and parent:
-                column_value = copy.copy(parent.id)
-            elif column_name == "parent" and parent:
-                column_value = copy.copy(parent)
-            else:
-                column_value = copy.copy(getattr(revision, column_name))
-            setattr(copy_rev, column_name, column_value)
-
-        # copy attached_file
-        if revision.depot_file:
-            try:
-                copy_rev.depot_file = FileIntent(
-                    revision.depot_file.file, revision.file_name, revision.file_mimetype
-                )
-            except IOError as exc:
-                raise CopyRevisionAbortedDepotCorrupted(
-                    "IOError. Can't create new revision by copying another one"
-                    " during content copy process."
-                    " May be related to original revision "
-                    " file not being available."
-                ) from exc
-        return copy_rev
-
     def __setattr__(self, key: str, value: typing.Any):
         """
         ContentRevisionUpdateError is raised if tried to update column and revision own identity
@@ -842,6 +950,13 @@ class Content(DeclarativeBase):
     )  # This flag allow to serialize a given revision if required by the user
 
     id = Column(Integer, primary_key=True)
+    # INFO - 2019-07-01 - Denormalized pointer to the latest revision of
+    # the content. It is set on each revision insert (see
+    # tracim_backend.models.revision_protection) and allow to join content with
+    # its current revision without searching for the max revision_id.
+    # There is no foreign key here to avoid circular dependency between
+    # content and content_revisions tables.
+    current_revision_id = Column(Integer, nullable=True, default=None)
     # TODO - A.P - 2017-09-05 - revisions default sorting
     # The only sorting that makes sens is ordering by "updated" field. But:
     # - its content will soon replace the one of "created",
@@ -962,6 +1077,30 @@ class Content(DeclarativeBase):
     def file_mimetype(cls) -> InstrumentedAttribute:
         return ContentRevisionRO.file_mimetype
 
+    @hybrid_property
+    def size(self) -> typing.Optional[int]:
+        return self.revision.size
+
+    @size.setter
+    def size(self, value: typing.Optional[int]) -> None:
+        self.revision.size = value
+
+    @size.expression
+    def size(cls) -> InstrumentedAttribute:
+        return ContentRevisionRO.size
+
+    @hybrid_property
+    def sha256(self) -> typing.Optional[str]:
+        return self.revision.sha256
+
+    @sha256.setter
+    def sha256(self, value: typing.Optional[str]) -> None:
+        self.revision.sha256 = value
+
+    @sha256.expression
+    def sha256(cls) -> InstrumentedAttribute:
+        return ContentRevisionRO.sha256
+
     @hybrid_property
     def _properties(self) -> str:
         return self.revision.properties
@@ -1150,46 +1289,33 @@ class Content(DeclarativeBase):
         :return: list of children Content
         :rtype Content
         """
-        # TODO - G.M - 2019-02-08 - Refactor this code to be more efficient
-        all_childrens_revisions = (
+        # INFO - 2019-07-02 - children are contents whose current revision
+        # targets this content as parent. Revisions are loaded in one
+        # extra query for all children instead of one query per child.
+        return (
             object_session(self)
-            .query(ContentRevisionRO)
-            .filter(ContentRevisionRO.parent_id == self.content_id)
-            .order_by(ContentRevisionRO.content_id)
+            .query(Content)
+            .join(ContentRevisionRO, ContentRevisionRO.revision_id == Content.current_revision_id)
+            .filter(ContentRevisionRO.parent_id == self.id)
+            .options(selectinload(Content.revisions))
+            .order_by(Content.id)
             .all()
         )
-        children_content_ids = set([cr.content_id for cr in all_childrens_revisions])
-        # INFO - G.M - 2019-05-06 - we get max revision (latest) for each content (defined
-        # by content id). As we use a group_by , what we retrieve here
-        #  is not a list of ContentRevisionRO, but a standard object of sqlalchemy.
-        all_up_to_date_revisions_result = (
-            object_session(self)
-            .query(func.max(ContentRevisionRO.revision_id))
-            .filter(ContentRevisionRO.content_id.in_(children_content_ids))
-            .group_by(ContentRevisionRO.content_id)
-            .order_by(ContentRevisionRO.content_id)
-            .all()
-        )
-
-        all_up_to_date_revisions_ids = [value[0] for value in all_up_to_date_revisions_result]
-        valid_children = []
-        for revision in all_childrens_revisions:
-            if revision.revision_id in all_up_to_date_revisions_ids:
-                valid_children.append(revision.node)
-
-        return valid_children
 
     def get_children(self, recursively: bool = False) -> ["Content"]:
         """
         Get all children of content recursively or not (including children of children...)
         """
-        children = []
-        for child in self.children:
-            children.append(child)
-            if recursively:
-                children.extend(child.get_children(recursively=recursively))
-        children = sorted(children, key=lambda child: child.content_id)
-        return children
+        if not recursively:
+            return self.children
+        return self.get_subtree().get_descendants()
+
+    def get_subtree(self) -> "ContentSubtree":
+        """
+        Load all descendants of content with a constant number of queries,
+        see ContentSubtree.
+        """
+        return ContentSubtree.load(object_session(self), self)
 
     @property
     def revision(self) -> ContentRevisionRO:
@@ -1218,6 +1344,10 @@ class Content(DeclarativeBase):
     @depot_file.setter
     def depot_file(self, value):
         self.revision.depot_file = value
+        # INFO - 2019-07-16 - size and hash of a previous file must not be kept,
+        # see ContentApi.update_file_data() to set them with the new file.
+        self.revision.size = None
+        self.revision.sha256 = None
 
     def get_current_revision(self) -> ContentRevisionRO:
         if not self.revisions:
@@ -1253,24 +1383,19 @@ class Content(DeclarativeBase):
                     yield child.node
 
     @hybrid_property
-    def properties(self) -> dict:
-        """ return a structure decoded from json content of _properties """
-
-        if not self._properties:
-            properties = {}
-        else:
-            properties = json.loads(self._properties)
-        if content_type_list.get_one_by_slug(self.type) != content_type_list.Event:
-            if "allowed_content" not in properties:
-                properties[
-                    "allowed_content"
-                ] = content_type_list.default_allowed_content_properties(self.type)
-        return properties
+    def properties(self) -> typing.Mapping[str, typing.Any]:
+        """
+        return a read-only structure decoded from json content of _properties,
+        copy it (properties.copy() gives a dict) and assign it to change it
+        """
+        return self.revision.get_parsed_properties()
 
     @properties.setter
-    def properties(self, properties_struct: dict) -> None:
+    def properties(self, properties_struct: typing.Mapping[str, typing.Any]) -> None:
         """ encode a given structure into json and store it in _properties attribute"""
-        self._properties = json.dumps(properties_struct)
+        # INFO - 2019-07-26 - default=dict encodes read-only nested mappings
+        # taken from other properties.
+        self._properties = json.dumps(properties_struct, default=dict)
         ContentChecker.check_properties(self)
 
     def created_as_delta(self, delta_from_datetime: datetime = None) -> timedelta:
@@ -1394,20 +1519,7 @@ class Content(DeclarativeBase):
         return BeautifulSoup(self.description, "html.parser").text
 
     def get_allowed_content_types(self) -> typing.List[ContentType]:
-        types = []
-        try:
-            allowed_types = self.properties["allowed_content"]
-            for type_label, is_allowed in allowed_types.items():
-                if is_allowed:
-                    types.append(content_type_list.get_one_by_slug(type_label))
-        # TODO BS 2018-08-13: This try/except is not correct: except exception
-        # if we know what to except.
-        except Exception as e:
-            print(e.__str__())
-            print("----- /*\\ *****")
-            raise ValueError("Not allowed content property")
-
-        return types
+        return list(self.revision.get_allowed_content_types(ignore_unknown=False))
 
     def get_history(self, drop_empty_revision=False) -> "[VirtualEvent]":
         events = []
@@ -1421,7 +1533,7 @@ class Content(DeclarativeBase):
             # Some webdav client create empty file before uploading, we must
             # have possibility to not show the related revision
             if drop_empty_revision:
-                if revision.depot_file and revision.depot_file.file.content_length == 0:
+                if revision.depot_file and revision.get_file_size() == 0:
                     # INFO - G.M - 12-03-2018 -Always show the last and
                     # first revision.
                     if revision != revisions[-1] and revision != revisions[0]:
@@ -1442,13 +1554,737 @@ class Content(DeclarativeBase):
 
     def get_tree_revisions(self) -> typing.List[ContentRevisionRO]:
         """Get all revision sorted by id of content and all his children recursively"""
-        revisions = []  # type: typing.List[ContentRevisionRO]
-        for revision in self.revisions:
-            revisions.append(revision)
-        for child in self.get_children(recursively=True):
-            revisions.extend(child.revisions)
-        revisions = sorted(revisions, key=lambda revision: revision.revision_id)
-        return revisions
+        return self.get_subtree().get_tree_revisions()
+
+
+Index("idx__content__current_revision_id", Content.current_revision_id)
+
+
+class ContentAncestor(DeclarativeBase):
+    """
+    Closure table of content tree: one row for each (ancestor, descendant)
+    couple, including the content itself with depth 0. It follows parent_id
+    of current revision of contents and is maintained on revision insertion,
+    see tracim_backend.models.revision_protection.update_content_ancestors.
+    """
+
+    __tablename__ = "content_ancestors"
+
+    ancestor_id = Column(
+        Integer, ForeignKey("content.id", ondelete="CASCADE"), primary_key=True, nullable=False
+    )
+    descendant_id = Column(
+        Integer, ForeignKey("content.id", ondelete="CASCADE"), primary_key=True, nullable=False
+    )
+    depth = Column(Integer, nullable=False)
+
+    @classmethod
+    def link_subtree(cls, connection: Connection, content_id: int, parent_id: int) -> None:
+        """
+        Link content and its descendants to parent and all its ancestors.
+        """
+        ancestors = cls.__table__
+        new_ancestors = ancestors.alias("new_ancestors")
+        subtree = ancestors.alias("subtree")
+        connection.execute(
+            ancestors.insert().from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(
+                    [
+                        new_ancestors.c.ancestor_id,
+                        subtree.c.descendant_id,
+                        new_ancestors.c.depth + subtree.c.depth + 1,
+                    ]
+                ).where(
+                    and_(
+                        new_ancestors.c.descendant_id == parent_id,
+                        subtree.c.ancestor_id == content_id,
+                    )
+                ),
+            )
+        )
+
+
+Index("idx__content_ancestors__descendant_id", ContentAncestor.descendant_id, ContentAncestor.depth)
+
+
+class ContentFilename(DeclarativeBase):
+    """
+    Index of file names of contents in their folder: one row for each content
+    with a file name, following its current revision. It is maintained on
+    revision insertion, see
+    tracim_backend.models.revision_protection.update_content_filename.
+
+    File names are stored as a hash of their NFC normalized form, so that the
+    (workspace_id, parent_id, file_name_key) index stays small enough for all
+    databases. is_active is NULL for deleted, archived and temporary contents:
+    as NULL values are never equal in a unique constraint, only active contents
+    must have a unique file name in a folder. Contents which already shared a
+    file name in a folder before this index existed are stored by its
+    migration with a key of their own, see get_legacy_file_name_key().
+    """
+
+    __tablename__ = "content_filenames"
+    __table_args__ = (
+        UniqueConstraint(
+            "workspace_id",
+            "parent_id",
+            "file_name_key",
+            "is_active",
+            name="uq__content_filenames__workspace_id",
+        ),
+    )
+
+    # INFO - 2019-07-11 - parent_id is 0 for contents at root of workspace,
+    # NULL would disable the unique constraint.
+    ROOT_PARENT_ID = 0
+
+    content_id = Column(
+        Integer, ForeignKey("content.id", ondelete="CASCADE"), primary_key=True, nullable=False
+    )
+    workspace_id = Column(Integer, nullable=False)
+    parent_id = Column(Integer, nullable=False)
+    file_name_key = Column(Unicode(64), nullable=False)
+    is_active = Column(Boolean, nullable=True)
+
+    @classmethod
+    def get_file_name_key(cls, file_name: str) -> str:
+        normalized_file_name = unicodedata.normalize("NFC", file_name)
+        return hashlib.sha256(normalized_file_name.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def get_legacy_file_name_key(cls, content_id: int, file_name: str) -> str:
+        """
+        Get key of the file name of a content which shared it with another
+        content of its folder before this index existed: unique for the
+        content, it is kept until the file name or the folder of the content
+        changes, see update_contents().
+        """
+        normalized_file_name = unicodedata.normalize("NFC", file_name)
+        return hashlib.sha256(
+            "legacy-duplicate\0{}\0{}".format(content_id, normalized_file_name).encode("utf-8")
+        ).hexdigest()
+
+    @classmethod
+    def get_parent_key(cls, parent_id: typing.Optional[int]) -> int:
+        return parent_id if parent_id is not None else cls.ROOT_PARENT_ID
+
+    @classmethod
+    def get_row(
+        cls, revision_values: typing.Dict[str, typing.Any]
+    ) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        """
+        :param revision_values: column values of a revision
+        :return: row of the content of revision, None if it has no file name
+        or no workspace (comments are not concerned by file name unicity).
+        """
+        file_name = cls._get_file_name(revision_values)
+        if (
+            not file_name
+            or revision_values["workspace_id"] is None
+            or revision_values["type"] == content_type_list.Comment.slug
+        ):
+            return None
+        is_hidden = (
+            revision_values["is_deleted"]
+            or revision_values["is_archived"]
+            or revision_values["is_temporary"]
+        )
+        return {
+            "content_id": revision_values["content_id"],
+            "workspace_id": revision_values["workspace_id"],
+            "parent_id": cls.get_parent_key(revision_values["parent_id"]),
+            "file_name_key": cls.get_file_name_key(file_name),
+            "is_active": None if is_hidden else True,
+        }
+
+    @classmethod
+    def _get_file_name(cls, revision_values: typing.Dict[str, typing.Any]) -> str:
+        return "{}{}".format(
+            revision_values["label"] or "", revision_values["file_extension"] or ""
+        )
+
+    @classmethod
+    def update_contents(
+        cls, connection: Connection, revisions_values: typing.List[typing.Dict[str, typing.Any]]
+    ) -> None:
+        """
+        Update rows of contents of given revisions, revisions being given
+        in insertion order: the last one of each content is its current one.
+        Rows of contents keeping their file name in their folder, including
+        legacy keys, are only updated if they become active or hidden.
+        File name availability must be checked before, a conflict with another
+        active content raises an IntegrityError.
+        """
+        rows_by_content_id = {}
+        legacy_file_name_keys = {}
+        for revision_values in revisions_values:
+            content_id = revision_values["content_id"]
+            rows_by_content_id[content_id] = cls.get_row(revision_values)
+            legacy_file_name_keys[content_id] = cls.get_legacy_file_name_key(
+                content_id, cls._get_file_name(revision_values)
+            )
+        filenames = cls.__table__
+        stored_rows = {
+            stored_row.content_id: stored_row
+            for stored_row in connection.execute(
+                filenames.select().where(
+                    filenames.c.content_id.in_(list(rows_by_content_id.keys()))
+                )
+            )
+        }
+        deleted_content_ids = []
+        new_rows = []
+        for content_id, row in rows_by_content_id.items():
+            stored_row = stored_rows.get(content_id)
+            if stored_row is None:
+                if row:
+                    new_rows.append(row)
+                continue
+            if not row:
+                deleted_content_ids.append(content_id)
+                continue
+            if stored_row.file_name_key == legacy_file_name_keys[content_id]:
+                row["file_name_key"] = stored_row.file_name_key
+            if (stored_row.workspace_id, stored_row.parent_id, stored_row.file_name_key) != (
+                row["workspace_id"],
+                row["parent_id"],
+                row["file_name_key"],
+            ):
+                deleted_content_ids.append(content_id)
+                new_rows.append(row)
+                continue
+            if stored_row.is_active == row["is_active"]:
+                continue
+            connection.execute(
+                filenames.update()
+                .where(filenames.c.content_id == content_id)
+                .values(is_active=row["is_active"])
+            )
+        if deleted_content_ids:
+            connection.execute(
+                filenames.delete().where(filenames.c.content_id.in_(deleted_content_ids))
+            )
+        if new_rows:
+            connection.execute(filenames.insert(), new_rows)
+
+
+class ContentSearchIndex(DeclarativeBase):
+    """
+    Full-text search index of contents: one row for each content, following
+    its current revision. It is maintained on revision insertion, see
+    tracim_backend.models.revision_protection.update_content_search_index.
+
+    Comments are indexed on behalf of the content they comment (target_id),
+    so that searching the text of a comment finds the commented content.
+    Deleted and archived comments are not indexed.
+
+    Text is indexed by the database itself: with a FTS5 table fed by
+    triggers on SQLite, with a GIN index on a tsvector expression on
+    PostgreSQL. Label matches rank higher than other text.
+    """
+
+    __tablename__ = "content_search_index"
+
+    content_id = Column(
+        Integer, ForeignKey("content.id", ondelete="CASCADE"), primary_key=True, nullable=False
+    )
+    target_id = Column(Integer, nullable=False, index=True)
+    label = Column(Text(), nullable=False)
+    body = Column(Text(), nullable=False)
+
+    SUPPORTED_DIALECTS = ("postgresql", "sqlite")
+    # INFO - 2019-07-26 - query must use exactly the same expression as the
+    # index for PostgreSQL to use it.
+    POSTGRESQL_SEARCH_VECTOR = (
+        "(setweight(to_tsvector('simple', label), 'A')"
+        " || setweight(to_tsvector('simple', body), 'B'))"
+    )
+    SQLITE_FTS_TABLE_NAME = "content_search_fts"
+    # INFO - 2019-07-26 - bm25 weights of label and body columns.
+    SQLITE_FTS_RANK = "bm25(5.0, 1.0)"
+    SQLITE_FTS_STATEMENTS = (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(label, body,"
+        " content='content_search_index', content_rowid='content_id')",
+        "INSERT INTO {fts}({fts}, rank) VALUES ('rank', '{rank}')",
+        "CREATE TRIGGER IF NOT EXISTS content_search_index_after_insert"
+        " AFTER INSERT ON content_search_index"
+        " BEGIN INSERT INTO {fts}(rowid, label, body)"
+        " VALUES (new.content_id, new.label, new.body); END",
+        "CREATE TRIGGER IF NOT EXISTS content_search_index_after_delete"
+        " AFTER DELETE ON content_search_index"
+        " BEGIN INSERT INTO {fts}({fts}, rowid, label, body)"
+        " VALUES ('delete', old.content_id, old.label, old.body); END",
+    )
+    ENABLED_CONNECTION_INFO_KEY = "content_search_index_enabled"
+
+    @classmethod
+    def enable_on_connect(cls, dbapi_connection: typing.Any, connection_record: typing.Any) -> None:
+        """
+        Pool "connect" listener enabling the index on connections of an
+        engine, see tracim_backend.models.setup_models.get_engine
+        """
+        connection_record.info[cls.ENABLED_CONNECTION_INFO_KEY] = True
+
+    @classmethod
+    def is_enabled(cls, connection: Connection) -> bool:
+        """
+        Index is only maintained when it is used, that is with "sql" search
+        engine: other engines don't pay for it.
+        """
+        return connection.info.get(cls.ENABLED_CONNECTION_INFO_KEY, False)
+
+    @classmethod
+    def get_sqlite_fts_statements(cls) -> typing.List[str]:
+        return [
+            statement.format(fts=cls.SQLITE_FTS_TABLE_NAME, rank=cls.SQLITE_FTS_RANK)
+            for statement in cls.SQLITE_FTS_STATEMENTS
+        ]
+
+    @classmethod
+    def create_sqlite_fts(cls, connection: Connection) -> None:
+        """
+        Create FTS5 table and triggers of the index if they don't exist, then
+        rebuild FTS5 table from index rows.
+        """
+        for statement in cls.get_sqlite_fts_statements():
+            connection.execute(statement)
+        connection.execute(
+            "INSERT INTO {fts}({fts}) VALUES ('rebuild')".format(fts=cls.SQLITE_FTS_TABLE_NAME)
+        )
+
+    @classmethod
+    def is_sqlite_fts5_available(cls) -> bool:
+        """
+        :return: True if SQLite library used by python has FTS5 extension
+        """
+        connection = sqlite3.connect(":memory:")
+        try:
+            connection.execute("CREATE VIRTUAL TABLE fts5_check USING fts5(text)")
+        except sqlite3.OperationalError:
+            return False
+        finally:
+            connection.close()
+        return True
+
+    @classmethod
+    def get_row(
+        cls, revision_values: typing.Dict[str, typing.Any]
+    ) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        """
+        :param revision_values: column values of a revision
+        :return: row of the content of revision, None if it must not be indexed
+        """
+        description = revision_values["description"] or ""
+        if "<" in description:
+            description = BeautifulSoup(description, "html.parser").get_text(" ")
+        if revision_values["type"] == content_type_list.Comment.slug:
+            if (
+                revision_values["parent_id"] is None
+                or revision_values["is_deleted"]
+                or revision_values["is_archived"]
+            ):
+                return None
+            return {
+                "content_id": revision_values["content_id"],
+                "target_id": revision_values["parent_id"],
+                "label": "",
+                "body": description,
+            }
+        label = revision_values["label"] or ""
+        file_name = "{}{}".format(label, revision_values["file_extension"] or "")
+        return {
+            "content_id": revision_values["content_id"],
+            "target_id": revision_values["content_id"],
+            "label": label,
+            "body": "{} {}".format(file_name, description),
+        }
+
+    @classmethod
+    def _get_file_name(cls, revision_values: typing.Dict[str, typing.Any]) -> str:
+        return "{}{}".format(
+            revision_values["label"] or "", revision_values["file_extension"] or ""
+        )
+
+    @classmethod
+    def update_contents(
+        cls, connection: Connection, revisions_values: typing.List[typing.Dict[str, typing.Any]]
+    ) -> None:
+        """
+        Replace rows of contents of given revisions, revisions being given
+        in insertion order: the last one of each content is its current one.
+        """
+        rows_by_content_id = {
+            revision_values["content_id"]: cls.get_row(revision_values)
+            for revision_values in revisions_values
+        }
+        search_index = cls.__table__
+        connection.execute(
+            search_index.delete().where(
+                search_index.c.content_id.in_(list(rows_by_content_id.keys()))
+            )
+        )
+        rows = [row for row in rows_by_content_id.values() if row]
+        if rows:
+            connection.execute(search_index.insert(), rows)
+
+    @classmethod
+    def get_search_terms(cls, search_string: str) -> typing.List[str]:
+        return [term.lower() for term in re.findall(r"\w+", search_string)]
+
+    @classmethod
+    def get_matches(cls, dialect_name: str, search_terms: typing.List[str]) -> Alias:
+        """
+        Get contents matching all search terms, each term being a prefix of a
+        word of the content or of one of its comments.
+
+        A content and its comments are different rows of the index: rows
+        matching any term are grouped by content, and a content is kept if
+        each term matches at least one of its rows.
+        :param dialect_name: name of database dialect, one of SUPPORTED_DIALECTS
+        :param search_terms: terms, see get_search_terms()
+        :return: subquery of matching contents with content_id and score
+        columns, higher score being more relevant
+        """
+        search_index = cls.__table__
+        if dialect_name == "sqlite":
+            fts = cls._get_sqlite_fts_table()
+            matches = (
+                select(
+                    [
+                        search_index.c.target_id.label("content_id"),
+                        # INFO - 2019-07-26 - FTS5 rank is lower for better matches.
+                        func.max(-fts.c.rank).label("score"),
+                    ]
+                )
+                .select_from(fts.join(search_index, search_index.c.content_id == fts.c.rowid))
+                .where(cls._get_sqlite_match_clause(fts, search_terms))
+            )
+        else:
+            assert dialect_name == "postgresql"
+            ts_query = cls._get_postgresql_ts_query(search_terms)
+            search_vector = literal_column(cls.POSTGRESQL_SEARCH_VECTOR)
+            matches = select(
+                [
+                    search_index.c.target_id.label("content_id"),
+                    func.max(func.ts_rank(search_vector, ts_query)).label("score"),
+                ]
+            ).where(search_vector.op("@@")(ts_query))
+        if len(search_terms) > 1:
+            matches = matches.where(
+                and_(
+                    *[
+                        search_index.c.target_id.in_(cls._get_target_ids(dialect_name, term))
+                        for term in search_terms
+                    ]
+                )
+            )
+        return matches.group_by(search_index.c.target_id).alias("matches")
+
+    @classmethod
+    def _get_target_ids(cls, dialect_name: str, search_term: str) -> Select:
+        """
+        :return: query of ids of contents having a row matching given term
+        """
+        # INFO - 2019-07-29 - aliases prevent correlation of this subquery to
+        # the enclosing one, which uses the same tables.
+        search_index = cls.__table__.alias()
+        if dialect_name == "sqlite":
+            fts = cls._get_sqlite_fts_table().alias()
+            return (
+                select([search_index.c.target_id])
+                .select_from(fts.join(search_index, search_index.c.content_id == fts.c.rowid))
+                .where(cls._get_sqlite_match_clause(fts, [search_term]))
+            )
+        # INFO - 2019-07-29 - unqualified columns of the search vector refer to
+        # the table of this subquery.
+        return select([search_index.c.target_id]).where(
+            literal_column(cls.POSTGRESQL_SEARCH_VECTOR).op("@@")(
+                cls._get_postgresql_ts_query([search_term])
+            )
+        )
+
+    @classmethod
+    def _get_sqlite_fts_table(cls) -> TableClause:
+        return table(
+            cls.SQLITE_FTS_TABLE_NAME,
+            column("rowid"),
+            column("rank"),
+            column(cls.SQLITE_FTS_TABLE_NAME),
+        )
+
+    @classmethod
+    def _get_sqlite_match_clause(
+        cls, fts: FromClause, search_terms: typing.List[str]
+    ) -> ColumnElement:
+        """
+        :return: clause matching rows with any of search terms
+        """
+        fts_query = " OR ".join('"{}"*'.format(term) for term in search_terms)
+        return fts.c[cls.SQLITE_FTS_TABLE_NAME].op("MATCH")(fts_query)
+
+    @classmethod
+    def _get_postgresql_ts_query(cls, search_terms: typing.List[str]) -> ColumnElement:
+        """
+        :return: ts query matching rows with any of search terms
+        """
+        return func.to_tsquery("simple", " | ".join("{}:*".format(term) for term in search_terms))
+
+
+def create_content_search_fts(target: Table, connection: Connection, **kwargs) -> None:
+    if connection.dialect.name == "sqlite" and ContentSearchIndex.is_enabled(connection):
+        ContentSearchIndex.create_sqlite_fts(connection)
+
+
+listen(ContentSearchIndex.__table__, "after_create", create_content_search_fts)
+listen(
+    ContentSearchIndex.__table__,
+    "after_drop",
+    DDL("DROP TABLE IF EXISTS {}".format(ContentSearchIndex.SQLITE_FTS_TABLE_NAME)).execute_if(
+        dialect="sqlite"
+    ),
+)
+listen(
+    ContentSearchIndex.__table__,
+    "after_create",
+    DDL(
+        "CREATE INDEX idx__content_search_index__search_vector ON content_search_index"
+        " USING gin ({})".format(ContentSearchIndex.POSTGRESQL_SEARCH_VECTOR)
+    ).execute_if(dialect="postgresql"),
+)
+
+
+class FileBlob(DeclarativeBase):
+    """
+    File stored in depot, shared by all revisions having the same file content:
+    files are addressed by the sha256 of their content.
+
+    The blob owns the depot file: depot only removes it when the blob row is
+    deleted (or when its creation is rolled back). Revisions refer to it with a
+    copy of its UploadedFile not listing any file, see get_shared_file(), so
+    that depot never removes a blob file because of a revision.
+
+    ref_count is the number of revisions referring to the blob, it is
+    maintained on revision insertion, see
+    tracim_backend.models.revision_protection.update_file_blob_ref_count.
+    Revisions are never deleted: it only grows, and a blob with no reference
+    is one whose upload was not kept in any revision.
+    """
+
+    # INFO - 2019-07-29 - key of session.info listing files of blobs inserted
+    # in current transaction, see add_new_file().
+    NEW_FILES_SESSION_INFO_KEY = "file_blobs_new_files"
+
+    __tablename__ = "file_blobs"
+
+    sha256 = Column(Unicode(64), primary_key=True, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    depot_file = Column(UploadedFileField, unique=False, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created = Column(DateTime, unique=False, nullable=False, default=datetime.utcnow)
+
+    def get_shared_file(self) -> UploadedFile:
+        """
+        :return: UploadedFile of the blob file to use as depot_file of a revision
+        """
+        return UploadedFile(dict(self.depot_file, files=[]))
+
+    @classmethod
+    def add_new_file(cls, session: Session, depot_file: UploadedFile) -> None:
+        """
+        Remember file of a blob inserted without the ORM in current
+        transaction, so that it is removed from depot if the transaction is
+        rolled back, see
+        tracim_backend.models.revision_protection.remove_rolled_back_file_blobs.
+        """
+        session.info.setdefault(cls.NEW_FILES_SESSION_INFO_KEY, set()).update(depot_file.files)
+
+    @classmethod
+    def is_shared_file(cls, depot_file: typing.Optional[UploadedFile]) -> bool:
+        """
+        :return: True if depot_file refers to a blob file, False for files
+        owned by their revision (uploaded before blobs existed)
+        """
+        return depot_file is not None and not depot_file.files
+
+    @classmethod
+    def update_ref_counts(
+        cls, connection: Connection, revisions_values: typing.List[typing.Dict[str, typing.Any]]
+    ) -> None:
+        """
+        Add references of given new revisions to blobs they refer to.
+        """
+        new_ref_counts = {}  # type: typing.Dict[str, int]
+        for revision_values in revisions_values:
+            if revision_values["sha256"] and cls.is_shared_file(revision_values["depot_file"]):
+                sha256 = revision_values["sha256"]
+                new_ref_counts[sha256] = new_ref_counts.get(sha256, 0) + 1
+        blobs = cls.__table__
+        for sha256, new_ref_count in new_ref_counts.items():
+            connection.execute(
+                blobs.update()
+                .where(blobs.c.sha256 == sha256)
+                .values(ref_count=blobs.c.ref_count + new_ref_count)
+            )
+
+
+class FilePreviewMetadata(DeclarativeBase):
+    """
+    Page number and preview availability of a file content, as given by
+    preview manager. They depend on the file content and on the file
+    extension, used by preview manager to guess the file type.
+
+    They are computed once for all revisions sharing the file, by preview
+    generator daemon when previews are generated ahead of their first view,
+    and read by serializers, see ContentApi.get_preview_metadata(). Metadata
+    of files whose type has no preview are stored as well, with no preview
+    available: they are only computed again if deleted, for instance after
+    installing new preview builders.
+    """
+
+    __tablename__ = "file_preview_metadata"
+
+    sha256 = Column(Unicode(64), primary_key=True, nullable=False)
+    file_extension = Column(Unicode(255), primary_key=True, nullable=False)
+    page_nb = Column(Integer, nullable=True)
+    has_pdf_preview = Column(Boolean, nullable=False)
+    has_jpeg_preview = Column(Boolean, nullable=False)
+    created = Column(DateTime, unique=False, nullable=False, default=datetime.utcnow)
+
+
+class ContentSubtree(object):
+    """
+    In-memory index of all descendants of a content, loaded with few
+    queries: one for the ids of the subtree, then one for the contents and
+    one for their revisions per chunk of IDS_CHUNK_SIZE ids. Children of a
+    content are found with a parent id -> children dict instead of querying
+    each node.
+    """
+
+    IDS_CHUNK_SIZE = 500
+
+    def __init__(self, root: Content, descendants: typing.List[Content]) -> None:
+        self.root = root
+        self.descendants = sorted(descendants, key=lambda content: content.id)
+        self.contents = {content.id: content for content in self.descendants}
+        self.children_index = {}  # type: typing.Dict[int, typing.List[Content]]
+        for content in self.descendants:
+            self.children_index.setdefault(content.parent_id, []).append(content)
+
+    def __contains__(self, content: Content) -> bool:
+        return content.id in self.contents
+
+    def get_children(self, content_id: int, recursively: bool = False) -> typing.List[Content]:
+        """
+        Get children of given content of the subtree, sorted by content id
+        """
+        if not recursively:
+            return list(self.children_index.get(content_id, []))
+        children = []
+        parent_ids = [content_id]
+        while parent_ids:
+            parent_id = parent_ids.pop()
+            for child in self.children_index.get(parent_id, []):
+                children.append(child)
+                parent_ids.append(child.id)
+        return sorted(children, key=lambda content: content.id)
+
+    def get_descendants(self) -> typing.List[Content]:
+        return list(self.descendants)
+
+    def get_tree_revisions(self) -> typing.List[ContentRevisionRO]:
+        """Get all revisions sorted by id of root content and all descendants"""
+        revisions = list(self.root.revisions)
+        for content in self.descendants:
+            revisions.extend(content.revisions)
+        return sorted(revisions, key=lambda revision: revision.revision_id)
+
+    @classmethod
+    def load(cls, session: Session, root: Content) -> "ContentSubtree":
+        subtree_ids = cls.get_descendant_ids(session, root.id)
+        descendants = []  # type: typing.List[Content]
+        for start in range(0, len(subtree_ids), cls.IDS_CHUNK_SIZE):
+            end = start + cls.IDS_CHUNK_SIZE
+            descendants.extend(
+                session.query(Content)
+                .filter(Content.id.in_(subtree_ids[start:end]))
+                .options(selectinload(Content.revisions))
+                .all()
+            )
+        return cls(root, descendants)
+
+    @classmethod
+    def get_descendant_ids(
+        cls, session: Session, root_id: int, valid_only: bool = False
+    ) -> typing.List[int]:
+        """
+        Return ids of all descendants of root_id, empty if content has no
+        descendant.
+        :param valid_only: do not go through deleted or archived contents,
+        like Content.get_valid_children()
+        """
+        if not cls.supports_recursive_cte(session):
+            return cls._get_descendant_ids_by_level(session, root_id, valid_only)
+
+        subtree = cls._children_ids_query(session, Content, ContentRevisionRO, valid_only)
+        subtree = subtree.filter(ContentRevisionRO.parent_id == root_id).cte(
+            name="subtree", recursive=True
+        )
+        child_content = aliased(Content, name="child_content")
+        child_revision = aliased(ContentRevisionRO, name="child_revision")
+        # INFO - 2019-07-02 - use UNION and not UNION ALL, duplicates are discarded
+        # so the recursion ends even if the tree is corrupted with a cycle.
+        subtree = subtree.union(
+            cls._children_ids_query(session, child_content, child_revision, valid_only).join(
+                subtree, child_revision.parent_id == subtree.c.content_id
+            )
+        )
+        return [row[0] for row in session.query(subtree.c.content_id)]
+
+    @classmethod
+    def supports_recursive_cte(cls, session: Session) -> bool:
+        """
+        MySQL < 8 doesn't support recursive CTE, callers fallback to one query
+        per depth level of the tree.
+        """
+        dialect = session.get_bind().dialect
+        if dialect.name != "mysql":
+            return True
+        return (dialect.server_version_info or (0,)) >= (8, 0)
+
+    @classmethod
+    def _children_ids_query(
+        cls, session: Session, content: typing.Any, revision: typing.Any, valid_only: bool
+    ) -> Query:
+        query = session.query(content.id.label("content_id")).join(
+            revision, revision.revision_id == content.current_revision_id
+        )
+        if valid_only:
+            query = query.filter(
+                revision.is_deleted == False, revision.is_archived == False  # noqa: E712
+            )
+        return query
+
+    @classmethod
+    def _get_descendant_ids_by_level(
+        cls, session: Session, root_id: int, valid_only: bool
+    ) -> typing.List[int]:
+        subtree_ids = set()  # type: typing.Set[int]
+        parent_ids = [root_id]
+        while parent_ids:
+            children_ids = [
+                row[0]
+                for row in cls._children_ids_query(
+                    session, Content, ContentRevisionRO, valid_only
+                ).filter(ContentRevisionRO.parent_id.in_(parent_ids))
+            ]
+            parent_ids = [
+                child_id
+                for child_id in children_ids
+                if child_id not in subtree_ids and child_id != root_id
+            ]
+            subtree_ids.update(parent_ids)
+        return list(subtree_ids)
 
 
 class RevisionReadStatus(DeclarativeBase):
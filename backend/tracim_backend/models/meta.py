@@ -1,6 +1,15 @@
 # -*- coding: utf-8 -*-
+import typing
+
+from sqlalchemy import and_
+from sqlalchemy import select
+from sqlalchemy.dialects import mysql
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.schema import MetaData
+from sqlalchemy.schema import Table
 
 # Recommended naming convention used by Alembic, as various different database
 # providers will autogenerate vastly different names making migrations more
@@ -17,3 +26,46 @@ NAMING_CONVENTION = {
 
 metadata = MetaData(naming_convention=NAMING_CONVENTION)
 DeclarativeBase = declarative_base(metadata=metadata)
+
+
+def insert_ignoring_duplicates(
+    connection: Connection, table: Table, values: typing.Dict[str, typing.Any]
+) -> None:
+    """
+    Insert a row in table, unless a row with the same primary key already
+    exists, instead of failing: useful for rows which can be inserted by
+    concurrent transactions. Other errors are raised as usual.
+    :param connection: connection of the current transaction
+    :param values: values of the row by column name
+    """
+    dialect_name = connection.dialect.name
+    if dialect_name == "postgresql":
+        connection.execute(
+            postgresql.insert(table).on_conflict_do_nothing(
+                index_elements=table.primary_key.columns
+            ),
+            values,
+        )
+        return
+    if dialect_name == "mysql":
+        primary_key_column = list(table.primary_key.columns)[0]
+        connection.execute(
+            mysql.insert(table).on_duplicate_key_update(
+                {primary_key_column.name: primary_key_column}
+            ),
+            values,
+        )
+        return
+    primary_key_filter = and_(
+        *(column == values[column.name] for column in table.primary_key.columns)
+    )
+    if connection.execute(select([table]).where(primary_key_filter)).first():
+        return
+    try:
+        connection.execute(table.insert(), values)
+    except IntegrityError:
+        # INFO - 2019-07-29 - row inserted by a concurrent transaction in the
+        # meantime: failed statement is rolled back alone by these databases,
+        # unlike postgresql whose upsert is used above.
+        if not connection.execute(select([table]).where(primary_key_filter)).first():
+            raise
@@ -1,15 +1,28 @@
 # -*- coding: utf-8 -*-
 from contextlib import contextmanager
 
+from depot.manager import DepotManager
+from sqlalchemy import and_
 from sqlalchemy import inspect
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+from sqlalchemy.event import listen
+from sqlalchemy.orm import Mapper
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.session import SessionTransaction
 from sqlalchemy.orm.unitofwork import UOWTransaction
 from transaction import TransactionManager
 
+from tracim_backend.app_models.contents import content_type_list
 from tracim_backend.exceptions import ContentRevisionDeleteError
 from tracim_backend.exceptions import ContentRevisionUpdateError
 from tracim_backend.models.data import Content
+from tracim_backend.models.data import ContentAncestor
+from tracim_backend.models.data import ContentFilename
 from tracim_backend.models.data import ContentRevisionRO
+from tracim_backend.models.data import ContentSearchIndex
+from tracim_backend.models.data import FileBlob
 from tracim_backend.models.meta import DeclarativeBase
 
 
@@ -27,6 +40,156 @@ def prevent_content_revision_delete(
             )
 
 
+def update_content_current_revision(
+    mapper: Mapper, connection: Connection, revision: ContentRevisionRO
+) -> None:
+    """
+    Set Content.current_revision_id to the just inserted revision.
+    Revisions are immutable and revision_id is always growing, so the last
+    inserted revision of a content is always the current one.
+    """
+    content_table = Content.__table__
+    connection.execute(
+        content_table.update()
+        .where(content_table.c.id == revision.content_id)
+        .values(current_revision_id=revision.revision_id)
+    )
+    # INFO - 2019-07-01 - also update already loaded content object to avoid
+    # stale value without needing to refresh it from database.
+    content = revision.__dict__.get("node")
+    if content is not None:
+        set_committed_value(content, "current_revision_id", revision.revision_id)
+
+
+def update_content_ancestors(
+    mapper: Mapper, connection: Connection, revision: ContentRevisionRO
+) -> None:
+    """
+    Keep ContentAncestor closure table up to date when a content is created
+    or when the parent of a content changes. Deletion and archiving don't
+    change the tree, state of ancestors is read from their current revision.
+    """
+    ancestors = ContentAncestor.__table__
+    content_id = revision.content_id
+    parent_id = revision.parent_id
+    ancestor_id_by_depth = {
+        depth: ancestor_id
+        for ancestor_id, depth in connection.execute(
+            select([ancestors.c.ancestor_id, ancestors.c.depth]).where(
+                and_(ancestors.c.descendant_id == content_id, ancestors.c.depth <= 1)
+            )
+        )
+    }
+    if 0 not in ancestor_id_by_depth:
+        # INFO - 2019-07-09 - new content
+        connection.execute(
+            ancestors.insert().values(ancestor_id=content_id, descendant_id=content_id, depth=0)
+        )
+    elif ancestor_id_by_depth.get(1) == parent_id:
+        return
+    else:
+        # INFO - 2019-07-09 - content moved: unlink content and its descendants
+        # from old ancestors. Subtree is wrapped in a derived table because
+        # MySQL doesn't allow to select from the table being deleted otherwise.
+        subtree = (
+            select([ancestors.c.descendant_id])
+            .where(ancestors.c.ancestor_id == content_id)
+            .alias("subtree")
+        )
+        old_ancestors = (
+            select([ancestors.c.ancestor_id])
+            .where(and_(ancestors.c.descendant_id == content_id, ancestors.c.depth > 0))
+            .alias("old_ancestors")
+        )
+        connection.execute(
+            ancestors.delete().where(
+                and_(
+                    ancestors.c.descendant_id.in_(select([subtree.c.descendant_id])),
+                    ancestors.c.ancestor_id.in_(select([old_ancestors.c.ancestor_id])),
+                )
+            )
+        )
+
+    if parent_id is not None:
+        ContentAncestor.link_subtree(connection, content_id, parent_id)
+
+
+def update_content_filename(
+    mapper: Mapper, connection: Connection, revision: ContentRevisionRO
+) -> None:
+    """
+    Keep ContentFilename index up to date with the just inserted revision.
+    """
+    if revision.type == content_type_list.Comment.slug:
+        return
+    # INFO - 2019-07-11 - values are read from __dict__: columns with a server
+    # default not set on revision must not be loaded during flush.
+    revision_values = {
+        column.name: revision.__dict__.get(column.name)
+        for column in ContentRevisionRO.__table__.columns
+    }
+    ContentFilename.update_contents(connection, [revision_values])
+
+
+def update_content_search_index(
+    mapper: Mapper, connection: Connection, revision: ContentRevisionRO
+) -> None:
+    """
+    Keep ContentSearchIndex up to date with the just inserted revision.
+    """
+    if not ContentSearchIndex.is_enabled(connection):
+        return
+    revision_values = {
+        column.name: revision.__dict__.get(column.name)
+        for column in ContentRevisionRO.__table__.columns
+    }
+    ContentSearchIndex.update_contents(connection, [revision_values])
+
+
+def update_file_blob_ref_count(
+    mapper: Mapper, connection: Connection, revision: ContentRevisionRO
+) -> None:
+    """
+    Count the just inserted revision as a reference to the blob of its file.
+    """
+    FileBlob.update_ref_counts(
+        connection,
+        [
+            {
+                "sha256": revision.__dict__.get("sha256"),
+                "depot_file": revision.__dict__.get("depot_file"),
+            }
+        ],
+    )
+
+
+def remove_rolled_back_file_blobs(
+    session: Session, previous_transaction: SessionTransaction
+) -> None:
+    """
+    Remove from depot files of blobs inserted by a rolled back transaction,
+    see FileBlob.add_new_file().
+    """
+    for entry in session.info.pop(FileBlob.NEW_FILES_SESSION_INFO_KEY, set()):
+        depot_name, file_id = entry.split("/", 1)
+        DepotManager.get(depot_name).delete(file_id)
+
+
+def forget_committed_file_blobs(session: Session) -> None:
+    """
+    Keep files of blobs inserted by a committed transaction,
+    see FileBlob.add_new_file().
+    """
+    session.info.pop(FileBlob.NEW_FILES_SESSION_INFO_KEY, None)
+
+
+listen(ContentRevisionRO, "after_insert", update_content_current_revision)
+listen(ContentRevisionRO, "after_insert", update_content_ancestors)
+listen(ContentRevisionRO, "after_insert", update_content_filename)
+listen(ContentRevisionRO, "after_insert", update_content_search_index)
+listen(ContentRevisionRO, "after_insert", update_file_blob_ref_count)
+
+
 class RevisionsIntegrity(object):
     """
     Simple static used class to manage a list with list of ContentRevisionRO
@@ -18,6 +18,7 @@ from tracim_backend.models.auth import Permission  # noqa: F401
 from tracim_backend.models.auth import User  # noqa: F401
 from tracim_backend.models.data import Content  # noqa: F401
 from tracim_backend.models.data import ContentRevisionRO  # noqa: F401
+from tracim_backend.models.data import ContentSearchIndex
 from tracim_backend.models.meta import DeclarativeBase  # noqa: F401
 
 if typing.TYPE_CHECKING:
@@ -40,7 +41,10 @@ def get_engine(app_config: "CFG", prefix="sqlalchemy.") -> Engine:
         new_key = key.lower().replace("__", ".")
         new_config[new_key] = value
 
-    return engine_from_config(new_config, prefix=prefix)
+    engine = engine_from_config(new_config, prefix=prefix)
+    if app_config.SEARCH__ENGINE == "sql":
+        listen(engine, "connect", ContentSearchIndex.enable_on_connect)
+    return engine
 
 
 def get_session_factory(engine) -> sessionmaker:
@@ -88,9 +92,13 @@ def get_tm_session(session_factory, transaction_manager) -> Session:
     # troubles somewhere else.
     # see https://stackoverflow.com/questions/16152241/how-to-get-a-sqlalchemy-session-managed-by-zope-transaction-that-has-the-same-sc
     zope.sqlalchemy.register(dbsession, transaction_manager=transaction_manager, keep_session=True)
+    from tracim_backend.models.revision_protection import forget_committed_file_blobs
     from tracim_backend.models.revision_protection import prevent_content_revision_delete
+    from tracim_backend.models.revision_protection import remove_rolled_back_file_blobs
 
     listen(dbsession, "before_flush", prevent_content_revision_delete)
+    listen(dbsession, "after_soft_rollback", remove_rolled_back_file_blobs)
+    listen(dbsession, "after_commit", forget_committed_file_blobs)
     return dbsession
 
 
@@ -42,6 +42,8 @@ class TestCommands(CommandFunctionalTest):
         assert output.find("user update") > 0
         assert output.find("db init") > 0
         assert output.find("db delete") > 0
+        assert output.find("db fill-files-metadata") > 0
+        assert output.find("db delete-unused-files") > 0
         assert output.find("webdav start") > 0
         assert output.find("caldav start") > 0
         assert output.find("caldav sync") > 0
@@ -49,6 +51,8 @@ class TestCommands(CommandFunctionalTest):
         assert output.find("search index-populate") > 0
         assert output.find("search index-upgrade-experimental") > 0
         assert output.find("search index-drop") > 0
+        assert output.find("preview cache-report") > 0
+        assert output.find("preview cache-prune") > 0
         assert output.find("dev parameters list") > 0
 
     def test_func__user_create_command__ok__nominal_case(self) -> None:
@@ -302,6 +306,58 @@ class TestCommands(CommandFunctionalTest):
         assert not new_user.validate_password("admin@admin.admin")
         assert new_user.profile.name == "trusted-users"
 
+    def test_func__fill_files_metadata_command__ok__nominal_case(self) -> None:
+        """
+        Test filling size and sha256 of revisions files
+        """
+        self.disconnect_database()
+        app = TracimCLI()
+        result = app.run(
+            [
+                "db",
+                "fill-files-metadata",
+                "-c",
+                "{}#command_test".format(TEST_CONFIG_FILE_PATH),
+                "--debug",
+            ]
+        )
+        assert result == 0
+
+    def test_func__delete_unused_files_command__ok__nominal_case(self) -> None:
+        """
+        Test deleting files no revision refers to
+        """
+        self.disconnect_database()
+        app = TracimCLI()
+        result = app.run(
+            [
+                "db",
+                "delete-unused-files",
+                "-c",
+                "{}#command_test".format(TEST_CONFIG_FILE_PATH),
+                "--debug",
+            ]
+        )
+        assert result == 0
+
+    def test_func__preview_cache_prune_command__ok__nominal_case(self) -> None:
+        """
+        Test pruning preview cache
+        """
+        self.disconnect_database()
+        app = TracimCLI()
+        result = app.run(
+            [
+                "preview",
+                "cache-prune",
+                "-c",
+                "{}#command_test".format(TEST_CONFIG_FILE_PATH),
+                "--dry-run",
+                "--debug",
+            ]
+        )
+        assert result == 0
+
     def test__init__db__ok_db_already_exist(self):
         """
         Test database initialisation
@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
+import hashlib
 import io
+import time
+import typing
 from urllib.parse import quote
+from wsgiref.util import FileWrapper
 
 from PIL import Image
 from depot.io.utils import FileIntent
@@ -12,8 +16,12 @@ from tracim_backend.error import ErrorCode
 from tracim_backend.fixtures.content import Content as ContentFixtures
 from tracim_backend.fixtures.users_and_groups import Base as BaseFixture
 from tracim_backend.lib.core.content import ContentApi
+from tracim_backend.lib.core.group import GroupApi
+from tracim_backend.lib.core.user import UserApi
 from tracim_backend.lib.core.workspace import WorkspaceApi
+from tracim_backend.lib.preview.signed_url import JpgPreviewSigner
 from tracim_backend.models.auth import User
+from tracim_backend.models.data import FilePreviewMetadata
 from tracim_backend.models.revision_protection import new_revision
 from tracim_backend.models.setup_models import get_tm_session
 from tracim_backend.tests import FunctionalTest
@@ -2220,6 +2228,130 @@ class TestFiles(FunctionalTest):
         assert res.last_modified.month == test_file.updated.month
         assert res.last_modified.year == test_file.updated.year
 
+    def test_api__get_file__ok_200__stored_preview_metadata(self) -> None:
+        """
+        Get one file and its revisions: page number and preview availability
+        are read from database once stored, computed without being stored else
+        """
+        dbsession = get_tm_session(self.session_factory, transaction.manager)
+        admin = dbsession.query(User).filter(User.email == "admin@admin.admin").one()
+        workspace_api = WorkspaceApi(current_user=admin, session=dbsession, config=self.app_config)
+        content_api = ContentApi(current_user=admin, session=dbsession, config=self.app_config)
+        business_workspace = workspace_api.get_one(1)
+        tool_folder = content_api.get_one(1, content_type=content_type_list.Any_SLUG)
+        test_file = content_api.create(
+            content_type_slug=content_type_list.File.slug,
+            workspace=business_workspace,
+            parent=tool_folder,
+            label="Test file",
+            do_save=False,
+            do_notify=False,
+        )
+        with new_revision(session=dbsession, tm=transaction.manager, content=test_file):
+            content_api.update_file_data(
+                test_file,
+                new_content=create_1000px_png_test_image().read(),
+                new_filename="Test_file.png",
+                new_mimetype="image/png",
+            )
+        dbsession.flush()
+        transaction.commit()
+        content_id = int(test_file.content_id)
+        sha256 = test_file.sha256
+        assert dbsession.query(FilePreviewMetadata).count() == 0
+
+        self.testapp.authorization = ("Basic", ("admin@admin.admin", "admin@admin.admin"))
+        res = self.testapp.get("/api/v2/workspaces/1/files/{}".format(content_id), status=200)
+        assert res.json_body["page_nb"] == 1
+        assert res.json_body["has_pdf_preview"] is False
+        assert res.json_body["has_jpeg_preview"] is True
+        # INFO - 2019-07-29 - get requests don't write metadata, preview
+        # generator daemon does.
+        assert dbsession.query(FilePreviewMetadata).count() == 0
+
+        dbsession.add(
+            FilePreviewMetadata(
+                sha256=sha256,
+                file_extension=".png",
+                page_nb=3,
+                has_pdf_preview=False,
+                has_jpeg_preview=True,
+            )
+        )
+        transaction.commit()
+        res = self.testapp.get("/api/v2/workspaces/1/files/{}".format(content_id), status=200)
+        assert res.json_body["page_nb"] == 3
+        res = self.testapp.get(
+            "/api/v2/workspaces/1/files/{}/revisions".format(content_id), status=200
+        )
+        assert [revision["page_nb"] for revision in res.json_body] == [3]
+
+    def test_api__get_file_raw__ok_206__range_and_conditional_requests(self) -> None:
+        """
+        Get part of one file of a content, and check file is not sent again
+        when client already has it
+        """
+        dbsession = get_tm_session(self.session_factory, transaction.manager)
+        admin = dbsession.query(User).filter(User.email == "admin@admin.admin").one()
+        workspace_api = WorkspaceApi(current_user=admin, session=dbsession, config=self.app_config)
+        content_api = ContentApi(current_user=admin, session=dbsession, config=self.app_config)
+        business_workspace = workspace_api.get_one(1)
+        tool_folder = content_api.get_one(1, content_type=content_type_list.Any_SLUG)
+        test_file = content_api.create(
+            content_type_slug=content_type_list.File.slug,
+            workspace=business_workspace,
+            parent=tool_folder,
+            label="Test file",
+            do_save=False,
+            do_notify=False,
+        )
+        with new_revision(session=dbsession, tm=transaction.manager, content=test_file):
+            content_api.update_file_data(
+                test_file,
+                new_content=b"Test file",
+                new_filename="Test_file.txt",
+                new_mimetype="text/plain",
+            )
+        dbsession.flush()
+        transaction.commit()
+        content_id = int(test_file.content_id)
+        self.testapp.authorization = ("Basic", ("admin@admin.admin", "admin@admin.admin"))
+        url = "/api/v2/workspaces/1/files/{}/raw/Test_file.txt".format(content_id)
+        res = self.testapp.get(url, status=200)
+        assert res.body == b"Test file"
+        assert res.headers["Accept-Ranges"] == "bytes"
+        etag = res.headers["ETag"]
+        assert etag == '"{}"'.format(hashlib.sha256(b"Test file").hexdigest())
+        res = self.testapp.get(url, extra_environ={"wsgi.file_wrapper": FileWrapper}, status=200)
+        assert res.body == b"Test file"
+
+        res = self.testapp.get(url, headers={"Range": "bytes=5-"}, status=206)
+        assert res.body == b"file"
+        assert res.headers["Content-Range"] == "bytes 5-8/9"
+        res = self.testapp.get(url, headers={"Range": "bytes=0-3"}, status=206)
+        assert res.body == b"Test"
+        self.testapp.get(url, headers={"Range": "bytes=20-"}, status=416)
+
+        res = self.testapp.get(url, headers={"If-None-Match": etag}, status=304)
+        assert res.body == b""
+        res = self.testapp.get(url, headers={"If-None-Match": '"other"'}, status=200)
+        self.testapp.get(
+            url, headers={"If-Modified-Since": res.headers["Last-Modified"]}, status=304
+        )
+
+        # INFO - 2019-07-18 - etag of a revision file is kept by revisions not
+        # changing it.
+        res = self.testapp.put_json(
+            "/api/v2/workspaces/1/files/{}".format(content_id),
+            params={"label": "Renamed file", "raw_content": "<p>description</p>"},
+            status=200,
+        )
+        res = self.testapp.get(
+            "/api/v2/workspaces/1/files/{}/raw/Renamed_file.txt".format(content_id),
+            headers={"If-None-Match": etag},
+            status=304,
+        )
+
     def test_api__create_file__ok__200__nominal_case(self) -> None:
         """
         create one file of a content at workspace root
@@ -2817,6 +2949,112 @@ class TestFiles(FunctionalTest):
         assert "code" in res.json.keys()
         assert res.json_body["code"] == ErrorCode.UNAIVALABLE_PREVIEW
 
+    def _create_preview_urls_files(self) -> typing.Tuple[int, int]:
+        """
+        Create a png file and a file without preview in workspace 1
+        :return: ids of both files
+        """
+        dbsession = get_tm_session(self.session_factory, transaction.manager)
+        admin = dbsession.query(User).filter(User.email == "admin@admin.admin").one()
+        workspace_api = WorkspaceApi(current_user=admin, session=dbsession, config=self.app_config)
+        content_api = ContentApi(current_user=admin, session=dbsession, config=self.app_config)
+        business_workspace = workspace_api.get_one(1)
+        tool_folder = content_api.get_one(1, content_type=content_type_list.Any_SLUG)
+        image_file = content_api.create(
+            content_type_slug=content_type_list.File.slug,
+            workspace=business_workspace,
+            parent=tool_folder,
+            label="Test image",
+            do_save=False,
+            do_notify=False,
+        )
+        with new_revision(session=dbsession, tm=transaction.manager, content=image_file):
+            content_api.update_file_data(
+                image_file, "test_image.png", "image/png", create_1000px_png_test_image().read()
+            )
+        binary_file = content_api.create(
+            content_type_slug=content_type_list.File.slug,
+            workspace=business_workspace,
+            parent=tool_folder,
+            label="Test file",
+            do_save=False,
+            do_notify=False,
+        )
+        with new_revision(session=dbsession, tm=transaction.manager, content=binary_file):
+            content_api.update_file_data(
+                binary_file,
+                "Test_file.bin",
+                new_mimetype="application/octet-stream",
+                new_content=bytes(100),
+            )
+        dbsession.flush()
+        content_ids = (int(image_file.content_id), int(binary_file.content_id))
+        transaction.commit()
+        return content_ids
+
+    def test_api__get_sized_jpeg_preview_urls__ok__200__nominal_case(self) -> None:
+        """
+        get signed urls of 256x256 previews of many files at once, then
+        previews without authentication
+        """
+        image_id, binary_id = self._create_preview_urls_files()
+        self.testapp.authorization = ("Basic", ("admin@admin.admin", "admin@admin.admin"))
+        res = self.testapp.get(
+            "/api/v2/workspaces/1/files/previews/jpg/256x256",
+            params={"content_ids": "{},{},1".format(image_id, binary_id)},
+            status=200,
+        )
+        preview_urls = {preview_url["content_id"]: preview_url for preview_url in res.json_body}
+        assert sorted(preview_urls.keys()) == sorted([image_id, binary_id])
+        assert preview_urls[binary_id]["url"] is None
+        url = preview_urls[image_id]["url"]
+        assert url.startswith("http://localhost/api/v2/previews/jpg/")
+        assert url.endswith("/test_image_page_1_256x256.jpg")
+
+        self.testapp.authorization = None
+        res = self.testapp.get(url, status=200)
+        assert res.content_type == "image/jpeg"
+        assert res.headers["ETag"]
+        new_image = Image.open(io.BytesIO(res.body))
+        assert new_image.size == (256, 256)
+
+    def test_api__get_sized_jpeg_preview_urls__err_400__dim_not_allowed(self) -> None:
+        image_id, _ = self._create_preview_urls_files()
+        self.testapp.authorization = ("Basic", ("admin@admin.admin", "admin@admin.admin"))
+        res = self.testapp.get(
+            "/api/v2/workspaces/1/files/previews/jpg/512x512",
+            params={"content_ids": str(image_id)},
+            status=400,
+        )
+        assert res.json_body["code"] == ErrorCode.PREVIEW_DIM_NOT_ALLOWED
+
+    def test_api__get_signed_jpeg_preview__err_403__invalid_or_expired(self) -> None:
+        image_id, _ = self._create_preview_urls_files()
+        self.testapp.authorization = ("Basic", ("admin@admin.admin", "admin@admin.admin"))
+        res = self.testapp.get(
+            "/api/v2/workspaces/1/files/previews/jpg/256x256",
+            params={"content_ids": str(image_id)},
+            status=200,
+        )
+        token = res.json_body[0]["url"].split("/")[-2]
+        self.testapp.authorization = None
+        res = self.testapp.get("/api/v2/previews/jpg/{}a/image.jpg".format(token), status=403)
+        assert res.json_body["code"] == ErrorCode.INVALID_SIGNED_PREVIEW_URL
+        preview = JpgPreviewSigner.from_config(self.app_config).load(token)
+        expired_token = JpgPreviewSigner.from_config(self.app_config).sign(
+            preview.depot_file_id,
+            preview.file_extension,
+            preview.page,
+            preview.width,
+            preview.height,
+            preview.file_tag,
+            now=time.time() - 2 * self.app_config.PREVIEW__SIGNED_URL__LIFETIME - 1,
+        )
+        res = self.testapp.get(
+            "/api/v2/previews/jpg/{}/image.jpg".format(expired_token), status=403
+        )
+        assert res.json_body["code"] == ErrorCode.EXPIRED_SIGNED_PREVIEW_URL
+
     def test_api__get_sized_jpeg_preview__ok__200__force_download_case(self) -> None:
         """
         get 256x256 preview of a txt file
@@ -3661,6 +3899,65 @@ class TestFiles(FunctionalTest):
         assert res.json_body["code"] == ErrorCode.INVALID_STATUS_CHANGE
 
 
+class TestFilesXAccelRedirect(FunctionalTest):
+    """
+    Tests for /api/v2/workspaces/{workspace_id}/files/{content_id}/raw
+    endpoint with files sent by front web server
+    """
+
+    fixtures = [BaseFixture, ContentFixtures]
+    config_section = "functional_test_x_accel_redirect"
+
+    def test_api__get_file_raw__ok_200__x_accel_redirect(self) -> None:
+        dbsession = get_tm_session(self.session_factory, transaction.manager)
+        admin = dbsession.query(User).filter(User.email == "admin@admin.admin").one()
+        uapi = UserApi(current_user=admin, session=dbsession, config=self.app_config)
+        gapi = GroupApi(current_user=admin, session=dbsession, config=self.app_config)
+        uapi.create_user(
+            "test@test.test",
+            password="test@test.test",
+            do_save=True,
+            do_notify=False,
+            groups=[gapi.get_one_with_name("users")],
+        )
+        workspace_api = WorkspaceApi(current_user=admin, session=dbsession, config=self.app_config)
+        content_api = ContentApi(current_user=admin, session=dbsession, config=self.app_config)
+        business_workspace = workspace_api.get_one(1)
+        tool_folder = content_api.get_one(1, content_type=content_type_list.Any_SLUG)
+        test_file = content_api.create(
+            content_type_slug=content_type_list.File.slug,
+            workspace=business_workspace,
+            parent=tool_folder,
+            label="Test file",
+            do_save=False,
+            do_notify=False,
+        )
+        with new_revision(session=dbsession, tm=transaction.manager, content=test_file):
+            content_api.update_file_data(
+                test_file,
+                new_content=b"Test file",
+                new_filename="Test_file.txt",
+                new_mimetype="text/plain",
+            )
+        dbsession.flush()
+        transaction.commit()
+        content_id = int(test_file.content_id)
+        file_id = test_file.depot_file.file_id
+        self.testapp.authorization = ("Basic", ("admin@admin.admin", "admin@admin.admin"))
+        url = "/api/v2/workspaces/1/files/{}/raw/Test_file.txt".format(content_id)
+        res = self.testapp.get(url, status=200)
+        assert res.body == b""
+        assert res.headers["X-Accel-Redirect"] == "/tracim_depot_storage/{}/file".format(file_id)
+        assert res.content_type == "text/plain"
+        assert res.headers["ETag"] == '"{}"'.format(hashlib.sha256(b"Test file").hexdigest())
+        self.testapp.get(url, headers={"If-None-Match": res.headers["ETag"]}, status=304)
+
+        # INFO - 2019-07-19 - access is still checked by tracim
+        self.testapp.authorization = ("Basic", ("test@test.test", "test@test.test"))
+        res = self.testapp.get(url, status=400)
+        assert "X-Accel-Redirect" not in res.headers
+
+
 class TestThreads(FunctionalTest):
     """
     Tests for /api/v2/workspaces/{workspace_id}/threads/{content_id}
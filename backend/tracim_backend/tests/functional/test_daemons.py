@@ -1,4 +1,7 @@
+import os
+
 import pytest
+import transaction
 
 from tracim_backend.app_models.contents import content_type_list
 from tracim_backend.fixtures.content import Content as ContentFixture
@@ -8,7 +11,16 @@ from tracim_backend.lib.core.user import UserApi
 from tracim_backend.lib.core.workspace import WorkspaceApi
 from tracim_backend.lib.mail_fetcher.daemon import MailFetcherDaemon
 from tracim_backend.lib.mail_notifier.daemon import MailSenderDaemon
+from tracim_backend.lib.preview.cache import PreviewCache
+from tracim_backend.lib.preview.daemon import PreviewGeneratorDaemon
+from tracim_backend.lib.preview.generator import PreviewGenerator
+from tracim_backend.models.data import Content
+from tracim_backend.models.data import FilePreviewMetadata
+from tracim_backend.models.revision_protection import new_revision
+from tracim_backend.tests import FunctionalTest
 from tracim_backend.tests import MailHogTest
+from tracim_backend.tests import create_1000px_png_test_image
+from tracim_backend.tests import eq_
 
 
 class TestMailNotifyDaemon(MailHogTest):
@@ -103,3 +115,79 @@ class TestMailSenderDaemon(MailHogTest):
             mail_fetcher.run()
         except AttributeError:
             pytest.fail("Mail sender raise attribute error")
+
+
+class TestPreviewGeneratorDaemon(FunctionalTest):
+    fixtures = [BaseFixture, ContentFixture]
+    config_section = "functional_test_preview_pre_generation"
+
+    def _create_image_content(self) -> Content:
+        uapi = UserApi(current_user=None, session=self.session, config=self.app_config)
+        user = uapi.get_one_by_email("admin@admin.admin")
+        workspace = WorkspaceApi(
+            current_user=user, session=self.session, config=self.app_config
+        ).get_one_by_label("Recipes")
+        api = ContentApi(current_user=user, session=self.session, config=self.app_config)
+        content = api.create(
+            content_type_list.File.slug, workspace, None, "image", do_save=True, do_notify=False
+        )
+        with new_revision(session=self.session, tm=transaction.manager, content=content):
+            api.update_file_data(
+                content, "image.png", "image/png", create_1000px_png_test_image().read()
+            )
+        api.save(content)
+        transaction.commit()
+        return api.get_one(content.content_id, content_type_list.Any_SLUG)
+
+    def test_func__preview_generator_daemon__ok__previews_generated_on_upload(self):
+        content = self._create_image_content()
+
+        api = ContentApi(current_user=None, session=self.session, config=self.app_config)
+        api.execute_update_content_actions(content)
+        daemon = PreviewGeneratorDaemon(self.app_config, burst=True)
+        daemon.run()
+
+        file_cache_dir = PreviewCache.from_config(self.app_config).get_file_cache_dir(
+            api.get_one_revision_filepath(content.revision_id)
+        )
+        preview_files = os.listdir(file_cache_dir)
+        assert len([name for name in preview_files if name.endswith(".jpeg")]) == 2
+
+    def test_func__generate_previews__ok__previews_used_on_first_view(self):
+        content = self._create_image_content()
+
+        preview_generator = PreviewGenerator(self.app_config)
+        try:
+            preview_generator.generate_previews(content.depot_file.file_id, content.sha256, ".png")
+        finally:
+            preview_generator.close()
+        api = ContentApi(current_user=None, session=self.session, config=self.app_config)
+        file_cache_dir = PreviewCache.from_config(self.app_config).get_file_cache_dir(
+            api.get_one_revision_filepath(content.revision_id)
+        )
+        preview_files = os.listdir(file_cache_dir)
+        for width, height in ((256, 256), (512, 512)):
+            preview_path = api.get_jpg_preview_path(
+                content_id=content.content_id,
+                revision_id=content.revision_id,
+                page_number=1,
+                file_extension=".png",
+                width=width,
+                height=height,
+            )
+            assert os.path.basename(preview_path) in preview_files
+        eq_(sorted(preview_files), sorted(os.listdir(file_cache_dir)))
+        preview_metadata = self.session.query(FilePreviewMetadata).one()
+        eq_((content.sha256, ".png"), (preview_metadata.sha256, preview_metadata.file_extension))
+        eq_(1, preview_metadata.page_nb)
+        assert preview_metadata.has_jpeg_preview is True
+
+    def test_func__generate_previews__ok__file_not_found(self):
+        preview_generator = PreviewGenerator(self.app_config)
+        try:
+            preview_generator.generate_previews(
+                "b3f0ae2a-5d2f-4f8e-9a7c-5b7ad1f9d3e1", "0" * 64, ".png"
+            )
+        finally:
+            preview_generator.close()
+        eq_(0, self.session.query(FilePreviewMetadata).count())
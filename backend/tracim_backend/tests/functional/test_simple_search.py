@@ -1,4 +1,5 @@
 from parameterized import parameterized
+from sqlalchemy import inspect
 import transaction
 
 from tracim_backend.lib.core.content import ContentApi
@@ -7,6 +8,7 @@ from tracim_backend.lib.core.user import UserApi
 from tracim_backend.lib.core.userworkspace import RoleApi
 from tracim_backend.lib.core.workspace import WorkspaceApi
 from tracim_backend.models.auth import User
+from tracim_backend.models.data import ContentSearchIndex
 from tracim_backend.models.data import UserRoleInWorkspace
 from tracim_backend.models.revision_protection import new_revision
 from tracim_backend.models.setup_models import get_tm_session
@@ -558,3 +560,23 @@ class TestSimpleSearch(FunctionalTest):
         assert search_result["is_total_hits_accurate"] is False
         assert len(search_result["contents"]) == 1
         assert search_result["contents"][0]["label"].startswith("stringtosearch archived")
+
+    def test_api___simple_search_ok__no_sql_search_index(self) -> None:
+        dbsession = get_tm_session(self.session_factory, transaction.manager)
+        admin = dbsession.query(User).filter(User.email == "admin@admin.admin").one()
+        workspace_api = WorkspaceApi(current_user=admin, session=dbsession, config=self.app_config)
+        workspace = workspace_api.create_workspace("test", save_now=True)
+        api = ContentApi(session=dbsession, current_user=admin, config=self.app_config)
+        document = api.create(
+            content_type_slug="html-document", workspace=workspace, label="test", do_save=True
+        )
+        with new_revision(session=dbsession, tm=transaction.manager, content=document):
+            api.update_content(document, new_label="renamed", new_content="content")
+            api.save(document)
+        transaction.commit()
+
+        dbsession = get_tm_session(self.session_factory, transaction.manager)
+        assert dbsession.query(ContentSearchIndex).count() == 0
+        assert (
+            ContentSearchIndex.SQLITE_FTS_TABLE_NAME not in inspect(self.engine).get_table_names()
+        )
@@ -0,0 +1,373 @@
+from parameterized import parameterized
+import transaction
+from zope.sqlalchemy import mark_changed
+
+from tracim_backend.lib.core.content import ContentApi
+from tracim_backend.lib.core.group import GroupApi
+from tracim_backend.lib.core.user import UserApi
+from tracim_backend.lib.core.userworkspace import RoleApi
+from tracim_backend.lib.core.workspace import WorkspaceApi
+from tracim_backend.lib.search.search_factory import SearchFactory
+from tracim_backend.models.auth import User
+from tracim_backend.models.data import ContentSearchIndex
+from tracim_backend.models.data import UserRoleInWorkspace
+from tracim_backend.models.revision_protection import new_revision
+from tracim_backend.models.setup_models import get_tm_session
+from tracim_backend.tests import FunctionalTest
+
+
+class TestSqlSearch(FunctionalTest):
+    config_section = "functional_test_sql_search"
+
+    def _create_workspace_and_user(self, dbsession):
+        admin = dbsession.query(User).filter(User.email == "admin@admin.admin").one()
+        uapi = UserApi(current_user=admin, session=dbsession, config=self.app_config)
+        gapi = GroupApi(current_user=admin, session=dbsession, config=self.app_config)
+        groups = [gapi.get_one_with_name("trusted-users")]
+        user = uapi.create_user(
+            "test@test.test",
+            password="test@test.test",
+            do_save=True,
+            do_notify=False,
+            groups=groups,
+        )
+        workspace_api = WorkspaceApi(
+            current_user=admin, session=dbsession, config=self.app_config, show_deleted=True
+        )
+        workspace = workspace_api.create_workspace("test", save_now=True)
+        rapi = RoleApi(current_user=admin, session=dbsession, config=self.app_config)
+        rapi.create_one(user, workspace, UserRoleInWorkspace.WORKSPACE_MANAGER, False)
+        return workspace, user
+
+    def _search(self, params):
+        self.testapp.authorization = ("Basic", ("test@test.test", "test@test.test"))
+        res = self.testapp.get("/api/v2/search/content", status=200, params=params)
+        return res.json_body
+
+    @parameterized.expand(
+        [
+            # search_string, nb_content_result, first_search_result_content_name
+            # exact syntax
+            ("testdocument", 1, "testdocument"),
+            # autocomplete
+            ("testdoc", 1, "testdocument"),
+            # all words must match
+            ("another cont", 1, "another content"),
+            # file name
+            ("testdocument.document.html", 1, "testdocument"),
+            # same relevance -> first result is the last updated one
+            ("test", 2, "testdocument"),
+        ]
+    )
+    def test_api___sql_search_ok__by_label(
+        self, search_string, nb_content_result, first_search_result_content_name
+    ) -> None:
+        dbsession = get_tm_session(self.session_factory, transaction.manager)
+        workspace, user = self._create_workspace_and_user(dbsession)
+        api = ContentApi(session=dbsession, current_user=user, config=self.app_config)
+        api.create(
+            content_type_slug="html-document", workspace=workspace, label="test", do_save=True
+        )
+        api.create(
+            content_type_slug="html-document",
+            workspace=workspace,
+            label="testdocument",
+            do_save=True,
+        )
+        api.create(
+            content_type_slug="html-document",
+            workspace=workspace,
+            label="another content",
+            do_save=True,
+        )
+        transaction.commit()
+
+        search_result = self._search({"search_string": search_string})
+        assert search_result["total_hits"] == nb_content_result
+        assert search_result["is_total_hits_accurate"] is True
+        assert len(search_result["contents"]) == nb_content_result
+        assert search_result["contents"][0]["label"] == first_search_result_content_name
+
+    def test_api___sql_search_ok__by_content_and_comments(self) -> None:
+        dbsession = get_tm_session(self.session_factory, transaction.manager)
+        workspace, user = self._create_workspace_and_user(dbsession)
+        api = ContentApi(session=dbsession, current_user=user, config=self.app_config)
+        document = api.create(
+            content_type_slug="html-document",
+            workspace=workspace,
+            label="good practices",
+            do_save=True,
+        )
+        with new_revision(session=dbsession, tm=transaction.manager, content=document):
+            api.update_content(
+                document,
+                new_label="good practices",
+                new_content="<p>this a content body we search a <em>subpart</em>.</p>",
+            )
+            api.save(document)
+        thread = api.create(
+            content_type_slug="thread", workspace=workspace, label="discussion", do_save=True
+        )
+        api.create_comment(
+            workspace=workspace, parent=thread, content="<p>subpart of a comment</p>", do_save=True
+        )
+        api.create_comment(
+            workspace=workspace, parent=thread, content="<p>another subpart</p>", do_save=True
+        )
+        api.create(
+            content_type_slug="html-document", workspace=workspace, label="subpart", do_save=True
+        )
+        transaction.commit()
+
+        search_result = self._search({"search_string": "subpart"})
+        # INFO - 2019-07-26 - label matches are the most relevant, thread is
+        # found once for its both comments.
+        assert search_result["total_hits"] == 3
+        labels = [content["label"] for content in search_result["contents"]]
+        assert labels[0] == "subpart"
+        assert sorted(labels[1:]) == ["discussion", "good practices"]
+        scores = [content["score"] for content in search_result["contents"]]
+        assert scores == sorted(scores, reverse=True)
+
+        search_result = self._search({"search_string": "comment"})
+        assert search_result["total_hits"] == 1
+        assert search_result["contents"][0]["label"] == "discussion"
+
+        # INFO - 2019-07-26 - html tags are not indexed
+        search_result = self._search({"search_string": "em"})
+        assert search_result["total_hits"] == 0
+
+        # INFO - 2019-07-29 - terms may match a content and its comments
+        # separately, but all of them must match.
+        search_result = self._search({"search_string": "discussion comment"})
+        assert search_result["total_hits"] == 1
+        assert search_result["contents"][0]["label"] == "discussion"
+        search_result = self._search({"search_string": "another comment"})
+        assert search_result["total_hits"] == 1
+        assert search_result["contents"][0]["label"] == "discussion"
+        search_result = self._search({"search_string": "good comment"})
+        assert search_result["total_hits"] == 0
+
+    def test_api___sql_search_ok__pagination(self) -> None:
+        dbsession = get_tm_session(self.session_factory, transaction.manager)
+        workspace, user = self._create_workspace_and_user(dbsession)
+        api = ContentApi(session=dbsession, current_user=user, config=self.app_config)
+        for index in range(5):
+            api.create(
+                content_type_slug="html-document",
+                workspace=workspace,
+                label="stringtosearch {}".format(index),
+                do_save=True,
+            )
+        transaction.commit()
+
+        search_result = self._search({"search_string": "stringtosearch", "size": 2, "page_nb": 1})
+        assert search_result["total_hits"] == 5
+        assert [content["label"] for content in search_result["contents"]] == [
+            "stringtosearch 4",
+            "stringtosearch 3",
+        ]
+        search_result = self._search({"search_string": "stringtosearch", "size": 2, "page_nb": 3})
+        assert search_result["total_hits"] == 5
+        assert [content["label"] for content in search_result["contents"]] == ["stringtosearch 0"]
+
+    def test_api___sql_search_ok__no_search_string(self) -> None:
+        dbsession = get_tm_session(self.session_factory, transaction.manager)
+        workspace, user = self._create_workspace_and_user(dbsession)
+        api = ContentApi(session=dbsession, current_user=user, config=self.app_config)
+        api.create(
+            content_type_slug="html-document", workspace=workspace, label="test", do_save=True
+        )
+        transaction.commit()
+
+        for params in ({}, {"search_string": "..."}):
+            search_result = self._search(params)
+            assert search_result["total_hits"] == 0
+            assert search_result["is_total_hits_accurate"] is True
+            assert len(search_result["contents"]) == 0
+
+    def test_api___sql_search_ok__filter_by_content_type(self) -> None:
+        dbsession = get_tm_session(self.session_factory, transaction.manager)
+        workspace, user = self._create_workspace_and_user(dbsession)
+        api = ContentApi(session=dbsession, current_user=user, config=self.app_config)
+        api.create(
+            content_type_slug="html-document",
+            workspace=workspace,
+            label="stringtosearch doc",
+            do_save=True,
+        )
+        thread = api.create(
+            content_type_slug="thread", workspace=workspace, label="discussion", do_save=True
+        )
+        api.create_comment(
+            workspace=workspace, parent=thread, content="stringtosearch", do_save=True
+        )
+        api.create(
+            content_type_slug="folder",
+            workspace=workspace,
+            label="stringtosearch folder",
+            do_save=True,
+        )
+        transaction.commit()
+
+        search_result = self._search({"search_string": "stringtosearch"})
+        assert search_result["total_hits"] == 3
+
+        search_result = self._search(
+            {"search_string": "stringtosearch", "content_types": "html-document,thread"}
+        )
+        assert search_result["total_hits"] == 2
+        assert sorted(content["label"] for content in search_result["contents"]) == [
+            "discussion",
+            "stringtosearch doc",
+        ]
+
+        search_result = self._search({"search_string": "stringtosearch", "content_types": "folder"})
+        assert search_result["total_hits"] == 1
+        assert search_result["contents"][0]["label"] == "stringtosearch folder"
+
+    def test_api___sql_search_ok__filter_by_deleted_archived_active(self) -> None:
+        dbsession = get_tm_session(self.session_factory, transaction.manager)
+        workspace, user = self._create_workspace_and_user(dbsession)
+        api = ContentApi(session=dbsession, current_user=user, config=self.app_config)
+        api.create(
+            content_type_slug="html-document",
+            workspace=workspace,
+            label="stringtosearch active",
+            do_save=True,
+        )
+        deleted_folder = api.create(
+            content_type_slug="folder", workspace=workspace, label="folder", do_save=True
+        )
+        api.create(
+            content_type_slug="html-document",
+            workspace=workspace,
+            parent=deleted_folder,
+            label="stringtosearch in deleted folder",
+            do_save=True,
+        )
+        with new_revision(session=dbsession, tm=transaction.manager, content=deleted_folder):
+            api.delete(deleted_folder)
+        api.save(deleted_folder)
+        archived_content = api.create(
+            content_type_slug="html-document",
+            workspace=workspace,
+            label="stringtosearch archived",
+            do_save=True,
+        )
+        with new_revision(session=dbsession, tm=transaction.manager, content=archived_content):
+            api.archive(archived_content)
+        api.save(archived_content)
+        thread = api.create(
+            content_type_slug="thread", workspace=workspace, label="discussion", do_save=True
+        )
+        comment = api.create_comment(
+            workspace=workspace, parent=thread, content="stringtosearch", do_save=True
+        )
+        with new_revision(session=dbsession, tm=transaction.manager, content=comment):
+            api.delete(comment)
+        api.save(comment)
+        transaction.commit()
+
+        search_result = self._search({"search_string": "stringtosearch"})
+        assert search_result["total_hits"] == 1
+        assert search_result["contents"][0]["label"] == "stringtosearch active"
+
+        search_result = self._search(
+            {"search_string": "stringtosearch", "show_deleted": 1, "show_archived": 1}
+        )
+        assert search_result["total_hits"] == 3
+
+        search_result = self._search(
+            {
+                "search_string": "stringtosearch",
+                "show_active": 0,
+                "show_deleted": 0,
+                "show_archived": 1,
+            }
+        )
+        assert search_result["total_hits"] == 1
+        assert search_result["contents"][0]["label"].startswith("stringtosearch archived")
+
+    def test_api___sql_search_ok__copied_content(self) -> None:
+        dbsession = get_tm_session(self.session_factory, transaction.manager)
+        workspace, user = self._create_workspace_and_user(dbsession)
+        api = ContentApi(session=dbsession, current_user=user, config=self.app_config)
+        folder = api.create(
+            content_type_slug="folder", workspace=workspace, label="folder", do_save=True
+        )
+        document = api.create(
+            content_type_slug="html-document",
+            workspace=workspace,
+            parent=folder,
+            label="stringtosearch",
+            do_save=True,
+        )
+        api.copy(folder, new_label="folder copy")
+        with new_revision(session=dbsession, tm=transaction.manager, content=document):
+            api.update_content(document, new_label="renamed", new_content="")
+            api.save(document)
+        transaction.commit()
+
+        search_result = self._search({"search_string": "stringtosearch"})
+        assert search_result["total_hits"] == 1
+        assert search_result["contents"][0]["parent_id"] != folder.content_id
+        search_result = self._search({"search_string": "renamed"})
+        assert search_result["total_hits"] == 1
+
+    def test_api___sql_search_ok__rebuild_index(self) -> None:
+        dbsession = get_tm_session(self.session_factory, transaction.manager)
+        workspace, user = self._create_workspace_and_user(dbsession)
+        api = ContentApi(session=dbsession, current_user=user, config=self.app_config)
+        thread = api.create(
+            content_type_slug="thread", workspace=workspace, label="discussion", do_save=True
+        )
+        api.create_comment(
+            workspace=workspace, parent=thread, content="stringtosearch", do_save=True
+        )
+        search_api = SearchFactory.get_search_lib(
+            current_user=None, session=dbsession, config=self.app_config
+        )
+        search_api.delete_index()
+        transaction.commit()
+        assert self._search({"search_string": "stringtosearch"})["total_hits"] == 0
+
+        dbsession = get_tm_session(self.session_factory, transaction.manager)
+        search_api = SearchFactory.get_search_lib(
+            current_user=None, session=dbsession, config=self.app_config
+        )
+        search_api.index_all_content()
+        transaction.commit()
+        search_result = self._search({"search_string": "stringtosearch"})
+        assert search_result["total_hits"] == 1
+        assert search_result["contents"][0]["label"] == "discussion"
+
+    def test_api___sql_search_ok__switch_from_other_search_engine(self) -> None:
+        dbsession = get_tm_session(self.session_factory, transaction.manager)
+        workspace, user = self._create_workspace_and_user(dbsession)
+        api = ContentApi(session=dbsession, current_user=user, config=self.app_config)
+        api.create(
+            content_type_slug="html-document",
+            workspace=workspace,
+            label="stringtosearch",
+            do_save=True,
+        )
+        # INFO - 2019-07-26 - database as created and used with another search
+        # engine: without FTS5 table and index rows.
+        dbsession.execute("DROP TABLE {}".format(ContentSearchIndex.SQLITE_FTS_TABLE_NAME))
+        dbsession.execute("DROP TRIGGER content_search_index_after_insert")
+        dbsession.execute("DROP TRIGGER content_search_index_after_delete")
+        dbsession.execute(ContentSearchIndex.__table__.delete())
+        mark_changed(dbsession)
+        transaction.commit()
+
+        dbsession = get_tm_session(self.session_factory, transaction.manager)
+        search_api = SearchFactory.get_search_lib(
+            current_user=None, session=dbsession, config=self.app_config
+        )
+        search_api.create_index()
+        search_api.index_all_content()
+        transaction.commit()
+        search_result = self._search({"search_string": "stringtosearch"})
+        assert search_result["total_hits"] == 1
+        assert search_result["contents"][0]["label"] == "stringtosearch"
@@ -1,7 +1,14 @@
 # -*- coding: utf-8 -*-
+import datetime
+import hashlib
+import io
 import typing
 
+from depot.io.utils import FileIntent
+from depot.manager import DepotManager
+from mock import patch
 import pytest
+from sqlalchemy.orm import Query
 import transaction
 
 # TODO - G.M - 28-03-2018 - [GroupApi] Re-enable GroupApi
@@ -18,6 +25,7 @@ from tracim_backend.fixtures.users_and_groups import Test as FixtureTest
 from tracim_backend.lib.core.content import ContentApi
 from tracim_backend.lib.core.content import compare_content_for_sorting_by_type_and_name
 from tracim_backend.lib.core.group import GroupApi
+from tracim_backend.lib.core.read_status import ReadStatusApi
 from tracim_backend.lib.core.user import UserApi
 from tracim_backend.lib.core.workspace import RoleApi
 from tracim_backend.lib.core.workspace import WorkspaceApi
@@ -25,6 +33,10 @@ from tracim_backend.models.auth import Group
 from tracim_backend.models.auth import User
 from tracim_backend.models.data import ActionDescription
 from tracim_backend.models.data import Content
+from tracim_backend.models.data import ContentFilename
+from tracim_backend.models.data import ContentRevisionRO
+from tracim_backend.models.data import FileBlob
+from tracim_backend.models.data import FilePreviewMetadata
 from tracim_backend.models.data import UserRoleInWorkspace
 from tracim_backend.models.revision_protection import new_revision
 from tracim_backend.tests import DefaultTest
@@ -288,8 +300,165 @@ class TestContentApi(DefaultTest):
         content.type = content_type_list.Page.slug
         content.revision_type = ActionDescription.CREATION
         self.session.add(content)
-        api.save(content, ActionDescription.CREATION, do_notify=False)
-        assert api._is_filename_available("test", workspace, parent=None) is False
+        # INFO - 2019-07-11 - file name unicity is also enforced by database
+        with pytest.raises(ContentFilenameAlreadyUsedInFolder):
+            api.save(content, ActionDescription.CREATION, do_notify=False)
+
+    def test_unit__update_content__ok__legacy_duplicate_filename(self):
+        user = self.session.query(User).filter(User.email == "admin@admin.admin").one()
+        workspace = WorkspaceApi(
+            current_user=user, session=self.session, config=self.app_config
+        ).create_workspace("test workspace", save_now=True)
+        api = ContentApi(current_user=user, session=self.session, config=self.app_config)
+        page = api.create(content_type_list.Page.slug, workspace, None, "page", do_save=True)
+        duplicate = api.create(
+            content_type_list.Page.slug, workspace, None, "duplicate", do_save=True
+        )
+        duplicate_id = duplicate.content_id
+        # INFO - 2019-07-26 - contents sharing a file name before the file name
+        # index existed, as left by its migration.
+        self.session.execute(
+            ContentRevisionRO.__table__.update()
+            .where(ContentRevisionRO.__table__.c.content_id == duplicate_id)
+            .values(label="page")
+        )
+        self.session.execute(
+            ContentFilename.__table__.update()
+            .where(ContentFilename.__table__.c.content_id == duplicate_id)
+            .values(
+                file_name_key=ContentFilename.get_legacy_file_name_key(duplicate_id, page.file_name)
+            )
+        )
+        transaction.commit()
+        self.session.expire_all()
+
+        def get_duplicate_row() -> ContentFilename:
+            return self.session.query(ContentFilename).get(duplicate_id)
+
+        duplicate = api.get_one(duplicate_id, content_type_list.Any_SLUG)
+        with new_revision(session=self.session, tm=transaction.manager, content=duplicate):
+            api.set_status(duplicate, "closed-validated")
+        api.save(duplicate)
+        transaction.commit()
+        assert get_duplicate_row().file_name_key == ContentFilename.get_legacy_file_name_key(
+            duplicate_id, page.file_name
+        )
+        assert get_duplicate_row().is_active is True
+
+        duplicate = api.get_one(duplicate_id, content_type_list.Any_SLUG)
+        with new_revision(session=self.session, tm=transaction.manager, content=duplicate):
+            api.set_status(duplicate, "open")
+            api.update_content(duplicate, new_label="renamed")
+        api.save(duplicate)
+        transaction.commit()
+        duplicate = api.get_one(duplicate_id, content_type_list.Any_SLUG)
+        assert get_duplicate_row().file_name_key == ContentFilename.get_file_name_key(
+            duplicate.file_name
+        )
+        assert get_duplicate_row().is_active is True
+
+        duplicate = api.get_one(duplicate_id, content_type_list.Any_SLUG)
+        with pytest.raises(ContentFilenameAlreadyUsedInFolder):
+            with new_revision(session=self.session, tm=transaction.manager, content=duplicate):
+                duplicate.label = "page"
+                api.save(duplicate)
+
+    def test_unit__undelete__err__filename_used_meanwhile(self):
+        user = self.session.query(User).filter(User.email == "admin@admin.admin").one()
+        workspace = WorkspaceApi(
+            current_user=user, session=self.session, config=self.app_config
+        ).create_workspace("test workspace", save_now=True)
+        api = ContentApi(
+            current_user=user,
+            session=self.session,
+            config=self.app_config,
+            show_deleted=True,
+            show_archived=True,
+        )
+        page = api.create(content_type_list.Page.slug, workspace, None, "page", do_save=True)
+        with new_revision(session=self.session, tm=transaction.manager, content=page):
+            api.delete(page)
+        api.save(page)
+        # INFO - 2019-07-29 - file name of deleted page used by an active page.
+        active_api = ContentApi(current_user=user, session=self.session, config=self.app_config)
+        other_page = active_api.create(
+            content_type_list.Page.slug, workspace, None, "other", do_save=True
+        )
+        with new_revision(session=self.session, tm=transaction.manager, content=other_page):
+            other_page.file_name = page.file_name
+        active_api.save(other_page)
+        transaction.commit()
+
+        page = api.get_one(page.content_id, content_type_list.Any_SLUG)
+        with pytest.raises(ContentFilenameAlreadyUsedInFolder):
+            with new_revision(session=self.session, tm=transaction.manager, content=page):
+                api.undelete(page)
+
+    def test_unit__save__err__filename_used_by_concurrent_write(self):
+        user = self.session.query(User).filter(User.email == "admin@admin.admin").one()
+        workspace = WorkspaceApi(
+            current_user=user, session=self.session, config=self.app_config
+        ).create_workspace("test workspace", save_now=True)
+        api = ContentApi(current_user=user, session=self.session, config=self.app_config)
+        page = api.create(content_type_list.Page.slug, workspace, None, "page", do_save=True)
+        other_page = api.create(content_type_list.Page.slug, workspace, None, "other", do_save=True)
+        # INFO - 2019-07-29 - page is hidden to this api like a page created
+        # by a concurrent transaction, but its file name is already indexed.
+        self.session.execute(
+            ContentRevisionRO.__table__.update()
+            .where(ContentRevisionRO.__table__.c.content_id == page.content_id)
+            .values(is_deleted=True)
+        )
+        transaction.commit()
+
+        other_page = api.get_one(other_page.content_id, content_type_list.Any_SLUG)
+        with pytest.raises(ContentFilenameAlreadyUsedInFolder):
+            with new_revision(session=self.session, tm=transaction.manager, content=other_page):
+                api.update_content(other_page, new_label="page")
+                api.save(other_page)
+
+    def test_unit__is_filename_available__ok__normalized_filename(self):
+        uapi = UserApi(session=self.session, config=self.app_config, current_user=None)
+        group_api = GroupApi(current_user=None, session=self.session, config=self.app_config)
+        groups = [
+            group_api.get_one(Group.TIM_USER),
+            group_api.get_one(Group.TIM_MANAGER),
+            group_api.get_one(Group.TIM_ADMIN),
+        ]
+
+        user = uapi.create_minimal_user(email="this.is@user", groups=groups, save_now=True)
+        workspace = WorkspaceApi(
+            current_user=user, session=self.session, config=self.app_config
+        ).create_workspace("test workspace", save_now=True)
+        api = ContentApi(current_user=user, session=self.session, config=self.app_config)
+        folder = api.create(
+            content_type_slug=content_type_list.Folder.slug,
+            workspace=workspace,
+            label="folder",
+            do_save=True,
+        )
+        content = api.create(
+            content_type_slug=content_type_list.Page.slug,
+            workspace=workspace,
+            parent=folder,
+            label="caf\u00e9",
+            do_save=True,
+        )
+        # INFO - 2019-07-11 - decomposed form of "café", as sent by some
+        # WebDAV clients
+        assert api._is_filename_available("cafe\u0301.document.html", workspace, folder) is False
+        assert api._is_filename_available("cafe\u0301.document.html", workspace, None) is True
+        assert (
+            api._is_filename_available(
+                "cafe\u0301.document.html", workspace, folder, exclude_content_id=content.content_id
+            )
+            is True
+        )
+        with new_revision(session=self.session, tm=transaction.manager, content=content):
+            api.move(content, new_parent=None, new_workspace=workspace)
+        api.save(content)
+        assert api._is_filename_available("caf\u00e9.document.html", workspace, folder) is True
+        assert api._is_filename_available("caf\u00e9.document.html", workspace, None) is False
 
     def test_unit__is_filename_available__ok__different_workspace(self):
         uapi = UserApi(session=self.session, config=self.app_config, current_user=None)
@@ -490,7 +659,7 @@ class TestContentApi(DefaultTest):
             "allowed_content"
         ] == content_type_list.default_allowed_content_properties(folder.type)
 
-    def test_unit__get_allowed_content_type__ok__html_document(self):
+    def test_unit__get_allowed_content_types__ok__html_document(self):
         uapi = UserApi(session=self.session, config=self.app_config, current_user=None)
         group_api = GroupApi(current_user=None, session=self.session, config=self.app_config)
         groups = [
@@ -500,16 +669,23 @@ class TestContentApi(DefaultTest):
         ]
 
         user = uapi.create_minimal_user(email="this.is@user", groups=groups, save_now=True)
-        WorkspaceApi(
+        workspace = WorkspaceApi(
             current_user=user, session=self.session, config=self.app_config
         ).create_workspace("test workspace", save_now=True)
         api = ContentApi(current_user=user, session=self.session, config=self.app_config)
-        allowed_content_type_dict = {"html-document": True, "file": False}
-        allowed_content_types = api._get_allowed_content_type(allowed_content_type_dict)
-        assert len(allowed_content_types) == 1
-        assert allowed_content_types[0] == content_type_list.get_one_by_slug("html-document")
+        folder = api.create(
+            content_type_slug=content_type_list.Folder.slug,
+            workspace=workspace,
+            parent=None,
+            label="plop",
+            do_save=False,
+        )
+        folder.properties = {"allowed_content": {"html-document": True, "file": False}}
+        assert folder.get_allowed_content_types() == [
+            content_type_list.get_one_by_slug("html-document")
+        ]
 
-    def test_unit__get_allowed_content_type__ok__page_legacy_alias(self):
+    def test_unit__get_allowed_content_types__ok__page_legacy_alias(self):
         uapi = UserApi(session=self.session, config=self.app_config, current_user=None)
         group_api = GroupApi(current_user=None, session=self.session, config=self.app_config)
         groups = [
@@ -519,14 +695,77 @@ class TestContentApi(DefaultTest):
         ]
 
         user = uapi.create_minimal_user(email="this.is@user", groups=groups, save_now=True)
-        WorkspaceApi(
+        workspace = WorkspaceApi(
             current_user=user, session=self.session, config=self.app_config
         ).create_workspace("test workspace", save_now=True)
         api = ContentApi(current_user=user, session=self.session, config=self.app_config)
-        allowed_content_type_dict = {"page": True, "file": False}
-        allowed_content_types = api._get_allowed_content_type(allowed_content_type_dict)
-        assert len(allowed_content_types) == 1
-        assert allowed_content_types[0] == content_type_list.get_one_by_slug("html-document")
+        folder = api.create(
+            content_type_slug=content_type_list.Folder.slug,
+            workspace=workspace,
+            parent=None,
+            label="plop",
+            do_save=False,
+        )
+        folder.properties = {"allowed_content": {"page": True, "file": False}}
+        assert folder.get_allowed_content_types() == [
+            content_type_list.get_one_by_slug("html-document")
+        ]
+
+    def test_unit__get_allowed_content_types__err__unknown_content_type(self):
+        uapi = UserApi(session=self.session, config=self.app_config, current_user=None)
+        group_api = GroupApi(current_user=None, session=self.session, config=self.app_config)
+        groups = [
+            group_api.get_one(Group.TIM_USER),
+            group_api.get_one(Group.TIM_MANAGER),
+            group_api.get_one(Group.TIM_ADMIN),
+        ]
+
+        user = uapi.create_minimal_user(email="this.is@user", groups=groups, save_now=True)
+        workspace = WorkspaceApi(
+            current_user=user, session=self.session, config=self.app_config
+        ).create_workspace("test workspace", save_now=True)
+        api = ContentApi(current_user=user, session=self.session, config=self.app_config)
+        folder = api.create(
+            content_type_slug=content_type_list.Folder.slug,
+            workspace=workspace,
+            parent=None,
+            label="plop",
+            do_save=False,
+        )
+        folder.properties = {"allowed_content": {"unknown": True, "file": True}}
+        with pytest.raises(ValueError):
+            folder.get_allowed_content_types()
+
+    def test_unit__properties__err__read_only(self):
+        uapi = UserApi(session=self.session, config=self.app_config, current_user=None)
+        group_api = GroupApi(current_user=None, session=self.session, config=self.app_config)
+        groups = [
+            group_api.get_one(Group.TIM_USER),
+            group_api.get_one(Group.TIM_MANAGER),
+            group_api.get_one(Group.TIM_ADMIN),
+        ]
+
+        user = uapi.create_minimal_user(email="this.is@user", groups=groups, save_now=True)
+        workspace = WorkspaceApi(
+            current_user=user, session=self.session, config=self.app_config
+        ).create_workspace("test workspace", save_now=True)
+        api = ContentApi(current_user=user, session=self.session, config=self.app_config)
+        folder = api.create(
+            content_type_slug=content_type_list.Folder.slug,
+            workspace=workspace,
+            parent=None,
+            label="plop",
+            do_save=False,
+        )
+        api.set_allowed_content(folder, [content_type_list.File.slug])
+        with pytest.raises(TypeError):
+            folder.properties["allowed_content"]["file"] = False
+        with pytest.raises(TypeError):
+            folder.properties["origin"] = {}
+        properties = folder.properties.copy()
+        properties["allowed_content"] = {content_type_list.Folder.slug: True}
+        folder.properties = properties
+        assert folder.get_allowed_content_types() == [content_type_list.Folder]
 
     def test_unit___check_valid_content_type_in_dir__ok__nominal(self):
         uapi = UserApi(session=self.session, config=self.app_config, current_user=None)
@@ -1078,6 +1317,7 @@ class TestContentApi(DefaultTest):
         ).create_workspace("test workspace2", save_now=True)
         folderb = api2.create(content_type_list.Folder.slug, workspace2, None, "folder b", "", True)
 
+        copy_datetime = datetime.datetime.utcnow()
         api2.copy(item=text_file, new_parent=folderb, new_label="test_file_copy")
 
         transaction.commit()
@@ -1087,7 +1327,8 @@ class TestContentApi(DefaultTest):
         assert text_file_copy.content_id != text_file.content_id
         assert text_file_copy.workspace_id == workspace2.workspace_id
         assert text_file_copy.depot_file.file.read() == text_file.depot_file.file.read()
-        assert text_file_copy.depot_file.path != text_file.depot_file.path
+        # INFO - 2019-07-10 - copy shares stored file of original content
+        assert text_file_copy.depot_file.path == text_file.depot_file.path
         assert text_file_copy.label == "test_file_copy"
         assert text_file_copy.type == text_file.type
         assert text_file_copy.parent.content_id == folderb.content_id
@@ -1097,6 +1338,8 @@ class TestContentApi(DefaultTest):
         assert text_file_copy.file_extension == text_file.file_extension
         assert text_file_copy.file_mimetype == text_file.file_mimetype
         assert text_file_copy.revision_type == ActionDescription.COPY
+        assert text_file_copy.created >= copy_datetime
+        assert text_file_copy.updated == text_file_copy.created
         assert len(text_file_copy.revisions) == len(text_file.revisions) + 1
 
     def test_unit_copy_file_with_comments_different_label_different_parent_ok(self):
@@ -1152,6 +1395,7 @@ class TestContentApi(DefaultTest):
         ).create_workspace("test workspace2", save_now=True)
         folderb = api2.create(content_type_list.Folder.slug, workspace2, None, "folder b", "", True)
 
+        copy_datetime = datetime.datetime.utcnow()
         api2.copy(item=text_file, new_parent=folderb, new_label="test_file_copy")
 
         transaction.commit()
@@ -1162,12 +1406,20 @@ class TestContentApi(DefaultTest):
         assert text_file.children[0].description == "just a comment"
         assert text_file_copy.children[0].description == text_file.children[0].description
         assert text_file_copy.children[0].id != text_file.children[0].id
-        assert text_file_copy.children[0].created == text_file.children[0].created
+        assert text_file_copy.children[0].created >= copy_datetime
+        assert (
+            text_file_copy.children[0].revisions[0].created
+            == text_file.children[0].revisions[0].created
+        )
 
         assert text_file.children[1].description == "just another comment"
         assert text_file_copy.children[1].description == text_file.children[1].description
         assert text_file_copy.children[1].id != text_file.children[1].id
-        assert text_file_copy.children[1].created == text_file.children[1].created
+        assert text_file_copy.children[1].created >= copy_datetime
+        assert (
+            text_file_copy.children[1].revisions[0].created
+            == text_file.children[1].revisions[0].created
+        )
         # INFO - G.M - 2019-04-30 - check if both recursive
         # revision tree of content and copy are similar
         assert len(text_file_copy.get_tree_revisions()) == len(text_file.get_tree_revisions()) + 3
@@ -1267,7 +1519,8 @@ class TestContentApi(DefaultTest):
         assert text_file_copy.content_id != text_file.content_id
         assert text_file_copy.workspace_id == workspace2.workspace_id
         assert text_file_copy.depot_file.file.read() == text_file.depot_file.file.read()
-        assert text_file_copy.depot_file.path != text_file.depot_file.path
+        # INFO - 2019-07-10 - copy shares stored file of original content
+        assert text_file_copy.depot_file.path == text_file.depot_file.path
         assert text_file_copy.label == text_file.label
         assert text_file_copy.type == text_file.type
         assert text_file_copy.parent.content_id == folderb.content_id
@@ -1319,7 +1572,8 @@ class TestContentApi(DefaultTest):
         assert text_file_copy.content_id != text_file.content_id
         assert text_file_copy.workspace_id == workspace.workspace_id
         assert text_file_copy.depot_file.file.read() == text_file.depot_file.file.read()
-        assert text_file_copy.depot_file.path != text_file.depot_file.path
+        # INFO - 2019-07-10 - copy shares stored file of original content
+        assert text_file_copy.depot_file.path == text_file.depot_file.path
         assert text_file_copy.label == "test_file_copy"
         assert text_file_copy.type == text_file.type
         assert text_file_copy.parent.content_id == foldera.content_id
@@ -1490,6 +1744,42 @@ class TestContentApi(DefaultTest):
         for rev in page_4.revisions:
             eq_(user_b in rev.read_by.keys(), True)
 
+    def test_mark_read__workspace__ok__update_read_date(self):
+        uapi = UserApi(session=self.session, config=self.app_config, current_user=None)
+        group_api = GroupApi(current_user=None, session=self.session, config=self.app_config)
+        groups = [
+            group_api.get_one(Group.TIM_USER),
+            group_api.get_one(Group.TIM_MANAGER),
+            group_api.get_one(Group.TIM_ADMIN),
+        ]
+        user_a = uapi.create_minimal_user(email="this.is@user", groups=groups, save_now=True)
+        user_b = uapi.create_minimal_user(
+            email="this.is@another.user", groups=groups, save_now=True
+        )
+        workspace = WorkspaceApi(
+            current_user=user_a, session=self.session, config=self.app_config
+        ).create_workspace("test workspace", save_now=True)
+        RoleApi(current_user=user_a, session=self.session, config=self.app_config).create_one(
+            user_b, workspace, UserRoleInWorkspace.READER, False
+        )
+        cont_api_a = ContentApi(current_user=user_a, session=self.session, config=self.app_config)
+        cont_api_b = ContentApi(current_user=user_b, session=self.session, config=self.app_config)
+        read_page = cont_api_a.create(
+            content_type_list.Page.slug, workspace, None, "read page", do_save=True
+        )
+        unread_page = cont_api_a.create(
+            content_type_list.Page.slug, workspace, None, "unread page", do_save=True
+        )
+        first_read_datetime = datetime.datetime(2019, 7, 1)
+        cont_api_b.mark_read(read_page, read_datetime=first_read_datetime)
+        eq_(read_page.revisions[0].read_by[user_b], first_read_datetime)
+
+        read_datetime = datetime.datetime(2019, 7, 2)
+        cont_api_b.mark_read__workspace(workspace, read_datetime=read_datetime)
+        for page in (read_page, unread_page):
+            for revision in page.revisions:
+                eq_(revision.read_by[user_b], read_datetime)
+
     def test_mark_read(self):
         uapi = UserApi(session=self.session, config=self.app_config, current_user=None)
         group_api = GroupApi(current_user=None, session=self.session, config=self.app_config)
@@ -1524,6 +1814,306 @@ class TestContentApi(DefaultTest):
         for rev in page_1.revisions:
             eq_(user_b in rev.read_by.keys(), True)
 
+    def test_mark_read__recursive_and_unread(self):
+        uapi = UserApi(session=self.session, config=self.app_config, current_user=None)
+        group_api = GroupApi(current_user=None, session=self.session, config=self.app_config)
+        groups = [
+            group_api.get_one(Group.TIM_USER),
+            group_api.get_one(Group.TIM_MANAGER),
+            group_api.get_one(Group.TIM_ADMIN),
+        ]
+
+        user_a = uapi.create_minimal_user(email="this.is@user", groups=groups, save_now=True)
+        user_b = uapi.create_minimal_user(
+            email="this.is@another.user", groups=groups, save_now=True
+        )
+
+        wapi = WorkspaceApi(current_user=user_a, session=self.session, config=self.app_config)
+        workspace = wapi.create_workspace("test workspace", save_now=True)
+
+        role_api = RoleApi(current_user=user_a, session=self.session, config=self.app_config)
+        role_api.create_one(user_b, workspace, UserRoleInWorkspace.READER, False)
+        cont_api_a = ContentApi(current_user=user_a, session=self.session, config=self.app_config)
+        cont_api_b = ContentApi(current_user=user_b, session=self.session, config=self.app_config)
+
+        folder = cont_api_a.create(
+            content_type_list.Folder.slug, workspace, None, "folder", do_save=True
+        )
+        page = cont_api_a.create(
+            content_type_list.Page.slug, workspace, folder, "this is a page", do_save=True
+        )
+        comment = cont_api_a.create_comment(workspace, page, "a comment", do_save=True)
+        other_page = cont_api_a.create(
+            content_type_list.Page.slug, workspace, None, "another page", do_save=True
+        )
+
+        cont_api_b.mark_read(folder)
+        for content in (folder, page, comment):
+            assert not content.has_new_information_for(user_b)
+        assert other_page.has_new_information_for(user_b)
+
+        cont_api_b.mark_unread(folder)
+        for content in (folder, page, comment):
+            assert content.has_new_information_for(user_b)
+
+        # INFO - 2019-07-04 - reading a comment means reading its parent too
+        cont_api_b.mark_read(comment)
+        assert not page.has_new_information_for(user_b)
+        assert folder.has_new_information_for(user_b)
+
+    def test_unit__get_read_by_user__ok__same_as_has_new_information_for(self):
+        uapi = UserApi(session=self.session, config=self.app_config, current_user=None)
+        group_api = GroupApi(current_user=None, session=self.session, config=self.app_config)
+        groups = [
+            group_api.get_one(Group.TIM_USER),
+            group_api.get_one(Group.TIM_MANAGER),
+            group_api.get_one(Group.TIM_ADMIN),
+        ]
+
+        user_a = uapi.create_minimal_user(email="this.is@user", groups=groups, save_now=True)
+        user_b = uapi.create_minimal_user(
+            email="this.is@another.user", groups=groups, save_now=True
+        )
+
+        wapi = WorkspaceApi(current_user=user_a, session=self.session, config=self.app_config)
+        workspace = wapi.create_workspace("test workspace", save_now=True)
+
+        role_api = RoleApi(current_user=user_a, session=self.session, config=self.app_config)
+        role_api.create_one(user_b, workspace, UserRoleInWorkspace.READER, False)
+        cont_api_a = ContentApi(current_user=user_a, session=self.session, config=self.app_config)
+        cont_api_b = ContentApi(current_user=user_b, session=self.session, config=self.app_config)
+        read_status_api = ReadStatusApi(
+            current_user=user_b, session=self.session, config=self.app_config
+        )
+
+        folder = cont_api_a.create(
+            content_type_list.Folder.slug, workspace, None, "folder", do_save=True
+        )
+        subfolder = cont_api_a.create(
+            content_type_list.Folder.slug, workspace, folder, "subfolder", do_save=True
+        )
+        page = cont_api_a.create(
+            content_type_list.Page.slug, workspace, subfolder, "this is a page", do_save=True
+        )
+        comment = cont_api_a.create_comment(workspace, page, "a comment", do_save=True)
+        contents = [folder, subfolder, page, comment]
+
+        def assert_read_status(expected_read: typing.List[bool]) -> None:
+            read_by_user = read_status_api.get_read_by_user(
+                [content.content_id for content in contents]
+            )
+            eq_([read_by_user[content.content_id] for content in contents], expected_read)
+            eq_(
+                [not content.has_new_information_for(user_b) for content in contents], expected_read
+            )
+
+        assert_read_status([False, False, False, False])
+        cont_api_b.mark_read(page)
+        assert_read_status([False, False, True, True])
+        cont_api_b.mark_read(folder, recursive=False)
+        cont_api_b.mark_read(subfolder, recursive=False)
+        assert_read_status([True, True, True, True])
+        cont_api_b.mark_unread(comment)
+        assert_read_status([False, False, False, False])
+
+    def test_unit__get_contents_in_context__ok__same_as_get_content_in_context(self):
+        uapi = UserApi(session=self.session, config=self.app_config, current_user=None)
+        group_api = GroupApi(current_user=None, session=self.session, config=self.app_config)
+        groups = [
+            group_api.get_one(Group.TIM_USER),
+            group_api.get_one(Group.TIM_MANAGER),
+            group_api.get_one(Group.TIM_ADMIN),
+        ]
+        user = uapi.create_minimal_user(email="this.is@user", groups=groups, save_now=True)
+        workspace = WorkspaceApi(
+            current_user=user, session=self.session, config=self.app_config
+        ).create_workspace("test workspace", save_now=True)
+        api = ContentApi(current_user=user, session=self.session, config=self.app_config)
+        folder = api.create(content_type_list.Folder.slug, workspace, None, "folder", do_save=True)
+        subfolder = api.create(
+            content_type_list.Folder.slug, workspace, folder, "subfolder", do_save=True
+        )
+        pages = []
+        for page_number in range(3):
+            page = api.create(
+                content_type_list.Page.slug,
+                workspace,
+                subfolder,
+                "page {}".format(page_number),
+                do_save=True,
+            )
+            api.create_comment(workspace, page, "a comment", do_save=True)
+            pages.append(page)
+        with new_revision(session=self.session, tm=transaction.manager, content=folder):
+            api.delete(folder)
+        api.save(folder)
+
+        def serialize(
+            content_in_context, with_related: bool = True
+        ) -> typing.Dict[str, typing.Any]:
+            serialized = {
+                "content_id": content_in_context.content_id,
+                "author_id": content_in_context.author.user_id,
+                "last_modifier_id": content_in_context.last_modifier.user_id,
+                "workspace_id": content_in_context.workspace.workspace_id,
+                "parent_ids": [parent.content_id for parent in content_in_context.parents],
+                "comment_ids": [comment.content_id for comment in content_in_context.comments],
+                "deleted_through_parent_id": content_in_context.deleted_through_parent_id,
+                "archived_through_parent_id": content_in_context.archived_through_parent_id,
+                "is_editable": content_in_context.is_editable,
+                "read_by_user": content_in_context.read_by_user,
+            }
+            if with_related:
+                serialized["parent"] = serialize(content_in_context.parent, with_related=False)
+                serialized["comments"] = [
+                    serialize(comment, with_related=False)
+                    for comment in content_in_context.comments
+                ]
+            return serialized
+
+        contents_in_context = api.get_contents_in_context(pages)
+        eq_(len(contents_in_context), len(pages))
+        for page, page_in_context in zip(pages, contents_in_context):
+            eq_(serialize(page_in_context), serialize(api.get_content_in_context(page)))
+        first_page = serialize(contents_in_context[0])
+        eq_(first_page["parent_ids"], [subfolder.content_id, folder.content_id])
+        eq_(first_page["deleted_through_parent_id"], folder.content_id)
+        eq_(first_page["parent"]["content_id"], subfolder.content_id)
+        eq_(
+            first_page["comments"][0]["parent_ids"],
+            [pages[0].content_id, subfolder.content_id, folder.content_id],
+        )
+
+    def test_unit__get_contents_in_context__ok__stored_preview_metadata(self):
+        user = self.session.query(User).filter(User.email == "admin@admin.admin").one()
+        workspace = WorkspaceApi(
+            current_user=user, session=self.session, config=self.app_config
+        ).create_workspace("test workspace", save_now=True)
+        api = ContentApi(current_user=user, session=self.session, config=self.app_config)
+        files = []
+        for filename, file_content in (
+            ("file.txt", b"content"),
+            ("copy.txt", b"content"),
+            ("other.csv", b"other content"),
+        ):
+            content = api.create(
+                content_type_slug=content_type_list.File.slug,
+                workspace=workspace,
+                filename=filename,
+                do_save=False,
+            )
+            api.update_file_data(content, filename, "text/plain", file_content)
+            api.save(content)
+            files.append(content)
+        for sha256, file_extension, page_nb in (
+            (hashlib.sha256(b"content").hexdigest(), ".txt", 2),
+            (hashlib.sha256(b"other content").hexdigest(), ".csv", 5),
+        ):
+            self.session.add(
+                FilePreviewMetadata(
+                    sha256=sha256,
+                    file_extension=file_extension,
+                    page_nb=page_nb,
+                    has_pdf_preview=True,
+                    has_jpeg_preview=True,
+                )
+            )
+        transaction.commit()
+        files = [api.get_one(content.content_id, content_type_list.Any_SLUG) for content in files]
+
+        def serialize(content_in_context) -> typing.Tuple:
+            return (
+                content_in_context.page_nb,
+                content_in_context.has_pdf_preview,
+                content_in_context.has_jpeg_preview,
+            )
+
+        expected = [(2, True, True), (2, True, True), (5, True, True)]
+        eq_([serialize(api.get_content_in_context(content)) for content in files], expected)
+        eq_([serialize(content) for content in api.get_contents_in_context(files)], expected)
+
+    def test_unit__get_ancestors__ok__after_move(self):
+        uapi = UserApi(session=self.session, config=self.app_config, current_user=None)
+        group_api = GroupApi(current_user=None, session=self.session, config=self.app_config)
+        groups = [
+            group_api.get_one(Group.TIM_USER),
+            group_api.get_one(Group.TIM_MANAGER),
+            group_api.get_one(Group.TIM_ADMIN),
+        ]
+        user = uapi.create_minimal_user(email="this.is@user", groups=groups, save_now=True)
+        workspace = WorkspaceApi(
+            current_user=user, session=self.session, config=self.app_config
+        ).create_workspace("test workspace", save_now=True)
+        api = ContentApi(current_user=user, session=self.session, config=self.app_config)
+        folder_a = api.create(
+            content_type_list.Folder.slug, workspace, None, "folder a", do_save=True
+        )
+        folder_b = api.create(
+            content_type_list.Folder.slug, workspace, None, "folder b", do_save=True
+        )
+        subfolder = api.create(
+            content_type_list.Folder.slug, workspace, folder_a, "subfolder", do_save=True
+        )
+        page = api.create(
+            content_type_list.Page.slug, workspace, subfolder, "this is a page", do_save=True
+        )
+        eq_(api.get_ancestors(page), [subfolder, folder_a])
+        eq_(api.get_ancestors(folder_a), [])
+
+        with new_revision(session=self.session, tm=transaction.manager, content=subfolder):
+            api.move(subfolder, new_parent=folder_b)
+        api.save(subfolder)
+        eq_(api.get_ancestors(page), [subfolder, folder_b])
+        eq_(api.get_deleted_parent_id(page), 0)
+
+        with new_revision(session=self.session, tm=transaction.manager, content=folder_b):
+            api.delete(folder_b)
+        api.save(folder_b)
+        eq_(api.get_deleted_parent_id(page), folder_b.content_id)
+        eq_(api.get_deleted_parent_id(folder_b), 0)
+        eq_(api.get_archived_parent_id(page), 0)
+        contents, _ = api.search(["page"], offset=0)
+        eq_(contents, [])
+        contents, _ = api.search(["folder"], offset=0)
+        eq_(contents, [folder_a])
+
+    def test_unit__move__ok__subtree_to_other_workspace(self):
+        uapi = UserApi(session=self.session, config=self.app_config, current_user=None)
+        group_api = GroupApi(current_user=None, session=self.session, config=self.app_config)
+        groups = [
+            group_api.get_one(Group.TIM_USER),
+            group_api.get_one(Group.TIM_MANAGER),
+            group_api.get_one(Group.TIM_ADMIN),
+        ]
+        user = uapi.create_minimal_user(email="this.is@user", groups=groups, save_now=True)
+        workspace_api = WorkspaceApi(
+            current_user=user, session=self.session, config=self.app_config
+        )
+        workspace = workspace_api.create_workspace("test workspace", save_now=True)
+        workspace2 = workspace_api.create_workspace("test workspace2", save_now=True)
+        api = ContentApi(current_user=user, session=self.session, config=self.app_config)
+        folder = api.create(content_type_list.Folder.slug, workspace, None, "folder", do_save=True)
+        subfolder = api.create(
+            content_type_list.Folder.slug, workspace, folder, "subfolder", do_save=True
+        )
+        page = api.create(
+            content_type_list.Page.slug, workspace, subfolder, "this is a page", do_save=True
+        )
+        comment = api.create_comment(workspace, page, "a comment", do_save=True)
+
+        with new_revision(session=self.session, tm=transaction.manager, content=folder):
+            api.move(
+                folder, new_parent=None, new_workspace=workspace2, must_stay_in_same_workspace=False
+            )
+        transaction.commit()
+
+        for content in (folder, subfolder, page, comment):
+            eq_(content.workspace_id, workspace2.workspace_id)
+            eq_(content.revision_type, ActionDescription.MOVE)
+            assert not content.has_new_information_for(user)
+        eq_(api.get_ancestors(comment), [page, subfolder, folder])
+        eq_(page.description, page.revisions[-2].description)
+
     def test_mark_read__all(self):
         uapi = UserApi(session=self.session, config=self.app_config, current_user=None)
         group_api = GroupApi(current_user=None, session=self.session, config=self.app_config)
@@ -1946,8 +2536,153 @@ class TestContentApi(DefaultTest):
         eq_("index.html", updated.file_name)
         eq_("text/html", updated.file_mimetype)
         eq_(b"<html>hello world</html>", updated.depot_file.file.read())
+        eq_(len(b"<html>hello world</html>"), updated.size)
+        eq_(hashlib.sha256(b"<html>hello world</html>").hexdigest(), updated.sha256)
         eq_(ActionDescription.REVISION, updated.revision_type)
 
+    def test_unit__fill_revisions_file_metadata__ok__nominal_case(self):
+        user = self.session.query(User).filter(User.email == "admin@admin.admin").one()
+        workspace = WorkspaceApi(
+            current_user=user, session=self.session, config=self.app_config
+        ).create_workspace("test workspace", save_now=True)
+        api = ContentApi(current_user=user, session=self.session, config=self.app_config)
+        file_content = io.BytesIO(b"a file content")
+        file_content.seek(2)
+        content = api.create(
+            content_type_slug=content_type_list.File.slug,
+            workspace=workspace,
+            filename="file.txt",
+            do_save=False,
+        )
+        api.update_file_data(content, "file.txt", "text/plain", file_content)
+        api.save(content)
+        transaction.commit()
+        content = api.get_one(content.content_id, content_type_list.Any_SLUG)
+        # INFO - 2019-07-16 - stream is stored from its position
+        eq_(len(b"file content"), content.size)
+        eq_(b"file content", content.depot_file.file.read())
+
+        # INFO - 2019-07-16 - revision uploaded before size and hash were stored
+        revisions_table = ContentRevisionRO.__table__
+        self.session.execute(
+            revisions_table.update()
+            .where(revisions_table.c.content_id == content.content_id)
+            .values(size=None, sha256=None)
+        )
+        transaction.commit()
+        content = api.get_one(content.content_id, content_type_list.Any_SLUG)
+        assert content.size is None
+        eq_(len(b"file content"), content.revision.get_file_size())
+
+        updated_count, failed_count = api.fill_revisions_file_metadata()
+        eq_(len(content.revisions), updated_count)
+        eq_(0, failed_count)
+        transaction.commit()
+        content = api.get_one(content.content_id, content_type_list.Any_SLUG)
+        eq_(len(b"file content"), content.size)
+        eq_(hashlib.sha256(b"file content").hexdigest(), content.sha256)
+        eq_((0, 0), api.fill_revisions_file_metadata())
+
+    def test_unit__update_file_data__ok__blob_inserted_concurrently(self):
+        user = self.session.query(User).filter(User.email == "admin@admin.admin").one()
+        workspace = WorkspaceApi(
+            current_user=user, session=self.session, config=self.app_config
+        ).create_workspace("test workspace", save_now=True)
+        api = ContentApi(current_user=user, session=self.session, config=self.app_config)
+        contents = []
+        for filename in ("file.txt", "copy.txt"):
+            content = api.create(
+                content_type_slug=content_type_list.File.slug,
+                workspace=workspace,
+                filename=filename,
+                do_save=False,
+            )
+            contents.append(content)
+        api.update_file_data(contents[0], "file.txt", "text/plain", b"same content")
+        api.save(contents[0])
+        depot_file_count = len(DepotManager.get().list())
+        # INFO - 2019-07-26 - blob is not found as if it was inserted by a
+        # concurrent transaction after the lookup.
+        with patch.object(Query, "get", autospec=True, return_value=None):
+            api.update_file_data(contents[1], "copy.txt", "text/plain", b"same content")
+        api.save(contents[1])
+        transaction.commit()
+
+        txt_file = api.get_one(contents[0].content_id, content_type_list.Any_SLUG)
+        copy_file = api.get_one(contents[1].content_id, content_type_list.Any_SLUG)
+        eq_(txt_file.depot_file.file_id, copy_file.depot_file.file_id)
+        eq_(b"same content", copy_file.depot_file.file.read())
+        blob = self.session.query(FileBlob).one()
+        eq_(2, blob.ref_count)
+        eq_(depot_file_count, len(DepotManager.get().list()))
+
+    def test_unit__update_file_data__ok__same_file_content_shared(self):
+        user = self.session.query(User).filter(User.email == "admin@admin.admin").one()
+        workspace = WorkspaceApi(
+            current_user=user, session=self.session, config=self.app_config
+        ).create_workspace("test workspace", save_now=True)
+        api = ContentApi(current_user=user, session=self.session, config=self.app_config)
+        contents = []
+        for filename, mimetype in (("file.txt", "text/plain"), ("file.csv", "text/csv")):
+            content = api.create(
+                content_type_slug=content_type_list.File.slug,
+                workspace=workspace,
+                filename=filename,
+                do_save=False,
+            )
+            api.update_file_data(content, filename, mimetype, b"same content")
+            api.save(content)
+            contents.append(content)
+        transaction.commit()
+
+        txt_file = api.get_one(contents[0].content_id, content_type_list.Any_SLUG)
+        csv_file = api.get_one(contents[1].content_id, content_type_list.Any_SLUG)
+        eq_(txt_file.depot_file.file_id, csv_file.depot_file.file_id)
+        eq_(b"same content", csv_file.depot_file.file.read())
+        eq_("text/csv", csv_file.file_mimetype)
+        blob = self.session.query(FileBlob).one()
+        eq_(hashlib.sha256(b"same content").hexdigest(), blob.sha256)
+        eq_(2, blob.ref_count)
+
+        # INFO - 2019-07-17 - new revisions refer to the same blob
+        with new_revision(session=self.session, tm=transaction.manager, content=txt_file):
+            api.update_content(txt_file, new_label="renamed")
+        api.save(txt_file)
+        transaction.commit()
+        txt_file = api.get_one(contents[0].content_id, content_type_list.Any_SLUG)
+        eq_(csv_file.depot_file.file_id, txt_file.depot_file.file_id)
+        blob = self.session.query(FileBlob).one()
+        eq_(3, blob.ref_count)
+        eq_(0, api.delete_unused_file_blobs())
+
+        # INFO - 2019-07-17 - blob of aborted upload is removed with its file
+        with new_revision(session=self.session, tm=transaction.manager, content=txt_file):
+            api.update_file_data(txt_file, "renamed.txt", "text/plain", b"other content")
+        aborted_file_id = txt_file.depot_file.file_id
+        self.session.rollback()
+        transaction.abort()
+        eq_(1, self.session.query(FileBlob).count())
+        assert not DepotManager.get().exists(aborted_file_id)
+
+        # INFO - 2019-07-17 - blob no revision refers to is removed with its file
+        unused_blob = FileBlob(
+            sha256=hashlib.sha256(b"unused").hexdigest(),
+            size=len(b"unused"),
+            depot_file=FileIntent(b"unused", "unused.txt", "text/plain"),
+        )
+        self.session.add(unused_blob)
+        transaction.commit()
+        unused_file_id = (
+            self.session.query(FileBlob)
+            .get(hashlib.sha256(b"unused").hexdigest())
+            .depot_file.file_id
+        )
+        eq_(1, api.delete_unused_file_blobs())
+        transaction.commit()
+        eq_(1, self.session.query(FileBlob).count())
+        assert not DepotManager.get().exists(unused_file_id)
+        assert DepotManager.get().exists(csv_file.depot_file.file_id)
+
     def test_update_file_data__err__content_status_closed(self):
         uapi = UserApi(session=self.session, config=self.app_config, current_user=None)
         group_api = GroupApi(current_user=None, session=self.session, config=self.app_config)
@@ -2952,6 +3687,36 @@ class TestContentApi(DefaultTest):
         last_actives = api.get_last_active(workspace=workspace2)
         assert len(last_actives) == 0
 
+    def test_unit__get_last_active__ok__many_comments_keyset(self):
+        uapi = UserApi(session=self.session, config=self.app_config, current_user=None)
+        group_api = GroupApi(current_user=None, session=self.session, config=self.app_config)
+        groups = [
+            group_api.get_one(Group.TIM_USER),
+            group_api.get_one(Group.TIM_MANAGER),
+            group_api.get_one(Group.TIM_ADMIN),
+        ]
+
+        user = uapi.create_minimal_user(email="this.is@user", groups=groups, save_now=True)
+        workspace = WorkspaceApi(
+            current_user=user, session=self.session, config=self.app_config
+        ).create_workspace("test workspace", save_now=True)
+        api = ContentApi(current_user=user, session=self.session, config=self.app_config)
+        first_page = api.create(content_type_list.Page.slug, workspace, None, "first", "", True)
+        second_page = api.create(content_type_list.Page.slug, workspace, None, "second", "", True)
+        third_page = api.create(content_type_list.Page.slug, workspace, None, "third", "", True)
+        for comment_number in range(3):
+            api.create_comment(workspace, first_page, "comment {}".format(comment_number), True)
+
+        last_actives = api.get_last_active(workspace=workspace)
+        assert last_actives == [first_page, third_page, second_page]
+
+        last_actives = api.get_last_active(workspace=workspace, limit=1, before_content=first_page)
+        assert last_actives == [third_page]
+        last_actives = api.get_last_active(workspace=workspace, before_content=third_page)
+        assert last_actives == [second_page]
+        last_actives = api.get_last_active(workspace=workspace, before_content=second_page)
+        assert last_actives == []
+
     def test_unit__search_in_label__ok__nominal_case(self):
         # HACK - D.A. - 2015-03-09
         # This test is based on a bug which does NOT return results found
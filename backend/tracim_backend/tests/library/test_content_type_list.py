@@ -0,0 +1,127 @@
+import timeit
+
+from mock import Mock
+import pytest
+
+from tracim_backend.app_models.applications import Application
+from tracim_backend.app_models.contents import ContentTypeList
+from tracim_backend.app_models.contents import content_status_list
+from tracim_backend.exceptions import ContentTypeNotExist
+from tracim_backend.lib.core.application import ApplicationApi
+from tracim_backend.tests import DefaultTest
+
+
+class TestContentTypeList(DefaultTest):
+    def _get_app(self, slug: str, is_active: bool = True, slug_alias=None) -> Application:
+        app_config = Mock()
+        app_config.APPS_COLORS = {"primary": "#fff"}
+        app = Application(
+            label=slug,
+            slug="contents/{}".format(slug),
+            fa_icon="",
+            is_active=is_active,
+            config={},
+            main_route="",
+            app_config=app_config,
+        )
+        app.add_content_type(
+            slug=slug,
+            label=slug,
+            creation_label=slug,
+            available_statuses=content_status_list.get_all(),
+            slug_alias=slug_alias,
+        )
+        return app
+
+    def test_unit__get_one_by_slug__ok__slug_and_alias(self):
+        app_list = [
+            self._get_app("html-document", slug_alias=["page"]),
+            self._get_app("markdownpage", is_active=False),
+        ]
+        content_type_list = ContentTypeList(app_list)
+        html_document = content_type_list.get_one_by_slug("html-document")
+        assert content_type_list.get_one_by_slug("page") is html_document
+        assert content_type_list.get_one_by_slug("comment") is ContentTypeList.Comment
+        assert content_type_list.get_one_by_slug("event") is ContentTypeList.Event
+        with pytest.raises(ContentTypeNotExist):
+            content_type_list.get_one_by_slug("markdownpage")
+        assert content_type_list.restricted_allowed_types_slug() == ["html-document"]
+        assert content_type_list.endpoint_allowed_types_slug() == ["html-document", "comment"]
+        assert content_type_list.endpoint_allowed_types() == [
+            html_document,
+            ContentTypeList.Comment,
+        ]
+        assert content_type_list.query_allowed_types_slugs() == [
+            "html-document",
+            "page",
+            "comment",
+            "any",
+        ]
+
+    def test_unit__rebuild__ok__app_list_updated(self):
+        app_list = [self._get_app("html-document")]
+        content_type_list = ContentTypeList(app_list)
+        slugs = content_type_list.endpoint_allowed_types_slug()
+        slugs.append("thread")
+        assert content_type_list.endpoint_allowed_types_slug() == ["html-document", "comment"]
+
+        app_list.append(self._get_app("thread"))
+        with pytest.raises(ContentTypeNotExist):
+            content_type_list.get_one_by_slug("thread")
+        content_type_list.rebuild()
+        assert content_type_list.get_one_by_slug("thread").slug == "thread"
+
+    def test_unit__get_one_by_slug__ok__same_as_linear_search(self):
+        app_list = [
+            self._get_app("html-document", slug_alias=["page"]),
+            self._get_app("file"),
+            self._get_app("thread"),
+            self._get_app("folder"),
+            self._get_app("markdownpage", is_active=False),
+        ]
+        content_type_list = ContentTypeList(app_list)
+        content_types = [
+            content_type for app in app_list if app.is_active for content_type in app.content_types
+        ]
+        content_types.extend([ContentTypeList.Comment, ContentTypeList.Event])
+        for slug in ("html-document", "page", "file", "thread", "folder", "comment", "event"):
+            expected = next(
+                item
+                for item in content_types
+                if item.slug == slug or (item.slug_alias and slug in item.slug_alias)
+            )
+            assert content_type_list.get_one_by_slug(slug) is expected
+        for slug in ("markdownpage", "unknown"):
+            with pytest.raises(ContentTypeNotExist):
+                content_type_list.get_one_by_slug(slug)
+
+    def test_unit__get_one_by_slug__ok__faster_than_previous_lookup(self):
+        """
+        Micro-benchmark of slug lookup against the previous implementation,
+        which rebuilt the content type list from apps and scanned it on each
+        call. Best of several runs is compared, with a wide margin, so that
+        the test does not depend on machine load.
+        """
+        app_list = [
+            self._get_app("html-document", slug_alias=["page"]),
+            self._get_app("file"),
+            self._get_app("thread"),
+            self._get_app("folder"),
+            self._get_app("markdownpage", is_active=False),
+        ]
+        content_type_list = ContentTypeList(app_list)
+
+        def previous_get_one_by_slug(slug: str):
+            content_types = ApplicationApi(app_list).get_content_types().copy()
+            content_types.extend([ContentTypeList.Comment, ContentTypeList.Event])
+            for item in content_types:
+                if item.slug == slug or (item.slug_alias and slug in item.slug_alias):
+                    return item
+
+        def benchmark(get_one_by_slug) -> float:
+            return min(timeit.repeat(lambda: get_one_by_slug("event"), number=1000, repeat=5))
+
+        assert previous_get_one_by_slug("event") is content_type_list.get_one_by_slug("event")
+        assert benchmark(content_type_list.get_one_by_slug) * 2 < benchmark(
+            previous_get_one_by_slug
+        )
@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+
+import filelock
+
+from tracim_backend.lib.preview.cache import PREVIEW_LOCK_FILE_NAME
+from tracim_backend.lib.preview.cache import PreviewCache
+from tracim_backend.tests import create_1000px_png_test_image
+
+
+class TestPreviewCache(object):
+    def _add_previews(
+        self, preview_cache: PreviewCache, file_path: str, size: int, last_used: float
+    ) -> str:
+        file_cache_dir = preview_cache.get_file_cache_dir(file_path)
+        os.makedirs(file_cache_dir)
+        with open(os.path.join(file_cache_dir, "preview.jpeg"), "wb") as preview:
+            preview.write(b"x" * size)
+        os.utime(file_cache_dir, (last_used, last_used))
+        return file_cache_dir
+
+    def test_unit__get_preview_manager__ok__sharded_file_cache_dir(self, tmpdir):
+        preview_cache = PreviewCache(str(tmpdir))
+        preview_manager = preview_cache.get_preview_manager("/depot/file")
+        file_cache_dir = preview_cache.get_file_cache_dir("/depot/file")
+        assert preview_manager.cache_path == os.path.join(file_cache_dir, "")
+        # INFO - 2019-07-25 - directory is only created to build a preview.
+        assert not os.path.exists(file_cache_dir)
+        key = os.path.basename(file_cache_dir)
+        assert file_cache_dir == os.path.join(str(tmpdir), key[0:2], key[2:4], key)
+        assert preview_cache.get_file_cache_dir("/depot/other_file") != file_cache_dir
+
+    def test_unit__get_preview_manager__ok__no_use_mark(self, tmpdir):
+        preview_cache = PreviewCache(str(tmpdir))
+        file_cache_dir = self._add_previews(preview_cache, "/depot/file", 10, 1000)
+        preview_cache.get_preview_manager("/depot/file")
+        assert os.stat(file_cache_dir).st_mtime == 1000
+
+    def test_unit__get_usage__ok__nominal_case(self, tmpdir):
+        preview_cache = PreviewCache(str(tmpdir), max_age=100)
+        self._add_previews(preview_cache, "/depot/file1", 10, 1000)
+        self._add_previews(preview_cache, "/depot/file2", 20, 2000)
+        with open(os.path.join(str(tmpdir), "legacy-preview.jpeg"), "wb") as preview:
+            preview.write(b"x" * 5)
+        os.utime(os.path.join(str(tmpdir), "legacy-preview.jpeg"), (500, 500))
+        usage = preview_cache.get_usage(now=2050)
+        assert usage.entries_count == 3
+        assert usage.size == 35
+        assert usage.expired_size == 15
+
+    def test_unit__prune__ok__max_size(self, tmpdir):
+        preview_cache = PreviewCache(str(tmpdir), max_size=50)
+        file1_cache_dir = self._add_previews(preview_cache, "/depot/file1", 30, 1000)
+        file2_cache_dir = self._add_previews(preview_cache, "/depot/file2", 30, 3000)
+        file3_cache_dir = self._add_previews(preview_cache, "/depot/file3", 10, 2000)
+        removed_entries = preview_cache.prune(now=4000)
+        assert [entry.path for entry in removed_entries] == [file1_cache_dir]
+        assert not os.path.exists(file1_cache_dir)
+        assert not os.path.exists(os.path.dirname(file1_cache_dir))
+        assert os.path.isdir(file2_cache_dir)
+        assert os.path.isdir(file3_cache_dir)
+        assert preview_cache.get_usage().size == 40
+
+    def test_unit__prune__ok__max_age(self, tmpdir):
+        preview_cache = PreviewCache(str(tmpdir), max_age=1500)
+        file1_cache_dir = self._add_previews(preview_cache, "/depot/file1", 30, 1000)
+        file2_cache_dir = self._add_previews(preview_cache, "/depot/file2", 30, 3000)
+        legacy_preview_path = os.path.join(str(tmpdir), "legacy-preview.jpeg")
+        with open(legacy_preview_path, "wb") as preview:
+            preview.write(b"x" * 5)
+        os.utime(legacy_preview_path, (500, 500))
+        removed_entries = preview_cache.prune(now=4000)
+        assert sorted(entry.path for entry in removed_entries) == sorted(
+            [file1_cache_dir, legacy_preview_path]
+        )
+        assert not os.path.exists(legacy_preview_path)
+        assert not os.path.exists(file1_cache_dir)
+        assert os.path.isdir(file2_cache_dir)
+
+    def test_unit__prune__ok__dry_run(self, tmpdir):
+        preview_cache = PreviewCache(str(tmpdir), max_size=10)
+        file_cache_dir = self._add_previews(preview_cache, "/depot/file", 30, 1000)
+        removed_entries = preview_cache.prune(now=4000, dry_run=True)
+        assert [entry.path for entry in removed_entries] == [file_cache_dir]
+        assert os.path.isdir(file_cache_dir)
+
+    def test_unit__prune__ok__skip_preview_being_built(self, tmpdir):
+        preview_cache = PreviewCache(str(tmpdir), max_size=10)
+        file1_cache_dir = self._add_previews(preview_cache, "/depot/file1", 30, 1000)
+        file2_cache_dir = self._add_previews(preview_cache, "/depot/file2", 30, 2000)
+        lock = filelock.FileLock(os.path.join(file1_cache_dir, PREVIEW_LOCK_FILE_NAME))
+        lock.acquire()
+        try:
+            removed_entries = preview_cache.prune(now=4000)
+        finally:
+            lock.release()
+        assert [entry.path for entry in removed_entries] == [file2_cache_dir]
+        assert os.path.isdir(file1_cache_dir)
+        assert not os.path.exists(file2_cache_dir)
+
+    def test_unit__prune__ok__unlimited(self, tmpdir):
+        preview_cache = PreviewCache(str(tmpdir))
+        file_cache_dir = self._add_previews(preview_cache, "/depot/file", 30, 1000)
+        assert preview_cache.prune(now=4000) == []
+        assert os.path.isdir(file_cache_dir)
+
+
+class TestSingleFlightPreviewManager(object):
+    def _create_image_file(self, tmpdir) -> str:
+        file_path = os.path.join(str(tmpdir), "image.png")
+        with open(file_path, "wb") as image_file:
+            image_file.write(create_1000px_png_test_image().read())
+        return file_path
+
+    def test_unit__get_jpeg_preview__ok__wait_for_other_build(self, tmpdir):
+        file_path = self._create_image_file(tmpdir)
+        preview_cache = PreviewCache(os.path.join(str(tmpdir), "previews"), lock_timeout=10)
+        preview_manager = preview_cache.get_preview_manager(file_path)
+        os.makedirs(preview_manager.cache_path)
+        lock = filelock.FileLock(os.path.join(preview_manager.cache_path, PREVIEW_LOCK_FILE_NAME))
+        lock.acquire()
+        timer = threading.Timer(0.5, lock.release)
+        timer.start()
+        start = time.time()
+        preview_path = preview_manager.get_jpeg_preview(file_path, width=256, height=256)
+        timer.join()
+        assert time.time() - start >= 0.5
+        assert os.path.isfile(preview_path)
+        # INFO - 2019-07-25 - lock is released after build.
+        lock.acquire(timeout=0)
+        lock.release()
+
+    def test_unit__get_jpeg_preview__ok__lock_timeout(self, tmpdir):
+        file_path = self._create_image_file(tmpdir)
+        preview_cache = PreviewCache(os.path.join(str(tmpdir), "previews"), lock_timeout=0)
+        preview_manager = preview_cache.get_preview_manager(file_path)
+        os.makedirs(preview_manager.cache_path)
+        lock = filelock.FileLock(os.path.join(preview_manager.cache_path, PREVIEW_LOCK_FILE_NAME))
+        lock.acquire()
+        try:
+            preview_path = preview_manager.get_jpeg_preview(file_path, width=256, height=256)
+        finally:
+            lock.release()
+        assert os.path.isfile(preview_path)
+
+    def test_unit__get_jpeg_preview__ok__cache_hit_without_lock(self, tmpdir):
+        file_path = self._create_image_file(tmpdir)
+        preview_cache = PreviewCache(os.path.join(str(tmpdir), "previews"), lock_timeout=10)
+        preview_manager = preview_cache.get_preview_manager(file_path)
+        preview_path = preview_manager.get_jpeg_preview(file_path, width=256, height=256)
+        lock = filelock.FileLock(os.path.join(preview_manager.cache_path, PREVIEW_LOCK_FILE_NAME))
+        lock.acquire()
+        start = time.time()
+        try:
+            assert (
+                preview_manager.get_jpeg_preview(file_path, width=256, height=256) == preview_path
+            )
+        finally:
+            lock.release()
+        assert time.time() - start < 5
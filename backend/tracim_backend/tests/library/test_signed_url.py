@@ -0,0 +1,51 @@
+import pytest
+
+from tracim_backend.exceptions import ExpiredSignedPreviewUrl
+from tracim_backend.exceptions import InvalidSignedPreviewUrl
+from tracim_backend.lib.preview.signed_url import JpgPreviewSigner
+
+
+class TestJpgPreviewSigner(object):
+    def test_unit__load__ok__nominal_case(self):
+        signer = JpgPreviewSigner("secret", lifetime=300)
+        token = signer.sign("depot-id", ".odt", 2, 256, 128, "tag", now=1000)
+        preview = signer.load(token, now=1200)
+        assert preview.depot_file_id == "depot-id"
+        assert preview.file_extension == ".odt"
+        assert preview.page == 2
+        assert preview.width == 256
+        assert preview.height == 128
+        assert preview.expires == 1500
+        assert preview.get_etag() == "tag-jpg-.odt-2-256-128"
+
+    def test_unit__load__err__expired(self):
+        signer = JpgPreviewSigner("secret", lifetime=300)
+        token = signer.sign("depot-id", ".odt", 1, 256, 256, "tag", now=1000)
+        with pytest.raises(ExpiredSignedPreviewUrl):
+            signer.load(token, now=1501)
+
+    def test_unit__sign__ok__same_token_in_lifetime_bucket(self):
+        signer = JpgPreviewSigner("secret", lifetime=300)
+        token = signer.sign("depot-id", ".odt", 1, 256, 256, "tag", now=900)
+        assert signer.sign("depot-id", ".odt", 1, 256, 256, "tag", now=1199) == token
+        assert signer.sign("depot-id", ".odt", 1, 256, 256, "tag", now=1200) != token
+        assert signer.load(token, now=1199).expires == 1500
+
+    def test_unit__load__err__other_secret(self):
+        token = JpgPreviewSigner("secret", lifetime=300).sign(
+            "depot-id", ".odt", 1, 256, 256, "tag", now=1000
+        )
+        with pytest.raises(InvalidSignedPreviewUrl):
+            JpgPreviewSigner("other_secret", lifetime=300).load(token, now=1000)
+
+    def test_unit__load__err__tampered(self):
+        signer = JpgPreviewSigner("secret", lifetime=300)
+        token = signer.sign("depot-id", ".odt", 1, 256, 256, "tag", now=1000)
+        other_token = signer.sign("other-id", ".odt", 1, 256, 256, "tag", now=1000)
+        tampered_token = "{}.{}".format(other_token.split(".")[0], token.split(".")[1])
+        with pytest.raises(InvalidSignedPreviewUrl):
+            signer.load(tampered_token, now=1000)
+        with pytest.raises(InvalidSignedPreviewUrl):
+            signer.load("not a token", now=1000)
+        with pytest.raises(InvalidSignedPreviewUrl):
+            signer.load("{}.é".format(token.split(".")[0]), now=1000)
@@ -1,6 +1,11 @@
+import hashlib
+import io
+
 from tracim_backend.lib.utils.utils import ALLOWED_AUTOGEN_PASSWORD_CHAR
 from tracim_backend.lib.utils.utils import DEFAULT_PASSWORD_GEN_CHAR_LENGTH
+from tracim_backend.lib.utils.utils import ChunksFileStream
 from tracim_backend.lib.utils.utils import ExtendedColor
+from tracim_backend.lib.utils.utils import HashingFileStream
 from tracim_backend.lib.utils.utils import clamp
 from tracim_backend.lib.utils.utils import password_generator
 from tracim_backend.lib.utils.utils import string_to_list
@@ -83,3 +88,27 @@ class TestStringToList(object):
             3,
             4,
         ]
+
+
+class TestChunksFileStream(object):
+    def test_unit__read__ok__sized_reads(self):
+        file_stream = ChunksFileStream(iter([b"abc", b"", b"defgh", b"i"]))
+        assert file_stream.read(2) == b"ab"
+        assert file_stream.read(4) == b"cdef"
+        assert file_stream.read(10) == b"ghi"
+        assert file_stream.read(10) == b""
+
+    def test_unit__read__ok__read_all(self):
+        file_stream = ChunksFileStream(iter([b"abc", b"defgh", b"i"]))
+        assert file_stream.read(2) == b"ab"
+        assert file_stream.read() == b"cdefghi"
+        assert file_stream.read() == b""
+
+
+class TestHashingFileStream(object):
+    def test_unit__read__ok__size_and_sha256(self):
+        file_stream = HashingFileStream(io.BytesIO(b"file content"))
+        assert file_stream.read(4) == b"file"
+        assert file_stream.read() == b" content"
+        assert file_stream.size == len(b"file content")
+        assert file_stream.sha256 == hashlib.sha256(b"file content").hexdigest()
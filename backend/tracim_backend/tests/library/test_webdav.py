@@ -1,19 +1,26 @@
 # -*- coding: utf-8 -*-
 from unittest.mock import MagicMock
+from unittest.mock import patch
 
+import transaction
 from wsgidav import util
 
 from tracim_backend import WebdavAppFactory
 from tracim_backend.fixtures.content import Content as ContentFixtures
 from tracim_backend.fixtures.users_and_groups import Base as BaseFixture
+from tracim_backend.lib.core.content import ContentApi
 from tracim_backend.lib.core.notifications import DummyNotifier
 from tracim_backend.lib.core.user import UserApi
+from tracim_backend.lib.utils.authorization import is_reader
 from tracim_backend.lib.webdav import TracimDomainController
 from tracim_backend.lib.webdav.dav_provider import Provider
 from tracim_backend.lib.webdav.dav_provider import WebdavTracimContext
+from tracim_backend.lib.webdav.resources import FileResource
+from tracim_backend.lib.webdav.resources import OtherFileResource
 from tracim_backend.lib.webdav.resources import RootResource
 from tracim_backend.models.data import Content
 from tracim_backend.models.data import ContentRevisionRO
+from tracim_backend.models.revision_protection import new_revision
 from tracim_backend.tests import StandardTest
 from tracim_backend.tests import eq_
 
@@ -181,6 +188,29 @@ class TestWebDav(StandardTest):
             "Tiramisu Recipe.document.html" in content_names
         ), "Tiramisu Recipe.document.html should be in names ({0})".format(content_names)
 
+    def test_unit__list_content__ok__live_properties_prefetched(self):
+        provider = self._get_provider(self.app_config)
+        desserts = provider.getResourceInst(
+            "/Recipes/Desserts", self._get_environ(provider, "bob@fsf.local")
+        )
+        children = desserts.getMemberList()
+        eq_(5, len(children))
+
+        # INFO - 2019-07-15 - rights are checked once for the collection and
+        # properties come from revisions loaded with the listing.
+        with patch.object(is_reader, "check") as check_mock:
+            for child in children:
+                child.getDisplayName()
+                child.getDisplayInfo()
+                child.getCreationDate()
+                child.getLastModified()
+                if isinstance(child, FileResource) and not isinstance(child, OtherFileResource):
+                    child.getContentType()
+                    assert child.getContentLength() > 0
+                assert "revisions" not in child.content.__dict__
+        check_mock.assert_not_called()
+        assert "Apple_Pie.txt" in [child.getDisplayName() for child in children]
+
     def test_unit__get_content__ok(self):
         provider = self._get_provider(self.app_config)
         pie = provider.getResourceInst(
@@ -190,6 +220,41 @@ class TestWebDav(StandardTest):
         assert pie, "Apple_Pie should be found"
         eq_("Apple_Pie.txt", pie.name)
 
+    def test_unit__get_content__ok__cached_path_checked(self):
+        provider = self._get_provider(self.app_config)
+        pie = provider.getResourceInst(
+            "/Recipes/Desserts/Apple_Pie.txt", self._get_environ(provider, "admin@admin.admin")
+        )
+        assert pie, "Apple_Pie should be found"
+        assert provider.path_cache._entries
+
+        # INFO - 2019-07-12 - rename parent folder without webdav, as another
+        # process would do: cached path must not be used anymore.
+        admin = self._get_user("admin@admin.admin")
+        content_api = ContentApi(current_user=admin, session=self.session, config=self.app_config)
+        desserts = content_api.get_one_by_filename_and_parent_labels(
+            "Desserts", pie.content.workspace
+        )
+        with new_revision(session=self.session, tm=transaction.manager, content=desserts):
+            content_api.update_content(desserts, new_label="Sweets")
+        content_api.save(desserts)
+        transaction.commit()
+
+        pie = provider.getResourceInst(
+            "/Recipes/Desserts/Apple_Pie.txt", self._get_environ(provider, "admin@admin.admin")
+        )
+        assert pie is None
+        pie = provider.getResourceInst(
+            "/Recipes/Sweets/Apple_Pie.txt", self._get_environ(provider, "admin@admin.admin")
+        )
+        assert pie, "Apple_Pie should be found"
+
+        # INFO - 2019-07-12 - content deleted through webdav are removed from cache
+        pie.delete()
+        assert not any(
+            "Apple_Pie.txt" in path_key for path_key in provider.path_cache._entries.keys()
+        )
+
     def test_unit__delete_content__ok(self):
         provider = self._get_provider(self.app_config)
         pie = provider.getResourceInst(
@@ -414,6 +479,39 @@ class TestWebDav(StandardTest):
             content_to_move.parent.label == "Menus"
         ), "file should be moved in Infos but is in {0}".format(content_to_move.parent.label)
 
+    def test_unit__put_content__ok__streamed(self):
+        provider = self._get_provider(self.app_config)
+        environ = self._get_environ(provider, "bob@fsf.local")
+        parent_resource = provider.getResourceInst("/Recipes/Salads", environ)
+        new_resource = parent_resource.createEmptyResource("greek_salad.txt")
+        received_chunks = []
+
+        def data_stream():
+            for chunk in (b"hello", b"", b" streamed", b" world\n"):
+                received_chunks.append(chunk)
+                yield chunk
+
+        # INFO - 2019-07-18 - reproduction of wsgidav.request_server.RequestServer#doPUT
+        # when file stream has writelines()
+        write_object = new_resource.beginWrite(contentType="application/octet-stream")
+        write_object.writelines(data_stream())
+        eq_(4, len(received_chunks))
+        assert write_object.temp_file is None
+        write_object.close()
+        new_resource.endWrite(withErrors=False)
+
+        result = provider.getResourceInst("/Recipes/Salads/greek_salad.txt", environ)
+        assert result, "Result should not be None"
+        eq_(b"hello streamed world\n", result.content.depot_file.file.read())
+        eq_(len(b"hello streamed world\n"), result.content.size)
+
+        write_object = result.beginWrite(contentType="application/octet-stream")
+        write_object.writelines(iter([b"An other", b" line"]))
+        write_object.close()
+        result.endWrite(withErrors=False)
+        result = provider.getResourceInst("/Recipes/Salads/greek_salad.txt", environ)
+        eq_(b"An other line", result.content.depot_file.file.read())
+
     def test_unit__update_content__ok(self):
         provider = self._get_provider(self.app_config)
         environ = self._get_environ(provider, "bob@fsf.local")
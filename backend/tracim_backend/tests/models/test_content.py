@@ -4,6 +4,7 @@ import time
 # from tracim.lib.content import ContentApi
 from depot.fields.upload import UploadedFile
 import pytest
+from sqlalchemy import func
 from sqlalchemy.sql.elements import and_
 from sqlalchemy.testing import eq_
 import transaction
@@ -304,7 +305,7 @@ class TestContent(StandardTest):
             owner=user_admin,
             workspace=workspace,
             type=content_type_list.Folder.slug,
-            label="TEST_CONTENT_1",
+            label="TEST_CONTENT_2",
             description="TEST_CONTENT_DESCRIPTION_1",
             revision_type=ActionDescription.CREATION,
             parent=parent,
@@ -317,3 +318,91 @@ class TestContent(StandardTest):
             children.parent = None
         self.session.flush()
         assert parent.children == []
+
+    def test_unit_get_subtree(self):
+        user_admin = self._get_user()
+        workspace = Workspace(label="TEST_WORKSPACE_1")
+
+        def create_folder(label: str, parent: Content = None) -> Content:
+            return self._create_content(
+                owner=user_admin,
+                workspace=workspace,
+                type=content_type_list.Folder.slug,
+                label=label,
+                revision_type=ActionDescription.CREATION,
+                parent=parent,
+            )
+
+        root = create_folder("root")
+        child = create_folder("child", parent=root)
+        grandchild = create_folder("grandchild", parent=child)
+        other_child = create_folder("other_child", parent=root)
+        outside = create_folder("outside")
+        self.session.flush()
+
+        subtree = root.get_subtree()
+        eq_(subtree.get_descendants(), [child, grandchild, other_child])
+        eq_(subtree.get_children(root.id), [child, other_child])
+        eq_(subtree.get_children(child.id, recursively=True), [grandchild])
+        assert grandchild in subtree
+        assert outside not in subtree
+        eq_(root.get_children(recursively=True), [child, grandchild, other_child])
+        eq_(
+            [revision.revision_id for revision in root.get_tree_revisions()],
+            [root.revision_id, child.revision_id, grandchild.revision_id, other_child.revision_id],
+        )
+
+        with new_revision(session=self.session, tm=transaction.manager, content=grandchild):
+            grandchild.parent = outside
+        self.session.flush()
+        eq_(root.get_children(recursively=True), [child, other_child])
+        eq_(outside.get_children(recursively=True), [grandchild])
+
+    def test_unit__current_revision_id__ok__follow_last_revision(self):
+        content = self._create_content_from_nothing()
+        first_revision_id = content.revision_id
+        eq_(content.current_revision_id, first_revision_id)
+
+        with new_revision(session=self.session, tm=transaction.manager, content=content):
+            content.description = "TEST_CONTENT_DESCRIPTION_1_UPDATED"
+        self.session.flush()
+        assert content.revision_id != first_revision_id
+        eq_(content.current_revision_id, content.revision_id)
+
+        self.session.expire_all()
+        content_from_db = self.session.query(Content).filter(Content.id == content.id).one()
+        eq_(content_from_db.current_revision_id, content.revision_id)
+        eq_(
+            content_from_db.revision_id,
+            self.session.query(func.max(ContentRevisionRO.revision_id))
+            .filter(ContentRevisionRO.content_id == content.id)
+            .scalar(),
+        )
+
+    def test_unit__properties__ok__memoized_until_assignment(self):
+        user_admin = self._get_user()
+        workspace = Workspace(label="TEST_WORKSPACE_1")
+        folder = self._create_content(
+            owner=user_admin,
+            workspace=workspace,
+            type=content_type_list.Folder.slug,
+            label="folder",
+            revision_type=ActionDescription.CREATION,
+        )
+        self.session.flush()
+        revision = folder.revision
+        assert revision.get_parsed_properties() is revision.get_parsed_properties()
+        with pytest.raises(TypeError):
+            folder.properties["allowed_content"] = {}
+        eq_(folder.properties, revision.get_parsed_properties())
+        assert content_type_list.Comment in folder.get_allowed_content_types()
+
+        with new_revision(session=self.session, tm=transaction.manager, content=folder):
+            folder.properties = {"allowed_content": {content_type_list.Thread.slug: True}}
+        self.session.flush()
+        eq_(folder.get_allowed_content_types(), [content_type_list.Thread])
+        eq_(folder.revision.get_allowed_content_types(), (content_type_list.Thread,))
+        eq_(
+            folder.revision.get_parsed_properties(),
+            {"allowed_content": {content_type_list.Thread.slug: True}},
+        )
@@ -57,7 +57,7 @@ class CommentController(Controller):
         content = api.get_one(hapic_data.path.content_id, content_type=content_type_list.Any_SLUG)
         comments = content.get_comments()
         comments.sort(key=lambda comment: comment.created)
-        return [api.get_content_in_context(comment) for comment in comments]
+        return api.get_contents_in_context(comments)
 
     @hapic.with_api_doc(tags=[SWAGGER_TAG__CONTENT_COMMENT_ENDPOINTS])
     @hapic.handle_exception(EmptyCommentContentNotAllowed, HTTPStatus.BAD_REQUEST)
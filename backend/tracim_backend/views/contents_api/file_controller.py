@@ -2,7 +2,6 @@
 import typing
 
 from depot.manager import DepotManager
-from hapic.data import HapicFile
 from pyramid.config import Configurator
 import transaction
 
@@ -13,23 +12,29 @@ from tracim_backend.exceptions import ContentFilenameAlreadyUsedInFolder
 from tracim_backend.exceptions import ContentNotFound
 from tracim_backend.exceptions import ContentStatusException
 from tracim_backend.exceptions import EmptyLabelNotAllowed
+from tracim_backend.exceptions import ExpiredSignedPreviewUrl
+from tracim_backend.exceptions import InvalidSignedPreviewUrl
 from tracim_backend.exceptions import PageOfPreviewNotFound
 from tracim_backend.exceptions import ParentNotFound
 from tracim_backend.exceptions import PreviewDimNotAllowed
+from tracim_backend.exceptions import SignedPreviewUrlDisabled
 from tracim_backend.exceptions import TracimFileNotFound
 from tracim_backend.exceptions import TracimUnavailablePreviewType
 from tracim_backend.exceptions import UnallowedSubContent
 from tracim_backend.exceptions import UnavailablePreview
 from tracim_backend.extensions import hapic
 from tracim_backend.lib.core.content import ContentApi
+from tracim_backend.lib.preview.signed_url import JpgPreviewSigner
 from tracim_backend.lib.utils.authorization import ContentTypeChecker
 from tracim_backend.lib.utils.authorization import ContentTypeCreationChecker
 from tracim_backend.lib.utils.authorization import check_right
 from tracim_backend.lib.utils.authorization import is_contributor
 from tracim_backend.lib.utils.authorization import is_reader
 from tracim_backend.lib.utils.request import TracimRequest
+from tracim_backend.lib.utils.response import TracimFile
 from tracim_backend.lib.utils.utils import generate_documentation_swagger_tag
 from tracim_backend.models.context_models import ContentInContext
+from tracim_backend.models.context_models import JpgPreviewUrl
 from tracim_backend.models.context_models import RevisionInContext
 from tracim_backend.models.data import ActionDescription
 from tracim_backend.models.revision_protection import new_revision
@@ -45,12 +50,16 @@ from tracim_backend.views.core_api.schemas import FileQuerySchema
 from tracim_backend.views.core_api.schemas import FileRevisionPathSchema
 from tracim_backend.views.core_api.schemas import FileRevisionPreviewSizedPathSchema
 from tracim_backend.views.core_api.schemas import FileRevisionSchema
+from tracim_backend.views.core_api.schemas import JpgPreviewUrlSchema
 from tracim_backend.views.core_api.schemas import NoContentSchema
 from tracim_backend.views.core_api.schemas import PageQuerySchema
+from tracim_backend.views.core_api.schemas import PreviewUrlsQuerySchema
 from tracim_backend.views.core_api.schemas import SetContentStatusSchema
+from tracim_backend.views.core_api.schemas import SignedPreviewPathSchema
 from tracim_backend.views.core_api.schemas import SimpleFileSchema
 from tracim_backend.views.core_api.schemas import WorkspaceAndContentIdPathSchema
 from tracim_backend.views.core_api.schemas import WorkspaceIdPathSchema
+from tracim_backend.views.core_api.schemas import WorkspacePreviewSizedPathSchema
 from tracim_backend.views.swagger_generic_section import SWAGGER_TAG__CONTENT_ENDPOINTS
 
 try:  # Python 3.5+
@@ -192,13 +201,17 @@ class FileController(Controller):
         filename = hapic_data.path.filename
         if not filename or filename == "raw":
             filename = content.file_name
-        return HapicFile(
-            file_object=file,
-            mimetype=file.content_type,
+        return TracimFile(
+            # INFO - 2019-07-18 - file is served from its path to allow
+            # serving ranges of it without reading the whole file.
+            file_path=file._file_path,
+            # INFO - 2019-07-17 - stored file may be shared with files having
+            # another mimetype, see FileBlob.
+            mimetype=content.file_mimetype or file.content_type,
             filename=filename,
             as_attachment=hapic_data.query.force_download,
-            content_length=file.content_length,
             last_modified=content.updated,
+            etag=content.revision.get_file_etag(),
         )
 
     @hapic.with_api_doc(tags=[SWAGGER_TAG__CONTENT_FILE_ENDPOINTS])
@@ -239,13 +252,13 @@ class FileController(Controller):
                 revision_id=revision.revision_id,
                 file_extension=revision.file_extension,
             )
-        return HapicFile(
-            file_object=file,
-            mimetype=file.content_type,
+        return TracimFile(
+            file_path=file._file_path,
+            mimetype=revision.file_mimetype or file.content_type,
             filename=filename,
             as_attachment=hapic_data.query.force_download,
-            content_length=file.content_length,
             last_modified=revision.updated,
+            etag=revision.get_file_etag(),
         )
 
     # preview
@@ -285,10 +298,13 @@ class FileController(Controller):
             filename = "{label}_page_{page_number}.pdf".format(
                 label=content.label, page_number=hapic_data.query.page
             )
-        return HapicFile(
+        return TracimFile(
             file_path=pdf_preview_path,
             filename=filename,
             as_attachment=hapic_data.query.force_download,
+            etag=content.revision.get_file_etag(
+                "pdf", content.file_extension, hapic_data.query.page
+            ),
         )
 
     @hapic.with_api_doc(tags=[SWAGGER_TAG__CONTENT_FILE_ENDPOINTS])
@@ -320,10 +336,11 @@ class FileController(Controller):
         filename = hapic_data.path.filename
         if not filename or filename == "raw":
             filename = "{label}.pdf".format(label=content.label)
-        return HapicFile(
+        return TracimFile(
             file_path=pdf_preview_path,
             filename=filename,
             as_attachment=hapic_data.query.force_download,
+            etag=content.revision.get_file_etag("pdf", content.file_extension),
         )
 
     @hapic.with_api_doc(tags=[SWAGGER_TAG__CONTENT_FILE_ENDPOINTS])
@@ -358,10 +375,11 @@ class FileController(Controller):
             filename = "{label}_r{revision_id}.pdf".format(
                 revision_id=revision.revision_id, label=revision.label
             )
-        return HapicFile(
+        return TracimFile(
             file_path=pdf_preview_path,
             filename=filename,
             as_attachment=hapic_data.query.force_download,
+            etag=revision.get_file_etag("pdf", revision.file_extension),
         )
 
     @hapic.with_api_doc(tags=[SWAGGER_TAG__CONTENT_FILE_ENDPOINTS])
@@ -399,10 +417,11 @@ class FileController(Controller):
             filename = "{label}_page_{page_number}.pdf".format(
                 label=content.label, page_number=hapic_data.query.page
             )
-        return HapicFile(
+        return TracimFile(
             file_path=pdf_preview_path,
             filename=filename,
             as_attachment=hapic_data.query.force_download,
+            etag=revision.get_file_etag("pdf", revision.file_extension, hapic_data.query.page),
         )
 
     # jpg
@@ -443,10 +462,17 @@ class FileController(Controller):
             filename = "{label}_page_{page_number}.jpg".format(
                 label=content.label, page_number=hapic_data.query.page
             )
-        return HapicFile(
+        return TracimFile(
             file_path=jpg_preview_path,
             filename=filename,
             as_attachment=hapic_data.query.force_download,
+            etag=content.revision.get_file_etag(
+                "jpg",
+                content.file_extension,
+                hapic_data.query.page,
+                allowed_dim.dimensions[0].width,
+                allowed_dim.dimensions[0].height,
+            ),
         )
 
     @hapic.with_api_doc(tags=[SWAGGER_TAG__CONTENT_FILE_ENDPOINTS])
@@ -489,10 +515,17 @@ class FileController(Controller):
                 width=hapic_data.path.width,
                 height=hapic_data.path.height,
             )
-        return HapicFile(
+        return TracimFile(
             file_path=jpg_preview_path,
             filename=filename,
             as_attachment=hapic_data.query.force_download,
+            etag=content.revision.get_file_etag(
+                "jpg",
+                content.file_extension,
+                hapic_data.query.page,
+                hapic_data.path.width,
+                hapic_data.path.height,
+            ),
         )
 
     @hapic.with_api_doc(tags=[SWAGGER_TAG__CONTENT_FILE_ENDPOINTS])
@@ -537,10 +570,17 @@ class FileController(Controller):
                 width=hapic_data.path.width,
                 height=hapic_data.path.height,
             )
-        return HapicFile(
+        return TracimFile(
             file_path=jpg_preview_path,
             filename=filename,
             as_attachment=hapic_data.query.force_download,
+            etag=revision.get_file_etag(
+                "jpg",
+                revision.file_extension,
+                hapic_data.query.page,
+                hapic_data.path.width,
+                hapic_data.path.height,
+            ),
         )
 
     @hapic.with_api_doc(tags=[SWAGGER_TAG__CONTENT_FILE_ENDPOINTS])
@@ -563,6 +603,79 @@ class FileController(Controller):
         )
         return api.get_jpg_preview_allowed_dim()
 
+    @hapic.with_api_doc(tags=[SWAGGER_TAG__CONTENT_FILE_ENDPOINTS])
+    @check_right(is_reader)
+    @hapic.handle_exception(PreviewDimNotAllowed, HTTPStatus.BAD_REQUEST)
+    @hapic.handle_exception(SignedPreviewUrlDisabled, HTTPStatus.BAD_REQUEST)
+    @hapic.input_path(WorkspacePreviewSizedPathSchema())
+    @hapic.input_query(PreviewUrlsQuerySchema())
+    @hapic.output_body(JpgPreviewUrlSchema(many=True))
+    def sized_preview_jpg_urls(
+        self, context, request: TracimRequest, hapic_data=None
+    ) -> typing.List[JpgPreviewUrl]:
+        """
+        Get signed urls of resized jpg previews of last revision of many file
+        contents of a workspace at once, for example to show thumbnails of a
+        folder. Urls can be used without authentication for a short time (see
+        preview.signed_url.lifetime setting).
+        Contents which are not files of this workspace are ignored, url is
+        null for files having no preview of requested page.
+        """
+        app_config = request.registry.settings["CFG"]  # type: CFG
+        api = ContentApi(
+            show_archived=True,
+            show_deleted=True,
+            current_user=request.current_user,
+            session=request.dbsession,
+            config=app_config,
+        )
+        signed_previews = api.get_signed_jpg_previews(
+            content_ids=hapic_data.query.content_ids,
+            workspace=request.current_workspace,
+            page_number=hapic_data.query.page,
+            width=hapic_data.path.width,
+            height=hapic_data.path.height,
+        )
+        preview_urls = []
+        for content, token in signed_previews:
+            url = None
+            if token:
+                url = request.route_url(
+                    "signed_preview_jpg",
+                    token=token,
+                    filename="{label}_page_{page_number}_{width}x{height}.jpg".format(
+                        label=content.label,
+                        page_number=hapic_data.query.page,
+                        width=hapic_data.path.width,
+                        height=hapic_data.path.height,
+                    ),
+                )
+            preview_urls.append(JpgPreviewUrl(content.content_id, content.revision_id, url))
+        return preview_urls
+
+    @hapic.with_api_doc(tags=[SWAGGER_TAG__CONTENT_FILE_ENDPOINTS])
+    @hapic.handle_exception(InvalidSignedPreviewUrl, HTTPStatus.FORBIDDEN)
+    @hapic.handle_exception(ExpiredSignedPreviewUrl, HTTPStatus.FORBIDDEN)
+    @hapic.handle_exception(SignedPreviewUrlDisabled, HTTPStatus.FORBIDDEN)
+    @hapic.handle_exception(UnavailablePreview, HTTPStatus.BAD_REQUEST)
+    @hapic.input_path(SignedPreviewPathSchema())
+    @hapic.input_query(FileQuerySchema())
+    @hapic.output_file([])
+    def signed_preview_jpg(self, context, request: TracimRequest, hapic_data=None):
+        """
+        Obtain jpg preview with a signed url, without authentication, see
+        sized_preview_jpg_urls endpoint.
+        """
+        app_config = request.registry.settings["CFG"]  # type: CFG
+        preview = JpgPreviewSigner.from_config(app_config).load(hapic_data.path.token)
+        api = ContentApi(current_user=None, session=request.dbsession, config=app_config)
+        return TracimFile(
+            file_path=api.get_signed_jpg_preview_path(preview),
+            filename=hapic_data.path.filename,
+            as_attachment=hapic_data.query.force_download,
+            etag=preview.get_etag(),
+        )
+
     # File infos
     @hapic.with_api_doc(tags=[SWAGGER_TAG__CONTENT_FILE_ENDPOINTS])
     @check_right(is_reader)
@@ -754,6 +867,18 @@ class FileController(Controller):
             request_method="GET",
         )
         configurator.add_view(self.sized_preview_jpg, route_name="sized_preview_jpg")
+        # get signed urls of jpg previews of many files
+        configurator.add_route(
+            "sized_preview_jpg_urls",
+            "/workspaces/{workspace_id}/files/previews/jpg/{width}x{height}",
+            request_method="GET",
+        )
+        configurator.add_view(self.sized_preview_jpg_urls, route_name="sized_preview_jpg_urls")
+        # get jpg preview with signed url
+        configurator.add_route(
+            "signed_preview_jpg", "/previews/jpg/{token}/{filename:[^/]*}", request_method="GET"
+        )
+        configurator.add_view(self.signed_preview_jpg, route_name="signed_preview_jpg")
         # get jpg preview for revision
         configurator.add_route(
             "sized_preview_jpg_revision",
@@ -44,6 +44,7 @@ from tracim_backend.models.context_models import KnownMemberQuery
 from tracim_backend.models.context_models import LoginCredentials
 from tracim_backend.models.context_models import MoveParams
 from tracim_backend.models.context_models import PageQuery
+from tracim_backend.models.context_models import PreviewUrlsQuery
 from tracim_backend.models.context_models import RadicaleUserSubitemsPath
 from tracim_backend.models.context_models import RadicaleWorkspaceSubitemsPath
 from tracim_backend.models.context_models import ResetPasswordCheckToken
@@ -54,6 +55,7 @@ from tracim_backend.models.context_models import RoleUpdate
 from tracim_backend.models.context_models import SetContentStatus
 from tracim_backend.models.context_models import SetEmail
 from tracim_backend.models.context_models import SetPassword
+from tracim_backend.models.context_models import SignedPreviewPath
 from tracim_backend.models.context_models import SimpleFile
 from tracim_backend.models.context_models import TextBasedContentUpdate
 from tracim_backend.models.context_models import UserCreation
@@ -65,6 +67,7 @@ from tracim_backend.models.context_models import WorkspaceAndContentRevisionPath
 from tracim_backend.models.context_models import WorkspaceAndUserPath
 from tracim_backend.models.context_models import WorkspaceMemberInvitation
 from tracim_backend.models.context_models import WorkspacePath
+from tracim_backend.models.context_models import WorkspacePreviewSizedPath
 from tracim_backend.models.context_models import WorkspaceUpdate
 from tracim_backend.models.data import ActionDescription
 
@@ -392,6 +395,22 @@ class FilePreviewSizedPathSchema(
         return FilePreviewSizedPath(**data)
 
 
+class WorkspacePreviewSizedPathSchema(WorkspaceIdPathSchema, WidthAndHeightPathSchema):
+    @post_load
+    def make_path_object(self, data: typing.Dict[str, typing.Any]) -> object:
+        return WorkspacePreviewSizedPath(**data)
+
+
+class SignedPreviewPathSchema(FilenamePathSchema):
+    token = marshmallow.fields.String(
+        required=True, description="token of signed preview, given with its url"
+    )
+
+    @post_load
+    def make_path_object(self, data: typing.Dict[str, typing.Any]) -> object:
+        return SignedPreviewPath(**data)
+
+
 class FileRevisionPreviewSizedPathSchema(
     WorkspaceAndContentRevisionIdPathSchema, WidthAndHeightPathSchema, FilenamePathSchema
 ):
@@ -475,6 +494,25 @@ class PageQuerySchema(FileQuerySchema):
         return PageQuery(**data)
 
 
+class PreviewUrlsQuerySchema(marshmallow.Schema):
+    content_ids = StrippedString(
+        validate=regex_string_as_list_of_int,
+        example="1,5",
+        required=True,
+        description="comma separated list of file contents ids",
+    )
+    page = marshmallow.fields.Int(
+        example=2,
+        default=1,
+        description="allow to get previews of a specific page of pdf files",
+        validate=strictly_positive_int_validator,
+    )
+
+    @post_load
+    def make_query(self, data: typing.Dict[str, typing.Any]) -> object:
+        return PreviewUrlsQuery(**data)
+
+
 class FilterContentQuerySchema(marshmallow.Schema):
 
     parent_ids = StrippedString(
@@ -995,6 +1033,17 @@ class FileRevisionSchema(RevisionSchema, FileInfoAbstractSchema):
     pass
 
 
+class JpgPreviewUrlSchema(marshmallow.Schema):
+    content_id = marshmallow.fields.Int(example=6, validate=strictly_positive_int_validator)
+    revision_id = marshmallow.fields.Int(example=12, validate=strictly_positive_int_validator)
+    url = marshmallow.fields.String(
+        example="https://tracim.example.org/api/v2/previews/jpg/eyJ…/image_page_1_256x256.jpg",
+        allow_none=True,
+        description="signed url of jpg preview, valid for a short time, "
+        "null if file has no preview",
+    )
+
+
 class CommentSchema(marshmallow.Schema):
     content_id = marshmallow.fields.Int(example=6, validate=strictly_positive_int_validator)
     parent_id = marshmallow.fields.Int(example=34, validate=positive_int_validator)
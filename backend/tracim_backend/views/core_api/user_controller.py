@@ -372,7 +372,7 @@ class UserController(Controller):
         last_actives = api.get_last_active(
             workspace=workspace, limit=content_filter.limit or None, before_content=before_content
         )
-        return [api.get_content_in_context(content) for content in last_actives]
+        return api.get_contents_in_context(last_actives)
 
     @hapic.with_api_doc(tags=[SWAGGER_TAG__USER_CONTENT_ENDPOINTS])
     @check_right(has_personal_access)
@@ -403,7 +403,7 @@ class UserController(Controller):
             before_content=None,
             content_ids=hapic_data.query.content_ids or None,
         )
-        return [api.get_content_in_context(content) for content in last_actives]
+        return api.get_contents_in_context(last_actives)
 
     @hapic.with_api_doc(tags=[SWAGGER_TAG__USER_CONTENT_ENDPOINTS])
     @check_right(has_personal_access)
@@ -57,3 +57,7 @@ class ESSearchController(SearchController):
 
 class SimpleSearchController(SearchController):
     pass
+
+
+class SqlSearchController(SearchController):
+    pass